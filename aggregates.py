@@ -0,0 +1,554 @@
+# Partial aggregate kernels for the Gaming Analytics Dashboard
+# Every analysis is expressed as: column ranges -> additive partials -> chart tables,
+# so the same kernels run serially, on a process pool or on any other backend.
+
+import numpy as np
+import pandas as pd
+
+NUMERIC_FIELDS = ['Age', 'PlayTimeHours', 'InGamePurchases', 'SessionsPerWeek',
+                  'AvgSessionDurationMinutes', 'PlayerLevel', 'AchievementsUnlocked',
+                  'EngagementLevel', 'SocialInteractionScore', 'RageQuitFrequency',
+                  'LoyaltyIndex', 'SleepDeprivationRisk', 'ToxicityLevel', 'TeamPlayerScore']
+
+CATEGORICAL_FIELDS = ['Gender', 'Location', 'GameGenre']
+
+AGE_GROUP_BINS = [0, 18, 25, 35, 50, 100]
+AGE_GROUP_LABELS = ['<18', '18-25', '26-35', '36-50', '50+']
+
+SPENDING_TIER_BINS = [-0.01, 0, 10, 50, 200, float('inf')]
+SPENDING_TIER_LABELS = ['F2P', 'Light ($1-10)', 'Medium ($11-50)', 'Heavy ($51-200)', 'Whale ($200+)']
+
+SLEEP_RISK_BINS = [0, 3, 5, 7, 10]
+SLEEP_RISK_LABELS = ['Low Risk', 'Moderate Risk', 'High Risk', 'Critical Risk']
+
+SEGMENT_LABELS = ['Whale 🐋', 'High Spender 💎', 'Hardcore F2P ⚡',
+                  'Engaged Player 🎯', 'Regular Player 🎮', 'Casual Player 😊']
+
+SEGMENT_CODE_COLUMN = 'PlayerSegmentCode'
+
+# Standardized behavioral features of the learned (k-means) segments
+CLUSTER_FEATURES = ['PlayTimeHours', 'SessionsPerWeek', 'InGamePurchases',
+                    'EngagementLevel', 'LoyaltyIndex', 'ToxicityLevel']
+CLUSTER_CODE_COLUMN = 'PlayerClusterCode'
+
+# Derived dimensions, binned once at ingest into uint8 code columns (NO_BIN = outside every bin)
+DERIVED_BINS = {
+    'AgeGroupCode': {'source': 'Age', 'edges': AGE_GROUP_BINS, 'labels': AGE_GROUP_LABELS},
+    'SpendingTierCode': {'source': 'InGamePurchases', 'edges': SPENDING_TIER_BINS, 'labels': SPENDING_TIER_LABELS},
+    'SleepRiskCode': {'source': 'SleepDeprivationRisk', 'edges': SLEEP_RISK_BINS, 'labels': SLEEP_RISK_LABELS},
+}
+NO_BIN = 255
+
+# Fields of the Age vs play time trend line on the demographics tab
+TREND_FIELDS = ['Age', 'PlayTimeHours']
+# Rows per block when accumulating cross-products (bounds the temporary matrix)
+MOMENT_BLOCK_ROWS = 1_000_000
+
+# Optional per-row weight (inverse inclusion probability) for sampled column sets;
+# with it every count and sum below becomes an estimate of the population value
+WEIGHT_COLUMN = 'SampleWeight'
+
+
+class ColumnSet:
+    """Plain NumPy columns extracted from the cleaned player frame"""
+
+    def __init__(self, arrays, categories):
+        self.arrays = arrays
+        self.categories = categories
+        self.rows = len(next(iter(arrays.values()))) if arrays else 0
+
+    @classmethod
+    def from_frame(cls, data):
+        """Numeric fields become float64, categorical fields become int32 codes"""
+        arrays = {}
+        categories = {}
+        for field in NUMERIC_FIELDS:
+            if field in data.columns:
+                arrays[field] = pd.to_numeric(data[field], errors='coerce').to_numpy(dtype=np.float64)
+        for field in CATEGORICAL_FIELDS:
+            if field in data.columns:
+                codes, uniques = pd.factorize(data[field], sort=True)
+                arrays[field] = codes.astype(np.int32)
+                categories[field] = [str(u) for u in uniques]
+        arrays.update(derive_bin_columns(arrays))
+        # Output columns filled in by the segmentation and cluster kernels
+        arrays[SEGMENT_CODE_COLUMN] = np.zeros(len(data), dtype=np.uint8)
+        arrays[CLUSTER_CODE_COLUMN] = np.zeros(len(data), dtype=np.uint8)
+        return cls(arrays, categories)
+
+
+def bin_codes(values, edges):
+    """Right-closed interval codes matching pd.cut; -1 for values outside the bins"""
+    codes = np.searchsorted(np.asarray(edges, dtype=np.float64), values, side='left') - 1
+    codes[(codes < 0) | (codes >= len(edges) - 1)] = -1
+    return codes
+
+
+def encode_bins(values, edges):
+    """bin_codes as a compact uint8 column, NO_BIN for values outside the bins"""
+    codes = bin_codes(values, edges)
+    codes[codes < 0] = NO_BIN
+    return codes.astype(np.uint8)
+
+
+def derive_bin_columns(arrays):
+    """Every DERIVED_BINS code column whose source field is present"""
+    return {name: encode_bins(arrays[spec['source']], spec['edges'])
+            for name, spec in DERIVED_BINS.items() if spec['source'] in arrays}
+
+
+def derived_codes(cols, name, start, stop):
+    """Precomputed codes of a derived dimension, binned on the fly for column sets without them"""
+    if name in cols:
+        return cols[name][start:stop]
+    spec = DERIVED_BINS[name]
+    return encode_bins(cols[spec['source']][start:stop], spec['edges'])
+
+
+def bin_domains(codes):
+    """uint8 bin codes as int64 domain ids with -1 for NO_BIN"""
+    return np.where(codes == NO_BIN, -1, codes.astype(np.int64))
+
+
+def count_codes(codes, n, weights=None):
+    """np.bincount over valid codes (>= 0 and < n; drops -1 and NO_BIN)"""
+    valid = codes < n if codes.dtype.kind == 'u' else (codes >= 0) & (codes < n)
+    if not valid.all():
+        codes = codes[valid]
+        weights = None if weights is None else weights[valid]
+    if weights is not None:
+        return np.bincount(codes, weights=weights, minlength=n).astype(np.float64)
+    return np.bincount(codes, minlength=n).astype(np.int64)
+
+
+def histogram(values, bins, value_range, weights=None):
+    counts = np.histogram(values, bins=bins, range=value_range, weights=weights)[0]
+    return counts if weights is not None else counts.astype(np.int64)
+
+
+def row_weights(cols, start, stop):
+    """Sample weights for the row range, or None for a full (unweighted) column set"""
+    weights = cols.get(WEIGHT_COLUMN)
+    return None if weights is None else weights[start:stop]
+
+
+def weighted(values, weights):
+    return values if weights is None else values * weights
+
+
+def weighted_rows(n, weights, mask=None):
+    if weights is None:
+        return n
+    return weights.sum() if mask is None else weights[mask].sum()
+
+
+def merge_partials(partials):
+    """Combine partial results: *_min/*_max keys reduce, everything else adds"""
+    merged = {}
+    for partial in partials:
+        for key, value in partial.items():
+            if key not in merged:
+                merged[key] = np.array(value, copy=True)
+            elif key.endswith('_min'):
+                merged[key] = np.fmin(merged[key], value)
+            elif key.endswith('_max'):
+                merged[key] = np.fmax(merged[key], value)
+            else:
+                merged[key] = merged[key] + value
+    return merged
+
+
+# ---------------------------------------------------------------------------
+# Range kernel (first pass, gives every backend the same histogram edges)
+# ---------------------------------------------------------------------------
+
+def partial_ranges(cols, start, stop, params):
+    result = {}
+    for field in params['range_fields']:
+        values = cols[field][start:stop]
+        positive = values[values > 0]
+        result[f'{field}_min'] = np.array([np.nanmin(values) if len(values) else np.inf])
+        result[f'{field}_max'] = np.array([np.nanmax(values) if len(values) else -np.inf])
+        result[f'{field}_pos_min'] = np.array([positive.min() if len(positive) else np.inf])
+    return result
+
+
+def finalize_ranges(merged, fields):
+    ranges = {}
+    for field in fields:
+        lo, hi = float(merged[f'{field}_min'][0]), float(merged[f'{field}_max'][0])
+        pos_lo = float(merged[f'{field}_pos_min'][0])
+        ranges[field] = _usable_range(lo, hi)
+        ranges[f'{field}>0'] = _usable_range(pos_lo, hi)
+    return ranges
+
+
+def _usable_range(lo, hi):
+    # Same fallback as np.histogram for empty or constant columns
+    if not np.isfinite(lo) or not np.isfinite(hi):
+        return (0.0, 1.0)
+    if lo == hi:
+        return (lo - 0.5, hi + 0.5)
+    return (lo, hi)
+
+
+# ---------------------------------------------------------------------------
+# Sufficient statistics for regression and correlation
+# ---------------------------------------------------------------------------
+
+def range_shift(ranges, fields):
+    """Per-field reference point (range midpoint) the moment sums are taken around"""
+    return np.array([sum(ranges[field]) / 2 for field in fields])
+
+
+def moment_partials(cols, start, stop, fields, shift, prefix):
+    """Weighted count, sums and cross-products of shifted fields over a row range
+
+    Sums around a fixed per-field shift stay additive across chunks and avoid the
+    cancellation of raw E[xy] - E[x]E[y] on large values. Rows with NaNs are skipped.
+    """
+    k = len(fields)
+    rows = 0.0
+    sums = np.zeros(k)
+    cross = np.zeros((k, k))
+    for a in range(start, stop, MOMENT_BLOCK_ROWS):
+        b = min(a + MOMENT_BLOCK_ROWS, stop)
+        # One contiguous row per field, so x @ x.T is a single BLAS call
+        x = np.empty((k, b - a))
+        for j, field in enumerate(fields):
+            np.subtract(cols[field][a:b], shift[j], out=x[j])
+        w = row_weights(cols, a, b)
+        finite = np.isfinite(x).all(axis=0)
+        if not finite.all():
+            x = x[:, finite]
+            w = None if w is None else w[finite]
+        if w is None:
+            rows += x.shape[1]
+            sums += x.sum(axis=1)
+            cross += x @ x.T
+        else:
+            rows += w.sum()
+            sums += x @ w
+            cross += (x * w) @ x.T
+    return {f'{prefix}_rows': np.array([rows]), f'{prefix}_sums': sums, f'{prefix}_cross': cross}
+
+
+def finalize_moments(merged, fields, shift, prefix):
+    """Means, covariance and correlation matrices from merged moment partials"""
+    n = merged[f'{prefix}_rows'][0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        centered = merged[f'{prefix}_sums'] / n
+        covariance = merged[f'{prefix}_cross'] / n - np.outer(centered, centered)
+        std = np.sqrt(np.maximum(np.diag(covariance), 0))
+        correlation = np.clip(covariance / np.outer(std, std), -1, 1)
+    return {
+        'rows': n,
+        'means': pd.Series(centered + shift, index=fields),
+        'covariance': pd.DataFrame(covariance, index=fields, columns=fields),
+        'correlation': pd.DataFrame(correlation, index=fields, columns=fields),
+    }
+
+
+def trend_line(moments, x_field, y_field, x_range):
+    """Least-squares line as its two endpoints over x_range, or None when x is constant"""
+    variance = moments['covariance'].loc[x_field, x_field]
+    if not variance > 0:
+        return None
+    slope = moments['covariance'].loc[x_field, y_field] / variance
+    intercept = moments['means'][y_field] - slope * moments['means'][x_field]
+    x = np.array(x_range, dtype=np.float64)
+    return x, intercept + slope * x
+
+
+# ---------------------------------------------------------------------------
+# Per-analysis kernels
+# ---------------------------------------------------------------------------
+
+def partial_demographics(cols, start, stop, params):
+    age = cols['Age'][start:stop]
+    sessions = cols['SessionsPerWeek'][start:stop]
+    w = row_weights(cols, start, stop)
+    groups = derived_codes(cols, 'AgeGroupCode', start, stop)
+    n_groups = len(AGE_GROUP_LABELS)
+    return {
+        'rows': np.array([weighted_rows(len(age), w)]),
+        'age_sum': np.array([weighted(age, w).sum()]),
+        'age_hist': histogram(age, 25, params['ranges']['Age'], w),
+        'location_counts': count_codes(cols['Location'][start:stop], len(params['categories']['Location']), w),
+        'age_group_sessions': count_codes(groups, n_groups, weighted(sessions, w)),
+        'age_group_rows': count_codes(groups, n_groups, w),
+        **moment_partials(cols, start, stop, TREND_FIELDS, range_shift(params['ranges'], TREND_FIELDS), 'trend'),
+    }
+
+
+def finalize_demographics(merged, params):
+    rows = merged['rows'][0]
+    trend = finalize_moments(merged, TREND_FIELDS, range_shift(params['ranges'], TREND_FIELDS), 'trend')
+    location_counts = pd.Series(merged['location_counts'], index=params['categories']['Location'])
+    location_counts = location_counts[location_counts > 0].sort_values(ascending=False)
+    return {
+        'rows': rows,
+        'mean_age': merged['age_sum'][0] / rows if rows else np.nan,
+        'age_edges': np.linspace(*params['ranges']['Age'], 26),
+        'age_hist': merged['age_hist'],
+        'location_counts': location_counts,
+        'session_by_age': pd.Series(_safe_mean(merged['age_group_sessions'], merged['age_group_rows']),
+                                    index=AGE_GROUP_LABELS),
+        'age_trend': trend_line(trend, 'Age', 'PlayTimeHours', params['ranges']['Age']),
+    }
+
+
+def partial_behavior(cols, start, stop, params):
+    w = row_weights(cols, start, stop)
+    return {
+        'playtime_hist': histogram(cols['PlayTimeHours'][start:stop], 30, params['ranges']['PlayTimeHours'], w),
+        'genre_counts': count_codes(cols['GameGenre'][start:stop], len(params['categories']['GameGenre']), w),
+    }
+
+
+def finalize_behavior(merged, params):
+    genre_counts = pd.Series(merged['genre_counts'], index=params['categories']['GameGenre'])
+    return {
+        'playtime_edges': np.linspace(*params['ranges']['PlayTimeHours'], 31),
+        'playtime_hist': merged['playtime_hist'],
+        'genre_counts': genre_counts[genre_counts > 0].sort_values(ascending=False),
+    }
+
+
+def partial_monetization(cols, start, stop, params):
+    purchases = cols['InGamePurchases'][start:stop]
+    w = row_weights(cols, start, stop)
+    is_paying = purchases > 0
+    tiers = derived_codes(cols, 'SpendingTierCode', start, stop)
+    genres = cols['GameGenre'][start:stop]
+    return {
+        'paying_rows': np.array([weighted_rows(int(is_paying.sum()), w, is_paying)]),
+        'paying_hist': histogram(purchases[is_paying], 30, params['ranges']['InGamePurchases>0'],
+                                 None if w is None else w[is_paying]),
+        'genre_revenue': count_codes(genres, len(params['categories']['GameGenre']), weighted(purchases, w)),
+        'genre_rows': count_codes(genres, len(params['categories']['GameGenre'])),
+        'tier_counts': count_codes(tiers, len(SPENDING_TIER_LABELS), w),
+    }
+
+
+def finalize_monetization(merged, params):
+    genre_revenue = pd.Series(merged['genre_revenue'], index=params['categories']['GameGenre'])
+    genre_revenue = genre_revenue[merged['genre_rows'] > 0].sort_values(ascending=False)
+    return {
+        'paying_rows': merged['paying_rows'][0],
+        'paying_edges': np.linspace(*params['ranges']['InGamePurchases>0'], 31),
+        'paying_hist': merged['paying_hist'],
+        'genre_revenue': genre_revenue,
+        'tier_counts': pd.Series(merged['tier_counts'], index=SPENDING_TIER_LABELS).sort_values(ascending=False),
+    }
+
+
+def partial_social(cols, start, stop, params):
+    w = row_weights(cols, start, stop)
+    risk = derived_codes(cols, 'SleepRiskCode', start, stop)
+    return {
+        'toxicity_hist': histogram(cols['ToxicityLevel'][start:stop], 20, params['ranges']['ToxicityLevel'], w),
+        'ragequit_hist': histogram(cols['RageQuitFrequency'][start:stop], 15, params['ranges']['RageQuitFrequency'], w),
+        'risk_counts': count_codes(risk, len(SLEEP_RISK_LABELS), w),
+    }
+
+
+def finalize_social(merged, params):
+    return {
+        'toxicity_edges': np.linspace(*params['ranges']['ToxicityLevel'], 21),
+        'toxicity_hist': merged['toxicity_hist'],
+        'ragequit_edges': np.linspace(*params['ranges']['RageQuitFrequency'], 16),
+        'ragequit_hist': merged['ragequit_hist'],
+        'risk_counts': pd.Series(merged['risk_counts'], index=SLEEP_RISK_LABELS).sort_values(ascending=False),
+    }
+
+
+def segment_codes(spending, engagement, playtime):
+    """Vectorized categorize_player_advanced; codes index SEGMENT_LABELS"""
+    conditions = [
+        spending > 100,
+        (spending > 25) & (engagement > 6),
+        (playtime > 25) & (spending == 0),
+        engagement > 7,
+        playtime > 10,
+    ]
+    return np.select(conditions, [0, 1, 2, 3, 4], default=5).astype(np.uint8)
+
+
+def partial_segmentation(cols, start, stop, params):
+    spending = cols['InGamePurchases'][start:stop]
+    codes = segment_codes(spending, cols['EngagementLevel'][start:stop], cols['PlayTimeHours'][start:stop])
+    # Labels are written straight into the (possibly shared) output column
+    cols[SEGMENT_CODE_COLUMN][start:stop] = codes
+    return segment_partials(cols, start, stop, codes, len(SEGMENT_LABELS), params)
+
+
+def segment_partials(cols, start, stop, codes, n, params):
+    """Per-segment sums behind the segmentation tab, for any segment coding"""
+    spending = cols['InGamePurchases'][start:stop]
+    w = row_weights(cols, start, stop)
+    loyalty = cols['LoyaltyIndex'][start:stop]
+    lo, hi = params['ranges']['LoyaltyIndex']
+    loyalty_bins = np.clip(((loyalty - lo) / (hi - lo) * 15).astype(np.int64), 0, 14)
+    codes = codes.astype(np.int64)
+    return {
+        'segment_rows': np.bincount(codes, weights=w, minlength=n),
+        'segment_revenue': np.bincount(codes, weights=weighted(spending, w), minlength=n),
+        'segment_engagement': np.bincount(codes, weights=weighted(cols['EngagementLevel'][start:stop], w), minlength=n),
+        'segment_playtime': np.bincount(codes, weights=weighted(cols['PlayTimeHours'][start:stop], w), minlength=n),
+        'segment_toxicity': np.bincount(codes, weights=weighted(cols['ToxicityLevel'][start:stop], w), minlength=n),
+        'segment_loyalty_hist': np.bincount(codes * 15 + loyalty_bins, weights=w, minlength=n * 15).reshape(n, 15),
+    }
+
+
+def finalize_segmentation(merged, params):
+    labels = params.get('segment_labels', SEGMENT_LABELS)
+    rows = merged['segment_rows']
+    present = rows > 0
+    index = [label for label, keep in zip(labels, present) if keep]
+
+    def per_segment(values):
+        return pd.Series(np.asarray(values)[present], index=index)
+
+    segment_counts = per_segment(rows).sort_values(ascending=False)
+    loyalty_hist = {label: merged['segment_loyalty_hist'][labels.index(label)]
+                    for label in segment_counts.index}
+    return {
+        'segment_counts': segment_counts,
+        'segment_revenue': per_segment(merged['segment_revenue']).sort_values(ascending=False),
+        'segment_engagement': per_segment(merged['segment_engagement'] / np.maximum(rows, 1)).sort_values(ascending=False),
+        'segment_playtime': per_segment(merged['segment_playtime'] / np.maximum(rows, 1)).sort_values(ascending=False),
+        'segment_toxicity': per_segment(merged['segment_toxicity'] / np.maximum(rows, 1)).sort_values(ascending=True),
+        'loyalty_edges': np.linspace(*params['ranges']['LoyaltyIndex'], 16),
+        'loyalty_hist': loyalty_hist,
+    }
+
+
+def feature_matrix(cols, index, params):
+    """Standardized CLUSTER_FEATURES (rows x features) for a slice or an array of row indices"""
+    mean, std = params['feature_mean'], params['feature_std']
+    first = cols[CLUSTER_FEATURES[0]][index]
+    x = np.empty((len(first), len(CLUSTER_FEATURES)))
+    for j, field in enumerate(CLUSTER_FEATURES):
+        x[:, j] = (first if j == 0 else cols[field][index]) - mean[j]
+        x[:, j] /= std[j]
+    return np.nan_to_num(x, copy=False)
+
+
+def nearest_centroid(x, centroids):
+    """Closest centroid per row and the squared distance to it"""
+    # ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2, one matrix product for all rows and centroids
+    scores = x @ (-2 * centroids.T) + (centroids ** 2).sum(axis=1)
+    codes = scores.argmin(axis=1)
+    distances = scores[np.arange(len(x)), codes] + (x ** 2).sum(axis=1)
+    return codes, np.maximum(distances, 0)
+
+
+def partial_cluster_step(cols, start, stop, params):
+    """Per-centroid sums and counts of one random mini-batch drawn from the row range"""
+    centroids = params['centroids']
+    k = len(centroids)
+    n = stop - start
+    take = min(n, int(round(params['batch_fraction'] * n)))
+    if take == 0:
+        return {'batch_sums': np.zeros_like(centroids), 'batch_counts': np.zeros(k), 'batch_inertia': np.zeros(1)}
+    rng = np.random.default_rng([params['seed'], params['step'], start])
+    # Sorted indices keep reads from the (possibly memory-mapped) columns sequential
+    rows = np.sort(rng.integers(start, stop, take))
+    x = feature_matrix(cols, rows, params)
+    codes, distances = nearest_centroid(x, centroids)
+    return {
+        'batch_sums': np.stack([np.bincount(codes, weights=x[:, j], minlength=k) for j in range(x.shape[1])], axis=1),
+        'batch_counts': np.bincount(codes, minlength=k).astype(np.float64),
+        'batch_inertia': np.array([distances.sum()]),
+    }
+
+
+def partial_clusters(cols, start, stop, params):
+    """Assign every row to its nearest centroid (in blocks) and aggregate like segmentation"""
+    centroids = params['centroids']
+    inertia = 0.0
+    for a in range(start, stop, MOMENT_BLOCK_ROWS):
+        b = min(a + MOMENT_BLOCK_ROWS, stop)
+        codes, distances = nearest_centroid(feature_matrix(cols, slice(a, b), params), centroids)
+        cols[CLUSTER_CODE_COLUMN][a:b] = codes
+        inertia += distances.sum()
+    codes = cols[CLUSTER_CODE_COLUMN][start:stop]
+    result = segment_partials(cols, start, stop, codes, len(centroids), params)
+    result['cluster_inertia'] = np.array([inertia])
+    return result
+
+
+def partial_correlation(cols, start, stop, params):
+    fields = params['range_fields']
+    return moment_partials(cols, start, stop, fields, range_shift(params['ranges'], fields), 'moment')
+
+
+def finalize_correlation(merged, params):
+    fields = params['range_fields']
+    result = finalize_moments(merged, fields, range_shift(params['ranges'], fields), 'moment')
+    # Strongest relationships first, each unordered pair once
+    upper = np.triu(np.ones((len(fields), len(fields)), dtype=bool), k=1)
+    pairs = result['correlation'].where(upper).stack()
+    pairs.index = [f'{a} ↔ {b}' for a, b in pairs.index]
+    result['top_pairs'] = pairs.reindex(pairs.abs().sort_values(ascending=False).index)
+    return result
+
+
+def _safe_mean(sums, counts):
+    counts = np.asarray(counts, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, np.asarray(sums) / counts, np.nan)
+
+
+# Kernels are looked up by name so worker processes never receive pickled functions
+KERNELS = {
+    'ranges': partial_ranges,
+    'demographics': partial_demographics,
+    'behavior': partial_behavior,
+    'monetization': partial_monetization,
+    'social': partial_social,
+    'segmentation': partial_segmentation,
+    'correlation': partial_correlation,
+    'cluster_step': partial_cluster_step,
+    'clusters': partial_clusters,
+}
+
+ANALYSES = {
+    'demographics': {'ranges': TREND_FIELDS, 'finalize': finalize_demographics},
+    'behavior': {'ranges': ['PlayTimeHours'], 'finalize': finalize_behavior},
+    'monetization': {'ranges': ['InGamePurchases'], 'finalize': finalize_monetization},
+    'social': {'ranges': ['ToxicityLevel', 'RageQuitFrequency'], 'finalize': finalize_social},
+    'segmentation': {'ranges': ['LoyaltyIndex'], 'finalize': finalize_segmentation},
+    'correlation': {'ranges': NUMERIC_FIELDS, 'finalize': finalize_correlation},
+}
+
+
+def run_kernel(kernel, cols, start, stop, params):
+    return KERNELS[kernel](cols, start, stop, params)
+
+
+class SerialExecutor:
+    """Runs each kernel over the full column range in the calling process"""
+    name = 'serial'
+
+    def map_reduce(self, kernel, columns, params):
+        return run_kernel(kernel, columns.arrays, 0, columns.rows, params)
+
+    def map_chunks(self, kernel, columns, params, bounds):
+        """Unmerged partials, one per (start, stop) row range"""
+        return [run_kernel(kernel, columns.arrays, start, stop, params) for start, stop in bounds]
+
+    def shutdown(self):
+        pass
+
+
+def compute_analysis(analysis, columns, executor=None):
+    """Compute the chart tables of one analysis with the given executor"""
+    executor = executor or SerialExecutor()
+    spec = ANALYSES[analysis]
+    params = {'categories': columns.categories, 'range_fields': spec['ranges']}
+    ranges = executor.map_reduce('ranges', columns, params)
+    params['ranges'] = finalize_ranges(ranges, spec['ranges'])
+    merged = executor.map_reduce(analysis, columns, params)
+    return spec['finalize'](merged, params)
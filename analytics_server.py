@@ -0,0 +1,392 @@
+# Multi-user analytics service
+# Loads the dataset once, computes each analysis once per dataset version and serves the
+# aggregate tables and pre-rendered chart PNGs over a small asyncio HTTP/JSON API.
+# Identical requests that arrive while a computation is running share its result.
+# Usage: python analytics_server.py [--host H] [--port P] [--parallel]
+
+import argparse
+import asyncio
+import json
+import math
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+import charts
+from aggregates import ANALYSES, ColumnSet, SerialExecutor, compute_analysis
+from data_sources import clean_players, create_data_source, load_source_config
+from materialized_views import dataset_watermark
+from parallel_backend import ParallelExecutor, SharedColumnStore
+from render_cache import RenderCache
+
+DEFAULT_PORT = 8765
+# Rows shipped for scatter plots and thin-client overviews
+POINT_ROWS = 5000
+CHART_CACHE_BYTES = 256 * 2**20
+CHART_PIXEL_RANGE = (200, 4000)
+CHART_DPI_RANGE = (50, 300)
+
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class HttpError(Exception):
+    """Maps to an HTTP error response"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def encode_value(value):
+    """JSON-safe form of an aggregate table (Series, DataFrames, arrays, nested dicts; NaN -> null)"""
+    if isinstance(value, pd.DataFrame):
+        return {'__frame__': {'index': [encode_value(i) for i in value.index],
+                              'columns': [encode_value(c) for c in value.columns],
+                              'values': encode_value(value.to_numpy(dtype=np.float64))}}
+    if isinstance(value, pd.Series):
+        return {'__series__': {'index': [encode_value(i) for i in value.index],
+                               'values': encode_value(value.to_numpy(dtype=np.float64))}}
+    if isinstance(value, np.ndarray):
+        return {'__array__': [encode_value(v) for v in value.tolist()]}
+    if isinstance(value, dict):
+        return {str(key): encode_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode_value(item) for item in value]
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value) if math.isfinite(value) else None
+    return value
+
+
+def decode_value(value):
+    """Inverse of encode_value"""
+    if isinstance(value, dict):
+        if '__series__' in value:
+            series = value['__series__']
+            values = np.array([np.nan if v is None else v for v in series['values']['__array__']], dtype=np.float64)
+            return pd.Series(values, index=series['index'])
+        if '__frame__' in value:
+            frame = value['__frame__']
+            return pd.DataFrame(decode_value(frame['values']), index=frame['index'], columns=frame['columns'])
+        if '__array__' in value:
+            return np.array([np.nan if v is None else v for v in value['__array__']], dtype=np.float64)
+        return {key: decode_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decode_value(item) for item in value]
+    return np.nan if value is None else value
+
+
+class AnalyticsService:
+    """Shared dataset, per-version results cache and chart cache with request coalescing"""
+
+    def __init__(self, config, parallel=False, compute_threads=2, point_rows=POINT_ROWS,
+                 chart_cache_bytes=CHART_CACHE_BYTES, chart_cache_dir=None):
+        self.config = config
+        self.point_rows = point_rows
+        self.source = create_data_source(config)
+        self.executor = ParallelExecutor() if parallel else SerialExecutor()
+
+        self.version = 0
+        self.watermark = None
+        self.data = None
+        self.columns = None
+        self.points = None
+        self._store = None
+
+        self._results = {}
+        # Chart keys carry the dataset watermark, so entries survive restarts but never go stale
+        self.charts = RenderCache(chart_cache_dir, memory_budget=chart_cache_bytes)
+        self._inflight = {}
+        self._reload_lock = asyncio.Lock()
+        # Kernels release the GIL in NumPy; matplotlib is kept on a single thread
+        self._compute_pool = ThreadPoolExecutor(max_workers=compute_threads, thread_name_prefix='analytics-compute')
+        self._render_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='analytics-render')
+        self.stats = {'requests': 0, 'computations': 0, 'renders': 0, 'cache_hits': 0, 'coalesced': 0}
+
+    def _load_dataset(self):
+        data = clean_players(self.source.load())
+        columns = ColumnSet.from_frame(data)
+        points = data.sample(n=min(self.point_rows, len(data)), random_state=0) if len(data) else data
+        # Small datasets are computed in-process anyway; they skip the shared copy
+        parallel = isinstance(self.executor, ParallelExecutor) and not self.executor.runs_serially(columns.rows)
+        store = SharedColumnStore(columns) if parallel else None
+        return data, columns, points.reset_index(drop=True), store, dataset_watermark(columns)
+
+    async def reload(self):
+        """Load a new dataset version; cached results of older versions are dropped"""
+        loop = asyncio.get_running_loop()
+        async with self._reload_lock:
+            data, columns, points, store, watermark = await loop.run_in_executor(self._compute_pool, self._load_dataset)
+            # Let computations on the old version finish before its shared columns go away
+            pending = list(self._inflight.values())
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            old_store = self._store
+            self.data, self.columns, self.points, self._store = data, columns, points, store
+            self.watermark = watermark
+            self.version += 1
+            self._results.clear()
+            if old_store is not None:
+                old_store.close()
+        return self.health()
+
+    def health(self):
+        return {'status': 'ok', 'source': self.source.describe(), 'version': self.version,
+                'watermark': self.watermark, 'rows': 0 if self.columns is None else self.columns.rows,
+                'load_metrics': self.source.last_metrics, 'stats': dict(self.stats),
+                'cached_results': len(self._results), 'chart_cache': self.charts.describe()}
+
+    async def _coalesce(self, lookup, key, produce):
+        """Cached value of `key`, else one shared computation for all concurrent callers"""
+        cached = lookup(key)
+        if cached is not None:
+            self.stats['cache_hits'] += 1
+            return cached
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(produce())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.stats['coalesced'] += 1
+        # shield: one client disconnecting must not cancel the work others wait on
+        return await asyncio.shield(future)
+
+    def snapshot(self):
+        """(version, watermark, columns, points) of the served dataset, read together
+
+        reload() swaps all four without awaiting in between, so a snapshot is one version.
+        """
+        return self.version, self.watermark, self._store or self.columns, self.points
+
+    async def results(self, analysis, snapshot=None):
+        """Aggregate tables of one analysis for the snapshot's (default: current) dataset version"""
+        if analysis not in ANALYSES:
+            raise HttpError(404, f"Unknown analysis: {analysis}")
+        version, _, columns, _ = snapshot or self.snapshot()
+
+        async def produce():
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(self._compute_pool, compute_analysis, analysis, columns, self.executor)
+            self.stats['computations'] += 1
+            if version == self.version:
+                self._results[(version, analysis)] = results
+            return results
+        return await self._coalesce(self._results.get, (version, analysis), produce)
+
+    async def chart(self, analysis, width, height, dpi):
+        """PNG of one analysis tab at a given canvas size and resolution"""
+        # Results, points and cache key all come from one version, even if a reload lands mid-request
+        snapshot = self.snapshot()
+        _, watermark, _, points = snapshot
+        key = (watermark, analysis, 'exact', width, height, dpi, 'png')
+
+        async def produce():
+            results = await self.results(analysis, snapshot)
+            loop = asyncio.get_running_loop()
+            png = await loop.run_in_executor(self._render_pool, charts.render_png, analysis, results, points,
+                                             (width / dpi, height / dpi), dpi)
+            self.stats['renders'] += 1
+            self.charts.put(key, png)
+            return png
+        return await self._coalesce(self.charts.get, key, produce)
+
+    def point_payload(self, limit):
+        points = self.points.head(limit)
+        return {'version': self.version,
+                'columns': {name: (points[name].astype(object).tolist() if not pd.api.types.is_numeric_dtype(points[name])
+                                   else encode_value(points[name].to_numpy(dtype=np.float64)))
+                            for name in points.columns}}
+
+    def close(self):
+        self._compute_pool.shutdown(wait=False, cancel_futures=True)
+        self._render_pool.shutdown(wait=False, cancel_futures=True)
+        if hasattr(self.executor, 'shutdown'):
+            self.executor.shutdown()
+        if self._store is not None:
+            self._store.close()
+        self.source.close()
+
+
+class AnalyticsServer:
+    """Minimal HTTP/1.1 (keep-alive) front end for an AnalyticsService"""
+
+    def __init__(self, service):
+        self.service = service
+        self._server = None
+
+    async def start(self, host='127.0.0.1', port=DEFAULT_PORT):
+        if self.service.columns is None:
+            await self.service.reload()
+        self._server = await asyncio.start_server(self._handle, host, port, backlog=1024)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, http_version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                if int(headers.get('content-length', 0)):
+                    await reader.readexactly(int(headers['content-length']))
+
+                status, content_type, body, etag = await self._respond(method, target, headers)
+                keep_alive = http_version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                        f"Content-Type: {content_type}",
+                        f"Content-Length: {len(body)}",
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                if etag:
+                    head.append(f'ETag: "{etag}"')
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method, target, headers):
+        service = self.service
+        service.stats['requests'] += 1
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split('/') if part]
+        try:
+            if method == 'POST' and parts == ['reload']:
+                return self._json(await service.reload())
+            if method != 'GET':
+                raise HttpError(405, f"{method} not supported")
+
+            etag = f"{service.watermark}:{url.path}?{url.query}"
+            if headers.get('if-none-match', '').strip('"') == etag:
+                return 304, 'application/json', b'', etag
+
+            if parts == ['health']:
+                return self._json(service.health())
+            if parts == ['analyses']:
+                return self._json({'version': service.version, 'analyses': list(ANALYSES)})
+            if len(parts) == 2 and parts[0] == 'analyses':
+                snapshot = service.snapshot()
+                results = await service.results(parts[1], snapshot)
+                return self._json({'version': snapshot[0], 'analysis': parts[1],
+                                   'results': encode_value(results)}, etag)
+            if len(parts) == 2 and parts[0] == 'charts' and parts[1].endswith('.png'):
+                width = _bounded_int(query, 'w', 1400, CHART_PIXEL_RANGE)
+                height = _bounded_int(query, 'h', 1000, CHART_PIXEL_RANGE)
+                dpi = _bounded_int(query, 'dpi', 100, CHART_DPI_RANGE)
+                png = await service.chart(parts[1][:-len('.png')], width, height, dpi)
+                return 200, 'image/png', png, etag
+            if parts == ['points']:
+                limit = _bounded_int(query, 'limit', service.point_rows, (1, service.point_rows))
+                return self._json(service.point_payload(limit), etag)
+            raise HttpError(404, f"No route for {url.path}")
+        except HttpError as e:
+            return self._json({'error': str(e)}, status=e.status)
+        except Exception as e:
+            return self._json({'error': str(e)}, status=500)
+
+    def _json(self, payload, etag=None, status=200):
+        return status, 'application/json', json.dumps(payload).encode(), etag
+
+
+def _bounded_int(query, name, default, bounds):
+    try:
+        value = int(query.get(name, default))
+    except ValueError:
+        raise HttpError(400, f"{name} must be an integer")
+    if not bounds[0] <= value <= bounds[1]:
+        raise HttpError(400, f"{name} must be between {bounds[0]} and {bounds[1]}")
+    return value
+
+
+class RemoteAnalytics:
+    """Blocking client for the analytics server, used by the dashboard's thin-client mode"""
+
+    def __init__(self, url, timeout=120):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.last_metrics = {}
+
+    def _request(self, path, method='GET'):
+        started = time.perf_counter()
+        request = urllib.request.Request(self.url + path, method=method)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            body = response.read()
+        elapsed = time.perf_counter() - started
+        self.last_metrics = {'total_s': elapsed, 'bytes': len(body)}
+        return body
+
+    def describe(self):
+        return f"analytics server {self.url}"
+
+    def health(self):
+        return json.loads(self._request('/health'))
+
+    def reload(self):
+        return json.loads(self._request('/reload', method='POST'))
+
+    def results(self, analysis):
+        return decode_value(json.loads(self._request(f'/analyses/{analysis}'))['results'])
+
+    def chart_png(self, analysis, width=1400, height=1000, dpi=100):
+        return self._request(f'/charts/{analysis}.png?w={width}&h={height}&dpi={dpi}')
+
+    def points(self):
+        """Sample player rows (all columns) for scatter plots and the data overview"""
+        payload = json.loads(self._request('/points'))
+        return pd.DataFrame({name: decode_value(values) for name, values in payload['columns'].items()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gaming Analytics multi-user server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--parallel', action='store_true', help="compute analyses on the process pool")
+    parser.add_argument('--chart-cache-dir', default=None, help="spill rendered charts to this directory")
+    args = parser.parse_args()
+
+    async def run():
+        service = AnalyticsService(load_source_config(), parallel=args.parallel, chart_cache_dir=args.chart_cache_dir)
+        server = AnalyticsServer(service)
+        try:
+            host, port = await server.start(args.host, args.port)
+            health = service.health()
+            print(f"🎮 Gaming Analytics server on http://{host}:{port} "
+                  f"({health['rows']:,} players from {health['source']})")
+            await server.serve_forever()
+        finally:
+            service.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
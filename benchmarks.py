@@ -0,0 +1,395 @@
+# Benchmark suite for the Gaming Analytics Dashboard data paths
+# Usage: python benchmarks.py <benchmark> [--rows N] [--workers N] [--clients N] [--max-stall-ms MS]
+
+import argparse
+import asyncio
+import os
+import random
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from aggregates import ANALYSES, ColumnSet, SerialExecutor, compute_analysis
+from data_sources import create_data_source, load_source_config, synthetic_players
+
+
+def timed(func, repeat=3):
+    """Best wall-clock time of `repeat` calls, in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_parallel(args):
+    """Serial vs shared-memory process pool, per analysis (speedup and per-worker efficiency)"""
+    from parallel_backend import PARALLEL_MIN_ROWS, ParallelExecutor, SharedColumnStore
+
+    columns = ColumnSet.from_frame(synthetic_players(args.rows))
+    store = SharedColumnStore(columns)
+    serial = SerialExecutor()
+    pool = ParallelExecutor(workers=args.workers)
+    try:
+        # Warm the pool so process start-up is not billed to the first analysis
+        compute_analysis('behavior', store, pool)
+        mode = ("in-process (one worker)" if pool.workers <= 1 else
+                f"in-process below {PARALLEL_MIN_ROWS:,} rows" if pool.runs_serially(args.rows) else
+                f"{len(pool.chunk_bounds(args.rows))} chunks")
+        print(f"{pool.workers} workers on {os.cpu_count()} CPUs, {args.rows:,} rows, {mode}")
+        if pool.workers > (os.cpu_count() or 1):
+            print("⚠️ More workers than CPUs: the pool cannot scale past the core count")
+        print(f"{'analysis':<14}{'serial s':>10}{'parallel s':>12}{'speedup':>9}{'efficiency':>12}")
+        for analysis in ANALYSES:
+            t_serial = timed(lambda: compute_analysis(analysis, columns, serial))
+            t_parallel = timed(lambda: compute_analysis(analysis, store, pool))
+            speedup = t_serial / t_parallel
+            print(f"{analysis:<14}{t_serial:>10.3f}{t_parallel:>12.3f}{speedup:>8.1f}x{speedup / pool.workers:>11.0%}")
+    finally:
+        pool.shutdown()
+        store.close()
+
+
+def bench_source(args):
+    """Cold vs warm load of the configured data source (connect, first batch, throughput)"""
+    source = create_data_source(load_source_config())
+    try:
+        for label in ('cold', 'warm'):
+            source.load()
+            metrics = ', '.join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}"
+                                for k, v in source.last_metrics.items())
+            print(f"{label:<5} {source.describe()}: {metrics}")
+    finally:
+        source.close()
+
+
+def bench_bins(args):
+    """Per-chart pd.cut + groupby vs bincount over precomputed uint8 bin-code columns"""
+    from aggregates import (AGE_GROUP_BINS, AGE_GROUP_LABELS, SLEEP_RISK_BINS, SLEEP_RISK_LABELS,
+                            SPENDING_TIER_BINS, SPENDING_TIER_LABELS, count_codes, derive_bin_columns)
+
+    data = synthetic_players(args.rows)
+    columns = ColumnSet.from_frame(data)
+    arrays = columns.arrays
+    t_ingest = timed(lambda: derive_bin_columns(arrays))
+    print(f"ingest: all derived code columns in {t_ingest:.3f}s once ({args.rows:,} rows)")
+
+    charts = {
+        'sessions by age group': (
+            lambda: data.groupby(pd.cut(data['Age'], bins=AGE_GROUP_BINS, labels=AGE_GROUP_LABELS),
+                                 observed=False)['SessionsPerWeek'].mean(),
+            lambda: count_codes(arrays['AgeGroupCode'], len(AGE_GROUP_LABELS), arrays['SessionsPerWeek'])
+            / count_codes(arrays['AgeGroupCode'], len(AGE_GROUP_LABELS))),
+        'spending tiers': (
+            lambda: pd.cut(data['InGamePurchases'], bins=SPENDING_TIER_BINS,
+                           labels=SPENDING_TIER_LABELS).value_counts(),
+            lambda: count_codes(arrays['SpendingTierCode'], len(SPENDING_TIER_LABELS))),
+        'sleep risk': (
+            lambda: pd.cut(data['SleepDeprivationRisk'], bins=SLEEP_RISK_BINS,
+                           labels=SLEEP_RISK_LABELS).value_counts(),
+            lambda: count_codes(arrays['SleepRiskCode'], len(SLEEP_RISK_LABELS))),
+    }
+    print(f"{'chart':<24}{'pd.cut s':>10}{'bincount s':>12}{'speedup':>9}")
+    for chart, (baseline, kernel) in charts.items():
+        t_cut, t_codes = timed(baseline), timed(kernel)
+        print(f"{chart:<24}{t_cut:>10.3f}{t_codes:>12.3f}{t_cut / t_codes:>8.1f}x")
+
+
+def bench_correlation(args):
+    """pandas corr()/np.polyfit vs one streamed sufficient-statistics pass (serial and pooled)"""
+    from aggregates import NUMERIC_FIELDS
+    from parallel_backend import ParallelExecutor, SharedColumnStore
+
+    data = synthetic_players(args.rows)
+    columns = ColumnSet.from_frame(data)
+    store = SharedColumnStore(columns)
+    pool = ParallelExecutor(workers=args.workers)
+    try:
+        compute_analysis('behavior', store, pool)
+        t_pandas = timed(lambda: data[NUMERIC_FIELDS].corr(), repeat=1)
+        t_polyfit = timed(lambda: np.polyfit(data['Age'], data['PlayTimeHours'], 1), repeat=1)
+        t_serial = timed(lambda: compute_analysis('correlation', columns))
+        t_parallel = timed(lambda: compute_analysis('correlation', store, pool))
+        print(f"{args.rows:,} rows x {len(NUMERIC_FIELDS)} fields, {pool.workers} workers")
+        print(f"pandas corr():           {t_pandas:.3f}s")
+        print(f"np.polyfit (1 pair):     {t_polyfit:.3f}s")
+        print(f"streamed, serial:        {t_serial:.3f}s ({t_pandas / t_serial:.1f}x)")
+        print(f"streamed, process pool:  {t_parallel:.3f}s ({t_pandas / t_parallel:.1f}x)")
+    finally:
+        pool.shutdown()
+        store.close()
+
+
+def bench_clusters(args):
+    """Mini-batch k-means fit time (cold vs warm start) and assignment throughput"""
+    from clustering import assign_clusters, fit_clusters
+    from parallel_backend import ParallelExecutor, SharedColumnStore
+
+    columns = ColumnSet.from_frame(synthetic_players(args.rows))
+    store = SharedColumnStore(columns)
+    pool = ParallelExecutor(workers=args.workers)
+    try:
+        compute_analysis('behavior', store, pool)
+        print(f"{'executor':<10}{'cold fit s':>11}{'steps':>7}{'warm fit s':>11}{'steps':>7}{'assign rows/s':>15}")
+        for label, cols, executor in (('serial', columns, SerialExecutor()), ('parallel', store, pool)):
+            start = time.perf_counter()
+            model = fit_clusters(cols, executor)
+            t_cold = time.perf_counter() - start
+            start = time.perf_counter()
+            warm = fit_clusters(cols, executor, warm_start=model, seed=1)
+            t_warm = time.perf_counter() - start
+            t_assign = timed(lambda: assign_clusters(cols, executor, warm), repeat=1)
+            print(f"{label:<10}{t_cold:>11.2f}{model.steps:>7}{t_warm:>11.2f}{warm.steps:>7}"
+                  f"{args.rows / t_assign:>15,.0f}")
+    finally:
+        pool.shutdown()
+        store.close()
+
+
+def raw_bson_batches(data, batch_size=2000):
+    """Local Mongo stand-in: the raw batches a server would send for `data`"""
+    import bson
+
+    records = data.astype({field: str for field in data.select_dtypes('category').columns}).to_dict('records')
+    for record in records:
+        record['PlayerID'] = int(record['PlayerID'])
+    return [b''.join(bson.encode(record) for record in records[i:i + batch_size])
+            for i in range(0, len(records), batch_size)]
+
+
+def traced(func):
+    """(seconds, peak traced MiB, result) of one call"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def bench_index(args):
+    """PlayerID lookup and top-k whales: boolean-mask scans vs the block index"""
+    from player_index import PlayerIndex
+
+    data = synthetic_players(args.rows)
+    columns = ColumnSet.from_frame(data)
+    started = time.perf_counter()
+    index = PlayerIndex.build(data, columns)
+    print(f"build: {time.perf_counter() - started:.2f}s ({index.describe()}, {args.rows:,} rows)")
+    # Refresh with the last block changed: every other block is reused
+    changed = data.copy()
+    changed.loc[changed.index[-1], 'InGamePurchases'] += 1
+    started = time.perf_counter()
+    refreshed = PlayerIndex.build(changed, ColumnSet.from_frame(changed), previous=index)
+    print(f"refresh (one block changed): {time.perf_counter() - started:.2f}s ({refreshed.describe()})")
+
+    player_id = int(data['PlayerID'].iloc[args.rows // 2])
+    queries = {
+        'show player': (lambda: data[data['PlayerID'] == player_id],
+                        lambda: data.iloc[index.lookup(player_id)]),
+        'top 100 RPG whales': (lambda: data[data['GameGenre'] == 'RPG'].nlargest(100, 'InGamePurchases'),
+                               lambda: data.iloc[index.top_k('InGamePurchases', 100, 'RPG')[0]]),
+    }
+    print(f"{'query':<22}{'scan ms':>10}{'index ms':>10}")
+    for name, (scan, indexed) in queries.items():
+        print(f"{name:<22}{timed(scan) * 1000:>10.2f}{timed(indexed, repeat=20) * 1000:>10.3f}")
+
+
+def bench_validation(args):
+    """Legacy to_numeric/fillna cleaning vs schema validation with quarantine, on dirty data"""
+    from validation import validate_players
+
+    data = synthetic_players(args.rows)
+    rng = np.random.default_rng(7)
+    # data.csv-style text levels plus a sprinkling of nulls, junk and out-of-range values
+    for field in ('SleepDeprivationRisk', 'ToxicityLevel'):
+        data[field] = pd.cut(data[field], [-1, 3, 6, 10], labels=['Low', 'Medium', 'High']).astype(object)
+    dirty = rng.random(args.rows) < 0.01
+    data.loc[dirty & (rng.random(args.rows) < 0.4), 'Age'] = 150
+    data.loc[dirty & (rng.random(args.rows) < 0.4), 'InGamePurchases'] = np.nan
+    data.loc[dirty & (rng.random(args.rows) < 0.2), 'ToxicityLevel'] = 'n/a'
+
+    def legacy():
+        cleaned = data.copy()
+        for field in ('SleepDeprivationRisk', 'ToxicityLevel', 'InGamePurchases', 'Age'):
+            cleaned[field] = pd.to_numeric(cleaned[field], errors='coerce').fillna(0)
+        return cleaned[(cleaned['Age'] >= 10) & (cleaned['Age'] <= 80)]
+
+    t_legacy = timed(legacy, repeat=1)
+    started = time.perf_counter()
+    clean, report = validate_players(data)
+    t_schema = time.perf_counter() - started
+    print(f"legacy cleaning:   {t_legacy:.2f}s ({args.rows / t_legacy:,.0f} rows/s, text levels zeroed)")
+    print(f"schema validation: {t_schema:.2f}s ({report.describe()})")
+    for rule, count in report.counts().items():
+        print(f"   {rule:<32}{count:>12,}")
+
+
+def bench_ui(args):
+    """Worst Tk event-loop stall per analysis; headless: xvfb-run python benchmarks.py ui --rows N"""
+    import tkinter as tk
+    from data_sources import clean_players
+    from gaming_analytics_dashboard_fixed import GamingAnalyticsDashboard
+
+    root = tk.Tk()
+    app = GamingAnalyticsDashboard(root, autoload=False)
+    app.data = clean_players(synthetic_players(args.rows))
+    app.on_data_changed()
+    # Measure computing and drawing, not materialized-view reuse
+    app.use_views_var.set(False)
+    watchdog = app.watchdog
+
+    def pump(seconds):
+        until = time.perf_counter() + seconds
+        while time.perf_counter() < until:
+            root.update()
+            time.sleep(0.001)
+
+    failures = []
+    try:
+        pump(0.5)
+        print(f"{'analysis':<14}{'max stall ms':>14}{'stalls':>8}  ({args.rows:,} rows, "
+              f"{watchdog.interval_ms} ms heartbeat)")
+        for analysis in ANALYSES:
+            finished = []
+
+            def task(analysis=analysis):
+                with watchdog.activity(analysis):
+                    getattr(app, f'run_{analysis}_analysis')()
+                finished.append(analysis)
+
+            watchdog.reset()
+            root.after(0, task)
+            while not finished:
+                root.update()
+                time.sleep(0.001)
+            # A few more heartbeats so the late tick of the stall is recorded
+            pump(4 * watchdog.interval_ms / 1000)
+            print(f"{analysis:<14}{watchdog.max_lag_ms:>14.0f}{len(watchdog.stalls):>8}  {watchdog.format_histogram()}")
+            if args.max_stall_ms is not None and watchdog.max_lag_ms > args.max_stall_ms:
+                failures.append(analysis)
+    finally:
+        watchdog.stop()
+        root.destroy()
+    if failures:
+        raise SystemExit(f"UI stalled longer than {args.max_stall_ms} ms in: {', '.join(failures)}")
+
+
+def bench_bson(args):
+    """Dict-per-document decode vs raw-BSON columnar decode of Mongo batches"""
+    import bson
+    from bson_columnar import ColumnarBatchDecoder
+
+    batches = raw_bson_batches(synthetic_players(args.rows))
+    print(f"{args.rows:,} players in {len(batches)} raw batches ({sum(map(len, batches)) / 2**20:,.0f} MiB of BSON)")
+
+    def documents():
+        docs = []
+        for batch in batches:
+            docs.extend(bson.decode_all(batch))
+        return pd.DataFrame(docs)
+
+    def columnar():
+        decoder = ColumnarBatchDecoder()
+        for batch in batches:
+            decoder.add_batch(batch)
+        return decoder.frame()
+
+    print(f"{'decoder':<12}{'seconds':>9}{'rows/s':>14}{'peak MiB':>10}")
+    for label, decode in (('documents', documents), ('columnar', columnar)):
+        elapsed, peak, frame = traced(decode)
+        print(f"{label:<12}{elapsed:>9.2f}{len(frame) / elapsed:>14,.0f}{peak:>10,.0f}")
+
+
+async def _http_get(reader, writer, path):
+    """One keep-alive GET on an open connection; returns the status code"""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode().partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+def bench_server(args):
+    """Hundreds of concurrent keep-alive clients against an in-process analytics server"""
+    from aggregates import ANALYSES
+    from analytics_server import AnalyticsServer, AnalyticsService
+
+    paths = [f'/analyses/{analysis}' for analysis in ANALYSES]
+    paths += [f'/charts/{analysis}.png?w=1400&h=1000&dpi=100' for analysis in ANALYSES]
+
+    async def client(host, port, latencies, rng):
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                status = await _http_get(reader, writer, rng.choice(paths))
+                if status == 200:
+                    latencies.append(time.perf_counter() - start)
+        finally:
+            writer.close()
+
+    async def run():
+        config = {'type': 'synthetic', 'synthetic': {'rows': args.rows}}
+        service = AnalyticsService(config, parallel=args.workers is not None)
+        server = AnalyticsServer(service)
+        try:
+            host, port = await server.start(port=0)
+            latencies = []
+            start = time.perf_counter()
+            await asyncio.gather(*(client(host, port, latencies, random.Random(i)) for i in range(args.clients)))
+            elapsed = time.perf_counter() - start
+        finally:
+            await server.stop()
+            service.close()
+
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+        stats = service.stats
+        print(f"{args.clients} clients x {args.requests} requests, {args.rows:,} rows: "
+              f"{len(latencies) / elapsed:,.0f} req/s, p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms")
+        print(f"{len(latencies):,} ok responses from {stats['computations']} computations and {stats['renders']} renders "
+              f"({stats['coalesced']} coalesced, {stats['cache_hits']} cache hits)")
+
+    asyncio.run(run())
+
+
+BENCHMARKS = {
+    'bins': bench_bins,
+    'bson': bench_bson,
+    'clusters': bench_clusters,
+    'correlation': bench_correlation,
+    'index': bench_index,
+    'parallel': bench_parallel,
+    'server': bench_server,
+    'source': bench_source,
+    'ui': bench_ui,
+    'validation': bench_validation,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gaming Analytics benchmark suite")
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=10, help="requests per client")
+    parser.add_argument('--max-stall-ms', type=float, default=None, help="ui: fail when an analysis stalls longer")
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    main()
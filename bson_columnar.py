@@ -0,0 +1,303 @@
+# Columnar decoding of MongoDB results
+# Raw BSON batches (find_raw_batches / aggregate_raw_batches) are decoded straight into
+# NumPy column buffers with the known player schema: fields are located for all documents
+# of a batch at once by vectorized gathers, so no per-document dicts are ever built.
+# pymongoarrow, when installed, does the same in C and is preferred.
+
+import numpy as np
+import pandas as pd
+import bson
+
+from aggregates import CATEGORICAL_FIELDS, NUMERIC_FIELDS
+from validation import VALIDATION_SCHEMA
+
+try:
+    import pyarrow as pa
+    from pymongoarrow.api import Schema, aggregate_arrow_all
+except ImportError:
+    pa = None
+
+# Scores some sources store as text levels ("High", as in data.csv): decoded as text, numbers
+# included, so validation can apply the ordinal mapping instead of seeing NaN
+TEXT_LEVEL_FIELDS = [field for field, spec in VALIDATION_SCHEMA.items() if 'ordinal' in spec]
+
+# 'int64' fields (PlayerID) decode as integers, but switch to text for the whole column as
+# soon as one value is a string or ObjectId ("P000001"), rather than losing those IDs as NaN
+PLAYER_SCHEMA = {
+    'PlayerID': 'int64',
+    **{field: 'string' if field in TEXT_LEVEL_FIELDS else 'float64' for field in NUMERIC_FIELDS},
+    **{field: 'string' for field in CATEGORICAL_FIELDS},
+    'PlayerType': 'string',
+    'GameDifficulty': 'string',
+}
+
+# BSON element types and their fixed value sizes (None = length-prefixed)
+BSON_DOUBLE, BSON_STRING, BSON_DOCUMENT, BSON_ARRAY, BSON_BINARY = 0x01, 0x02, 0x03, 0x04, 0x05
+BSON_OBJECT_ID, BSON_BOOL, BSON_DATETIME, BSON_NULL = 0x07, 0x08, 0x09, 0x0A
+BSON_INT32, BSON_TIMESTAMP, BSON_INT64, BSON_DECIMAL128 = 0x10, 0x11, 0x12, 0x13
+FIXED_SIZES = {BSON_DOUBLE: 8, BSON_OBJECT_ID: 12, BSON_BOOL: 1, BSON_DATETIME: 8, BSON_NULL: 0,
+               BSON_INT32: 4, BSON_TIMESTAMP: 8, BSON_INT64: 8, BSON_DECIMAL128: 16}
+NUMBER_FORMATS = {BSON_DOUBLE: '<f8', BSON_INT32: '<i4', BSON_INT64: '<i8', BSON_BOOL: 'u1'}
+HEX_DIGITS = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+# Companion column decode_arrow requests for int64 fields that hold text IDs
+ID_TEXT_SUFFIX = '__text'
+
+
+def has_pymongoarrow():
+    return pa is not None
+
+
+def arrow_schema(schema=PLAYER_SCHEMA):
+    types = {'int64': pa.int64(), 'float64': pa.float64(), 'string': pa.string()}
+    return Schema({field: types[kind] for field, kind in schema.items()})
+
+
+def document_offsets(buffer):
+    """Start offsets of the concatenated documents in a raw batch"""
+    # Each document starts with its int32 length, so the chain is inherently sequential;
+    # this loop touches four bytes per document and creates no document objects.
+    offsets = []
+    position, end = 0, len(buffer)
+    while position < end:
+        offsets.append(position)
+        position += int.from_bytes(buffer[position:position + 4], 'little')
+    return np.array(offsets, dtype=np.int64)
+
+
+def _gather(data, positions, width):
+    """(n, width) bytes starting at each position, clipped to the buffer"""
+    index = positions[:, None] + np.arange(width)
+    np.clip(index, 0, len(data) - 1, out=index)
+    return data[index]
+
+
+def _read(data, positions, fmt):
+    dtype = np.dtype(fmt)
+    return np.ascontiguousarray(_gather(data, positions, dtype.itemsize)).view(dtype).ravel()
+
+
+def _read_strings(data, positions, ok):
+    """Fixed-width bytes array of the BSON strings at positions (int32 length, bytes, NUL)"""
+    lengths = np.where(ok, _read(data, positions, '<i4') - 1, 0)
+    width = max(int(lengths.max()) if len(lengths) else 0, 1)
+    chars = _gather(data, positions + 4, width)
+    chars[np.arange(width) >= lengths[:, None]] = 0
+    return np.ascontiguousarray(chars).view(f'S{width}').ravel()
+
+
+def _read_object_ids(data, positions):
+    """24-character hex bytes of the 12-byte ObjectIds at positions"""
+    raw = _gather(data, positions, 12)
+    chars = np.empty((len(positions), 24), dtype=np.uint8)
+    chars[:, 0::2] = HEX_DIGITS[raw >> 4]
+    chars[:, 1::2] = HEX_DIGITS[raw & 0x0F]
+    return chars.view('S24').ravel()
+
+
+def _id_text(numbers):
+    """Numeric IDs as text bytes, integers without a trailing '.0' and NaN as missing (b'')"""
+    integral = np.isfinite(numbers) & (numbers == np.round(numbers))
+    text = np.where(integral, np.where(integral, numbers, 0).astype(np.int64).astype(str), numbers.astype(str))
+    return np.where(np.isnan(numbers), '', text).astype('S')
+
+
+def _text(value):
+    """A decoded value as the columnar path writes it: strings and numbers as text, else missing"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bson.ObjectId):
+        return str(value)
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (int, float)):
+        return str(value)
+    return ''
+
+
+def _number(value):
+    """A decoded value as the columnar path reads it: numbers, bools and numeric text, else NaN"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        return float(pd.to_numeric(value, errors='coerce'))
+    return np.nan
+
+
+class ColumnarBatchDecoder:
+    """Accumulates raw BSON batches as per-field column buffers"""
+
+    def __init__(self, schema=PLAYER_SCHEMA):
+        self.schema = schema
+        self.parts = {field: [] for field in schema}
+        self.rows = 0
+        # Schema fields present in at least one document (kept even when every value is null)
+        self.present = set()
+        # Documents whose layout differed from their batch's first document
+        self.fallback_rows = 0
+
+    def add_batch(self, raw_batch):
+        data = np.frombuffer(raw_batch, dtype=np.uint8)
+        starts = document_offsets(raw_batch)
+        if not len(starts):
+            return
+        columns, ok = self._decode_template(raw_batch, data, starts)
+        if not ok.all():
+            self._decode_irregular(raw_batch, starts, ok, columns)
+        for field in self.schema:
+            self.parts[field].append(columns[field])
+        self.rows += len(starts)
+
+    def _decode_template(self, raw_batch, data, starts):
+        """Walk every document along the first document's element layout at once"""
+        n = len(starts)
+        ends = starts + _read(data, starts, '<i4')
+        first = raw_batch[:int(ends[0])]
+        positions = starts + 4
+        ok = np.ones(n, dtype=bool)
+        columns = {}
+
+        position = 4
+        while first[position] != 0:
+            element_type = first[position]
+            key_end = first.index(b'\x00', position + 1)
+            key = first[position + 1:key_end]
+            # Type byte, key and terminator must match for the document to follow the layout
+            expected = np.frombuffer(bytes([element_type]) + key + b'\x00', dtype=np.uint8)
+            ok &= (_gather(data, positions, len(expected)) == expected).all(axis=1)
+            values = positions + len(expected)
+
+            field = key.decode()
+            if field in self.schema:
+                columns[field] = self._decode_values(data, values, element_type, field, ok)
+                self.present.add(field)
+
+            if element_type in FIXED_SIZES:
+                size = FIXED_SIZES[element_type]
+            elif element_type == BSON_STRING:
+                size = 4 + _read(data, values, '<i4')
+            elif element_type in (BSON_DOCUMENT, BSON_ARRAY):
+                size = _read(data, values, '<i4')
+            elif element_type == BSON_BINARY:
+                size = 5 + _read(data, values, '<i4')
+            else:
+                # No vectorized walk past this type (regex, code, ...): decode the batch per document
+                ok[:] = False
+                break
+            positions = np.where(ok, values + size, positions)
+            position = int(values[0] + (size if np.isscalar(size) else size[0]) - starts[0])
+
+        # Every document must end right after the template's last element
+        ok &= (positions + 1 == ends) & (data[np.minimum(positions, len(data) - 1)] == 0)
+        for field, kind in self.schema.items():
+            if field not in columns:
+                columns[field] = np.full(n, b'' if kind == 'string' else np.nan,
+                                         dtype='S1' if kind == 'string' else np.float64)
+        return columns, ok
+
+    def _decode_values(self, data, values, element_type, field, ok):
+        kind = self.schema[field]
+        if kind == 'int64' and element_type == BSON_OBJECT_ID:
+            return _read_object_ids(data, values)
+        if element_type == BSON_STRING:
+            strings = _read_strings(data, values, ok)
+            if kind in ('string', 'int64'):
+                return strings
+            text = pd.Series(np.char.decode(strings, 'utf-8', 'replace'))
+            return pd.to_numeric(text, errors='coerce').to_numpy(np.float64, copy=True)
+        if element_type in NUMBER_FORMATS:
+            numbers = _read(data, values, NUMBER_FORMATS[element_type])
+            return numbers.astype(str).astype('S') if kind == 'string' else numbers.astype(np.float64)
+        return np.full(len(values), b'' if kind == 'string' else np.nan, dtype='S1' if kind == 'string' else np.float64)
+
+    def _decode_irregular(self, raw_batch, starts, ok, columns):
+        """Per-document decode for the (rare) documents that broke the batch layout"""
+        ends = list(starts[1:]) + [len(raw_batch)]
+        for i in np.flatnonzero(~ok):
+            document = bson.decode(raw_batch[starts[i]:ends[i]])
+            self.present.update(field for field in document if field in self.schema)
+            for field, kind in self.schema.items():
+                value = document.get(field)
+                column = columns[field]
+                if kind == 'int64' and column.dtype.kind != 'S' and isinstance(value, (str, bson.ObjectId)):
+                    # First text ID of the batch: the batch's numeric IDs become text too
+                    column = columns[field] = _id_text(column)
+                if kind == 'string' or column.dtype.kind == 'S':
+                    if kind == 'int64' and not isinstance(value, (str, bson.ObjectId)):
+                        encoded = _id_text(np.array([_number(value)]))[0]
+                    else:
+                        encoded = _text(value).encode()
+                    if len(encoded) > column.dtype.itemsize:
+                        column = columns[field] = column.astype(f'S{len(encoded)}')
+                    column[i] = encoded
+                else:
+                    column[i] = _number(value)
+        self.fallback_rows += int((~ok).sum())
+
+    def frame(self):
+        """Concatenate the batches into the player DataFrame (strings as categoricals)"""
+        data = {}
+        for field, kind in self.schema.items():
+            parts = self.parts[field]
+            if not parts or field not in self.present:
+                continue
+            if kind == 'string':
+                width = max(part.dtype.itemsize for part in parts)
+                values = np.concatenate([part.astype(f'S{width}') for part in parts])
+                uniques, codes = np.unique(values, return_inverse=True)
+                codes = codes.astype(np.int32)
+                # Missing strings decode as b'' (sorted first) and become NaN
+                if len(uniques) and uniques[0] == b'':
+                    uniques, codes = uniques[1:], codes - 1
+                data[field] = pd.Categorical.from_codes(codes, [u.decode() for u in uniques])
+            elif kind == 'int64' and any(part.dtype.kind == 'S' for part in parts):
+                # Text IDs somewhere: the whole column is text (object dtype, None when missing)
+                texts = [part if part.dtype.kind == 'S' else _id_text(part) for part in parts]
+                width = max(part.dtype.itemsize for part in texts)
+                values = np.char.decode(np.concatenate([part.astype(f'S{width}') for part in texts]), 'utf-8')
+                values = values.astype(object)
+                values[values == ''] = None
+                data[field] = values
+            else:
+                values = np.concatenate(parts)
+                data[field] = values.astype(np.int64) if kind == 'int64' and not np.isnan(values).any() else values
+        return pd.DataFrame(data)
+
+
+def decode_arrow(collection, pipeline=None, query=None, projection=None, limit=0, schema=PLAYER_SCHEMA):
+    """Player frame through pymongoarrow (Arrow buffers filled in C)"""
+    if pipeline is None:
+        pipeline = [{'$match': query or {}}]
+        if projection:
+            pipeline.append({'$project': projection})
+        if limit:
+            pipeline.append({'$limit': limit})
+    # pymongoarrow nulls values that do not match the schema type, so text-level fields are
+    # converted to strings on the server (numbers included) rather than lost
+    text_fields = [field for field in TEXT_LEVEL_FIELDS if schema.get(field) == 'string']
+    # Non-numeric IDs (strings, ObjectIds) come back alongside as text, since the int64 column nulls them
+    id_fields = [field for field, kind in schema.items() if kind == 'int64']
+    added = {field: {'$toString': f'${field}'} for field in text_fields}
+    added.update({f'{field}{ID_TEXT_SUFFIX}': {'$cond': [{'$isNumber': f'${field}'}, None,
+                                                          {'$toString': f'${field}'}]}
+                  for field in id_fields})
+    if added:
+        pipeline = pipeline + [{'$addFields': added}]
+    arrow_fields = {**schema, **{f'{field}{ID_TEXT_SUFFIX}': 'string' for field in id_fields}}
+    table = aggregate_arrow_all(collection, pipeline, schema=arrow_schema(arrow_fields), allowDiskUse=True)
+    data = table.to_pandas()
+    for field in id_fields:
+        text = data.pop(f'{field}{ID_TEXT_SUFFIX}')
+        if field in data.columns and text.notna().any():
+            numbers = _id_text(data[field].to_numpy(np.float64, na_value=np.nan))
+            values = np.where(text.notna(), text.to_numpy(object), np.char.decode(numbers, 'utf-8')).astype(object)
+            values[values == ''] = None
+            data[field] = values
+    for field, kind in schema.items():
+        if field not in data.columns:
+            continue
+        # Arrow cannot tell an absent field from an all-null one; absent schema fields are dropped
+        if data[field].isna().all():
+            del data[field]
+        elif kind == 'string':
+            data[field] = data[field].astype('category')
+    return data
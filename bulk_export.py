@@ -0,0 +1,208 @@
+# Bulk data export
+# Streams the enriched player table (raw fields plus the dashboard's derived labels:
+# PlayerSegment, AgeGroup, SpendingTier, SleepRisk) and every chart's aggregate tables to
+# Parquet, Arrow IPC or CSV. Players are written in fixed-size row chunks partitioned by
+# GameGenre/Location (hive layout), so memory stays at one chunk whatever the table size.
+#
+# Usage: python bulk_export.py OUT_DIR [--format parquet|arrow|csv] [--rows N]
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from aggregates import (ANALYSES, DERIVED_BINS, NO_BIN, SEGMENT_LABELS, ColumnSet, SerialExecutor,
+                        compute_analysis, derived_codes, segment_codes)
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = None
+
+EXPORT_FORMATS = ['parquet', 'arrow', 'csv']
+PARTITION_FIELDS = ['GameGenre', 'Location']
+CHUNK_ROWS = 500_000
+COMPRESSION = {'parquet': 'zstd', 'arrow': 'zstd', 'csv': 'gzip'}
+EXTENSIONS = {'parquet': 'parquet', 'arrow': 'arrow', 'csv': 'csv.gz'}
+# Label columns added from the derived uint8 bin codes
+DERIVED_LABELS = {'AgeGroupCode': 'AgeGroup', 'SpendingTierCode': 'SpendingTier', 'SleepRiskCode': 'SleepRisk'}
+
+
+class ExportError(Exception):
+    """Raised when an export format is unavailable or a write fails"""
+
+
+def enriched_chunk(data, columns, start, stop):
+    """Player rows [start, stop) with the derived label columns the charts group by"""
+    chunk = data.iloc[start:stop].copy()
+    arrays = columns.arrays
+    codes = segment_codes(arrays['InGamePurchases'][start:stop], arrays['EngagementLevel'][start:stop],
+                          arrays['PlayTimeHours'][start:stop])
+    chunk['PlayerSegment'] = pd.Categorical.from_codes(codes, categories=SEGMENT_LABELS)
+    for name, label in DERIVED_LABELS.items():
+        if DERIVED_BINS[name]['source'] in arrays:
+            bins = derived_codes(arrays, name, start, stop)
+            chunk[label] = pd.Categorical.from_codes(np.where(bins == NO_BIN, -1, bins.astype(np.int64)),
+                                                     categories=DERIVED_BINS[name]['labels'])
+    for field in PARTITION_FIELDS:
+        if field in chunk.columns:
+            # Partition directory names: plain strings, missing values in their own partition
+            chunk[field] = chunk[field].astype(str).where(chunk[field].notna(), '__missing__')
+    return chunk
+
+
+def aggregate_tables(analysis, results):
+    """Flatten one analysis' results into named DataFrames (histograms as bin/count tables)"""
+    tables = {}
+    scalars = {}
+    for key, value in results.items():
+        if key.endswith('_edges'):
+            continue
+        if isinstance(value, pd.DataFrame):
+            tables[key] = value.reset_index()
+        elif isinstance(value, pd.Series):
+            tables[key] = value.rename(key).rename_axis(value.index.name or 'key').reset_index()
+        elif isinstance(value, np.ndarray) and value.ndim == 1:
+            edges = results.get(key.replace('_hist', '_edges'))
+            if edges is not None and len(edges) == len(value) + 1:
+                tables[key] = pd.DataFrame({'bin_start': edges[:-1], 'bin_end': edges[1:], 'count': value})
+            else:
+                tables[key] = pd.DataFrame({key: value})
+        elif isinstance(value, (int, float, np.integer, np.floating, str)):
+            scalars[key] = value
+        elif isinstance(value, (tuple, list)) and all(np.isscalar(v) for v in value):
+            tables[key] = pd.DataFrame({key: list(value)})
+    if scalars:
+        tables['summary'] = pd.DataFrame({'metric': list(scalars), 'value': [str(v) for v in scalars.values()]})
+    return tables
+
+
+class BulkExporter:
+    """Chunked, partitioned export of players and aggregates; progress(rows_done, rows_total)"""
+
+    def __init__(self, directory, fmt='parquet', chunk_rows=CHUNK_ROWS, progress=None):
+        if fmt not in EXPORT_FORMATS:
+            raise ExportError(f"Unknown export format: {fmt}")
+        if fmt in ('parquet', 'arrow') and pa is None:
+            raise ExportError(f"{fmt} export needs pyarrow (pip install pyarrow)")
+        self.directory = directory
+        self.fmt = fmt
+        self.chunk_rows = chunk_rows
+        self.progress = progress
+        self.report = {}
+
+    def export(self, data, columns=None, results=None, executor=None):
+        """Write players/ and aggregates/; returns a throughput report
+
+        `results` maps analysis -> already computed results; missing analyses are computed.
+        """
+        started = time.perf_counter()
+        columns = columns or ColumnSet.from_frame(data)
+        players_dir = os.path.join(self.directory, 'players')
+        if self.fmt == 'csv':
+            self._write_players_csv(data, columns, players_dir)
+        else:
+            self._write_players_arrow(data, columns, players_dir)
+        players_s = time.perf_counter() - started
+
+        results = dict(results or {})
+        for analysis in ANALYSES:
+            if analysis not in results:
+                results[analysis] = compute_analysis(analysis, columns, executor or SerialExecutor())
+        self._write_aggregates(results)
+
+        elapsed = time.perf_counter() - started
+        size = directory_bytes(self.directory)
+        self.report = {'rows': len(data), 'files': count_files(self.directory), 'bytes': size,
+                       'seconds': elapsed, 'rows_per_s': len(data) / players_s if players_s > 0 else float('inf'),
+                       'mb_per_s': size / 2**20 / elapsed if elapsed > 0 else float('inf')}
+        return self.report
+
+    def chunks(self, data, columns):
+        for start in range(0, len(data), self.chunk_rows):
+            stop = min(start + self.chunk_rows, len(data))
+            yield enriched_chunk(data, columns, start, stop)
+            if self.progress is not None:
+                self.progress(stop, len(data))
+
+    def _write_players_arrow(self, data, columns, directory):
+        # Every chunk is converted with the first chunk's schema so the files agree
+        schema = pa.Table.from_pandas(enriched_chunk(data, columns, 0, min(1, len(data))), preserve_index=False).schema
+
+        def batches():
+            for chunk in self.chunks(data, columns):
+                yield from pa.Table.from_pandas(chunk, schema=schema, preserve_index=False).to_batches()
+
+        file_format = ds.ParquetFileFormat() if self.fmt == 'parquet' else ds.IpcFileFormat()
+        options = file_format.make_write_options(compression=COMPRESSION[self.fmt])
+        ds.write_dataset(batches(), directory, schema=schema, format=file_format, file_options=options,
+                         partitioning=[field for field in PARTITION_FIELDS if field in data.columns],
+                         partitioning_flavor='hive', basename_template=f'part-{{i}}.{EXTENSIONS[self.fmt]}',
+                         existing_data_behavior='delete_matching', max_rows_per_group=self.chunk_rows)
+
+    def _write_players_csv(self, data, columns, directory):
+        # Each chunk appends one gzip member per partition file; readers see one CSV
+        fields = [field for field in PARTITION_FIELDS if field in data.columns]
+        started = set()
+        for chunk in self.chunks(data, columns):
+            groups = chunk.groupby(fields, observed=True, sort=False) if fields else [((), chunk)]
+            for key, part in groups:
+                key = key if isinstance(key, tuple) else (key,)
+                path = os.path.join(directory, *[f'{field}={value}' for field, value in zip(fields, key)],
+                                    f'part-0.{EXTENSIONS["csv"]}')
+                first = path not in started
+                if first:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    started.add(path)
+                part.drop(columns=fields).to_csv(path, mode='w' if first else 'a', header=first, index=False,
+                                                 compression=COMPRESSION['csv'])
+
+    def _write_aggregates(self, results):
+        for analysis, analysis_results in results.items():
+            directory = os.path.join(self.directory, 'aggregates', analysis)
+            os.makedirs(directory, exist_ok=True)
+            for name, table in aggregate_tables(analysis, analysis_results).items():
+                path = os.path.join(directory, f'{name}.{EXTENSIONS[self.fmt]}')
+                table.columns = [str(column) for column in table.columns]
+                if self.fmt == 'parquet':
+                    table.to_parquet(path, index=False, compression=COMPRESSION['parquet'])
+                elif self.fmt == 'arrow':
+                    table.reset_index(drop=True).to_feather(path, compression=COMPRESSION['arrow'])
+                else:
+                    table.to_csv(path, index=False, compression=COMPRESSION['csv'])
+
+
+def directory_bytes(directory):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+
+
+def count_files(directory):
+    return sum(len(names) for _, _, names in os.walk(directory))
+
+
+def format_report(report):
+    return (f"{report['rows']:,} players, {report['files']} files, {report['bytes'] / 2**20:.1f} MiB in "
+            f"{report['seconds']:.1f}s ({report['rows_per_s']:,.0f} rows/s, {report['mb_per_s']:.1f} MiB/s)")
+
+
+def main():
+    from data_sources import clean_players, synthetic_players
+
+    parser = argparse.ArgumentParser(description="Gaming Analytics bulk data export")
+    parser.add_argument('directory')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='parquet')
+    parser.add_argument('--rows', type=int, default=1_000_000, help="synthetic players to export")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    data = clean_players(synthetic_players(args.rows))
+    exporter = BulkExporter(args.directory, args.format, args.chunk_rows,
+                            progress=lambda done, total: print(f"   {done:,}/{total:,} players", flush=True))
+    print(f"📦 {format_report(exporter.export(data))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,498 @@
+# Chart drawing shared by the Tk dashboard and the analytics server
+# Every tab is drawn from its aggregate tables onto a caller-supplied figure, so the same
+# code renders into Tk canvases and into off-screen Agg figures served as PNGs.
+
+import io
+
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.figure import Figure
+
+from sampling import DEFAULT_SAMPLE_FRACTION
+
+# (rows, cols) of subplots and default figure size in inches, per analysis tab
+FIGURE_LAYOUTS = {
+    'demographics': ((2, 2), (14, 10)),
+    'behavior': ((2, 2), (14, 10)),
+    'monetization': ((2, 2), (14, 10)),
+    'social': ((2, 2), (14, 10)),
+    'segmentation': ((2, 3), (16, 10)),
+    'correlation': ((1, 2), (16, 9)),
+}
+
+
+def create_figure(analysis, size=None, dpi=100):
+    """Off-screen figure and axes grid for one analysis tab (no pyplot state involved)"""
+    (nrows, ncols), default_size = FIGURE_LAYOUTS[analysis]
+    fig = Figure(figsize=size or default_size, dpi=dpi)
+    axes = fig.subplots(nrows, ncols)
+    return fig, axes
+
+
+def render_png(analysis, results, points, size=None, dpi=100, estimated=False):
+    """PNG bytes of one analysis tab"""
+    return render_bytes(analysis, results, points, size, dpi, estimated)
+
+
+def render_bytes(analysis, results, points, size=None, dpi=100, estimated=False, fmt='png', tight=False):
+    """One analysis tab rendered off-screen as PNG, SVG or PDF bytes"""
+    fig, axes = create_figure(analysis, size, dpi)
+    RENDERERS[analysis](fig, axes, results, points, estimated)
+    return figure_bytes(fig, fmt, dpi, tight)
+
+
+def figure_bytes(fig, fmt='png', dpi=100, tight=False):
+    """Save a figure into memory instead of a file"""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, dpi=dpi, facecolor='white', bbox_inches='tight' if tight else None)
+    return buffer.getvalue()
+
+
+def estimate_suffix(estimated, fraction=DEFAULT_SAMPLE_FRACTION):
+    """Chart title note for sample-based estimates"""
+    if not estimated:
+        return ''
+    return f"\n(stratified-sample estimates, {fraction:.0%} sample, 95% CI - exact results loading)"
+
+
+def ci_errors(results, key, series):
+    """Error-bar half-widths aligned to a chart series, or None for exact results"""
+    ci = results.get(f'{key}_ci')
+    if ci is None:
+        return None
+    return ci.reindex(series.index).fillna(0).values
+
+
+def render_demographics(fig, axes, results, points, estimated=False):
+    """Draw the demographics tab from its aggregate tables"""
+    # Clear previous plots
+    for ax in axes.flat:
+        ax.clear()
+
+    # 1. Age distribution
+    age_edges = results['age_edges']
+    axes[0,0].hist(age_edges[:-1], bins=age_edges, weights=results['age_hist'],
+                            color='#3498db', alpha=0.7, edgecolor='black')
+    axes[0,0].set_title('🎂 Player Age Distribution', fontsize=14, fontweight='bold')
+    axes[0,0].set_xlabel('Age (years)')
+    axes[0,0].set_ylabel('Number of Players')
+    axes[0,0].grid(True, alpha=0.3)
+
+    # Add statistics text
+    mean_age = results['mean_age']
+    mean_age_ci = f" ±{results['mean_age_ci']:.1f}" if estimated else ''
+    axes[0,0].axvline(mean_age, color='red', linestyle='--', 
+                               label=f'Avg: {mean_age:.1f}{mean_age_ci} years')
+    axes[0,0].legend()
+
+    # 2. Age vs Play Time scatter
+    axes[0,1].scatter(points['Age'], points['PlayTimeHours'], 
+                               alpha=0.6, c='#e74c3c', s=20)
+    axes[0,1].set_title('🎮 Age vs Gaming Intensity', fontsize=14, fontweight='bold')
+    axes[0,1].set_xlabel('Age (years)')
+    axes[0,1].set_ylabel('Play Time (Hours/Week)')
+    axes[0,1].grid(True, alpha=0.3)
+
+    # Add trend line (fitted over every player, drawn from its two endpoints)
+    trend = results.get('age_trend')
+    if isinstance(trend, (tuple, list)):
+        axes[0,1].plot(trend[0], trend[1], "r--", alpha=0.8)
+
+    # 3. Location distribution (top 10)
+    location_counts = results['location_counts'].head(8)
+    bars = axes[1,0].bar(range(len(location_counts)), location_counts.values, 
+                                  yerr=ci_errors(results, 'location_counts', location_counts),
+                                  color='#f39c12', alpha=0.8, capsize=4)
+    axes[1,0].set_title('🌍 Top Gaming Locations', fontsize=14, fontweight='bold')
+    axes[1,0].set_xlabel('Location')
+    axes[1,0].set_ylabel('Number of Players')
+    axes[1,0].set_xticks(range(len(location_counts)))
+    axes[1,0].set_xticklabels(location_counts.index, rotation=45, ha='right')
+    axes[1,0].grid(True, alpha=0.3)
+
+    # Add value labels
+    for bar, value in zip(bars, location_counts.values):
+        axes[1,0].text(bar.get_x() + bar.get_width()/2, bar.get_height() + 10,
+                                f'{value:.0f}', ha='center', va='bottom', fontweight='bold')
+
+    # 4. Age groups vs Gaming Sessions
+    session_by_age = results['session_by_age']
+
+    colors = ['#e74c3c', '#3498db', '#2ecc71', '#f39c12', '#9b59b6']
+    bars = axes[1,1].bar(range(len(session_by_age)), session_by_age.values, 
+                                  yerr=ci_errors(results, 'session_by_age', session_by_age),
+                                  color=colors, alpha=0.8, capsize=4)
+    axes[1,1].set_title('⏰ Gaming Frequency by Age Group', fontsize=14, fontweight='bold')
+    axes[1,1].set_xlabel('Age Group')
+    axes[1,1].set_ylabel('Average Sessions/Week')
+    axes[1,1].set_xticks(range(len(session_by_age)))
+    axes[1,1].set_xticklabels(session_by_age.index)
+    axes[1,1].grid(True, alpha=0.3)
+
+    # Add value labels
+    for bar, value in zip(bars, session_by_age.values):
+        axes[1,1].text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1,
+                                f'{value:.1f}', ha='center', va='bottom', fontweight='bold')
+
+    # Main title
+    fig.suptitle('👥 PLAYER DEMOGRAPHICS ANALYSIS' + estimate_suffix(estimated), fontsize=16, fontweight='bold', y=0.98)
+    fig.tight_layout(rect=[0, 0.03, 1, 0.95])
+
+
+def render_behavior(fig, axes, results, points, estimated=False):
+    """Draw the behavioral patterns tab from its aggregate tables"""
+    for ax in axes.flat:
+        ax.clear()
+
+    # 1. Play time distribution
+    playtime_edges = results['playtime_edges']
+    axes[0,0].hist(playtime_edges[:-1], bins=playtime_edges, weights=results['playtime_hist'],
+                                color='#1abc9c', alpha=0.7, edgecolor='black')
+    axes[0,0].set_title('⏱️ Weekly Play Time Distribution', fontsize=14, fontweight='bold')
+    axes[0,0].set_xlabel('Hours per Week')
+    axes[0,0].set_ylabel('Number of Players')
+    axes[0,0].grid(True, alpha=0.3)
+
+    # Add intensity categories
+    casual_line = axes[0,0].axvline(x=5, color='green', linestyle='--', label='Casual (<5h)')
+    moderate_line = axes[0,0].axvline(x=15, color='orange', linestyle='--', label='Moderate (5-15h)')
+    hardcore_line = axes[0,0].axvline(x=25, color='red', linestyle='--', label='Hardcore (>25h)')
+    axes[0,0].legend()
+
+    # 2. Session patterns
+    axes[0,1].scatter(points['SessionsPerWeek'], 
+                                   points['AvgSessionDurationMinutes'],
+                                   alpha=0.6, c=points['PlayTimeHours'], cmap='viridis', s=30)
+    cbar = fig.colorbar(axes[0,1].collections[0], ax=axes[0,1])
+    cbar.set_label('Play Time (hours)')
+    axes[0,1].set_title('🎯 Session Patterns', fontsize=14, fontweight='bold')
+    axes[0,1].set_xlabel('Sessions per Week')
+    axes[0,1].set_ylabel('Average Session Duration (min)')
+    axes[0,1].grid(True, alpha=0.3)
+
+    # 3. Genre preferences with enhanced styling
+    genre_counts = results['genre_counts']
+    colors = colormaps['Set3'](np.linspace(0, 1, len(genre_counts)))
+
+    wedges, texts, autotexts = axes[1,0].pie(genre_counts.values, 
+                                                           labels=genre_counts.index, 
+                                                           autopct='%1.1f%%', 
+                                                           colors=colors,
+                                                           startangle=90)
+    axes[1,0].set_title('🎮 Game Genre Preferences', fontsize=14, fontweight='bold')
+
+    # Enhance pie chart text
+    for autotext in autotexts:
+        autotext.set_fontweight('bold')
+        autotext.set_color('white')
+
+    # 4. Player progression analysis
+    axes[1,1].scatter(points['PlayerLevel'], points['AchievementsUnlocked'],
+                                   alpha=0.6, c=points['EngagementLevel'], cmap='plasma', s=25)
+    cbar2 = fig.colorbar(axes[1,1].collections[0], ax=axes[1,1])
+    cbar2.set_label('Engagement Level')
+    axes[1,1].set_title('🏆 Player Progression vs Achievements', fontsize=14, fontweight='bold')
+    axes[1,1].set_xlabel('Player Level')
+    axes[1,1].set_ylabel('Achievements Unlocked')
+    axes[1,1].grid(True, alpha=0.3)
+
+    fig.suptitle('🎯 BEHAVIORAL PATTERNS ANALYSIS' + estimate_suffix(estimated), fontsize=16, fontweight='bold', y=0.98)
+    fig.tight_layout(rect=[0, 0.03, 1, 0.95])
+
+
+def render_monetization(fig, axes, results, points, estimated=False):
+    """Draw the monetization tab from its aggregate tables"""
+    for ax in axes.flat:
+        ax.clear()
+
+    # 1. Spending distribution (paying players only)
+    if results['paying_rows'] > 0:
+        paying_edges = results['paying_edges']
+        axes[0,0].hist(paying_edges[:-1], bins=paying_edges, weights=results['paying_hist'],
+                                       color='#27ae60', alpha=0.7, edgecolor='black')
+        axes[0,0].set_title('💰 Spending Distribution (Paying Players)', fontsize=14, fontweight='bold')
+        axes[0,0].set_xlabel('Purchase Amount ($)')
+        axes[0,0].set_ylabel('Number of Players')
+        axes[0,0].grid(True, alpha=0.3)
+
+        # Add spending tier lines
+        axes[0,0].axvline(x=10, color='blue', linestyle='--', label='Light Spender')
+        axes[0,0].axvline(x=50, color='orange', linestyle='--', label='Medium Spender')
+        axes[0,0].axvline(x=200, color='red', linestyle='--', label='Whale')
+        axes[0,0].legend()
+
+    # 2. Engagement vs Spending
+    scatter = axes[0,1].scatter(points['EngagementLevel'], 
+                                                 points['InGamePurchases'],
+                                                 alpha=0.6, c=points['LoyaltyIndex'], 
+                                                 cmap='coolwarm', s=25)
+    cbar = fig.colorbar(scatter, ax=axes[0,1])
+    cbar.set_label('Loyalty Index')
+    axes[0,1].set_title('📈 Engagement vs Spending', fontsize=14, fontweight='bold')
+    axes[0,1].set_xlabel('Engagement Level')
+    axes[0,1].set_ylabel('In-Game Purchases ($)')
+    axes[0,1].grid(True, alpha=0.3)
+
+    # 3. Revenue by Genre
+    genre_revenue = results['genre_revenue']
+    bars = axes[1,0].bar(range(len(genre_revenue)), genre_revenue.values, 
+                                          yerr=ci_errors(results, 'genre_revenue', genre_revenue),
+                                          color='#e67e22', alpha=0.8, capsize=4)
+    axes[1,0].set_title('🎯 Revenue by Game Genre', fontsize=14, fontweight='bold')
+    axes[1,0].set_xlabel('Game Genre')
+    axes[1,0].set_ylabel('Total Revenue ($)')
+    axes[1,0].set_xticks(range(len(genre_revenue)))
+    axes[1,0].set_xticklabels(genre_revenue.index, rotation=45, ha='right')
+    axes[1,0].grid(True, alpha=0.3)
+
+    # Add value labels
+    for bar, value in zip(bars, genre_revenue.values):
+        axes[1,0].text(bar.get_x() + bar.get_width()/2, bar.get_height() + 50,
+                                       f'${value:.0f}', ha='center', va='bottom', fontsize=9, fontweight='bold')
+
+    # 4. Player Spending Tiers
+    tier_counts = results['tier_counts']
+
+    colors = ['#95a5a6', '#3498db', '#f39c12', '#e74c3c', '#9b59b6']
+    wedges, texts, autotexts = axes[1,1].pie(tier_counts.values, 
+                                                               labels=tier_counts.index,
+                                                               autopct='%1.1f%%', 
+                                                               colors=colors,
+                                                               startangle=90)
+    axes[1,1].set_title('🏷️ Player Spending Tiers', fontsize=14, fontweight='bold')
+
+    # Enhance text
+    for autotext in autotexts:
+        autotext.set_fontweight('bold')
+        autotext.set_color('white')
+
+    fig.suptitle('💰 MONETIZATION ANALYSIS' + estimate_suffix(estimated), fontsize=16, fontweight='bold', y=0.98)
+    fig.tight_layout(rect=[0, 0.03, 1, 0.95])
+
+
+def render_social(fig, axes, results, points, estimated=False):
+    """Draw the social & toxicity tab from its aggregate tables"""
+    for ax in axes.flat:
+        ax.clear()
+
+    # 1. Toxicity distribution with risk zones
+    toxicity_edges = results['toxicity_edges']
+    axes[0,0].hist(toxicity_edges[:-1], bins=toxicity_edges, weights=results['toxicity_hist'],
+                              color='#e74c3c', alpha=0.7, edgecolor='black')
+    axes[0,0].set_title('⚠️ Toxicity Level Distribution', fontsize=14, fontweight='bold')
+    axes[0,0].set_xlabel('Toxicity Level (0-10)')
+    axes[0,0].set_ylabel('Number of Players')
+    axes[0,0].grid(True, alpha=0.3)
+
+    # Add risk zones
+    axes[0,0].axvline(x=3, color='yellow', linestyle='--', linewidth=2, label='Moderate Risk')
+    axes[0,0].axvline(x=6, color='orange', linestyle='--', linewidth=2, label='High Risk')
+    axes[0,0].axvline(x=8, color='red', linestyle='--', linewidth=2, label='Critical Risk')
+    axes[0,0].legend()
+
+    # 2. Social vs Team collaboration
+    scatter = axes[0,1].scatter(points['SocialInteractionScore'], 
+                                           points['TeamPlayerScore'],
+                                           alpha=0.6, c=points['ToxicityLevel'], 
+                                           cmap='RdYlGn_r', s=25)
+    cbar = fig.colorbar(scatter, ax=axes[0,1])
+    cbar.set_label('Toxicity Level')
+    axes[0,1].set_title('👥 Social Interaction vs Teamwork', fontsize=14, fontweight='bold')
+    axes[0,1].set_xlabel('Social Interaction Score')
+    axes[0,1].set_ylabel('Team Player Score')
+    axes[0,1].grid(True, alpha=0.3)
+
+    # 3. Rage quit frequency analysis
+    ragequit_edges = results['ragequit_edges']
+    axes[1,0].hist(ragequit_edges[:-1], bins=ragequit_edges, weights=results['ragequit_hist'],
+                              color='#e67e22', alpha=0.7, edgecolor='black')
+    axes[1,0].set_title('😡 Rage Quit Patterns', fontsize=14, fontweight='bold')
+    axes[1,0].set_xlabel('Rage Quit Frequency')
+    axes[1,0].set_ylabel('Number of Players')
+    axes[1,0].grid(True, alpha=0.3)
+
+    # Add frequency categories
+    axes[1,0].axvline(x=3, color='green', linestyle='--', label='Low (<3)')
+    axes[1,0].axvline(x=6, color='orange', linestyle='--', label='High (>6)')
+    axes[1,0].legend()
+
+    # 4. Sleep deprivation risk assessment
+    risk_counts = results['risk_counts']
+
+    colors = ['#27ae60', '#f39c12', '#e74c3c', '#8e44ad']
+    wedges, texts, autotexts = axes[1,1].pie(risk_counts.values, 
+                                                        labels=risk_counts.index,
+                                                        autopct='%1.1f%%', 
+                                                        colors=colors,
+                                                        startangle=90)
+    axes[1,1].set_title('😴 Sleep Deprivation Risk Assessment', fontsize=14, fontweight='bold')
+
+    # Enhance text
+    for autotext in autotexts:
+        autotext.set_fontweight('bold')
+        if autotext.get_text() in ['Critical Risk', 'High Risk']:
+            autotext.set_color('white')
+
+    fig.suptitle('⚠️ SOCIAL BEHAVIOR & TOXICITY ANALYSIS' + estimate_suffix(estimated), fontsize=16, fontweight='bold', y=0.98)
+    fig.tight_layout(rect=[0, 0.03, 1, 0.95])
+
+
+def render_segmentation(fig, axes, results, points, estimated=False):
+    """Draw the segmentation tab from its aggregate tables"""
+    segment_counts = results['segment_counts']
+
+    for ax in axes.flat:
+        ax.clear()
+
+    # 1. Enhanced segment distribution
+    colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7', '#DDA0DD']
+    wedges, texts, autotexts = axes[0,0].pie(segment_counts.values, 
+                                                               labels=segment_counts.index,
+                                                               autopct='%1.1f%%', 
+                                                               colors=colors[:len(segment_counts)],
+                                                               startangle=90)
+    axes[0,0].set_title('🏷️ Advanced Player Segmentation', fontsize=14, fontweight='bold')
+
+    # Enhance pie chart
+    for autotext in autotexts:
+        autotext.set_fontweight('bold')
+        autotext.set_color('white')
+        autotext.set_fontsize(10)
+
+    # 2. Revenue contribution by segment
+    segment_revenue = results['segment_revenue']
+    bars = axes[0,1].bar(range(len(segment_revenue)), segment_revenue.values,
+                                          yerr=ci_errors(results, 'segment_revenue', segment_revenue),
+                                          color=colors[:len(segment_revenue)], alpha=0.8, capsize=4)
+    axes[0,1].set_title('💰 Revenue Contribution by Segment', fontsize=14, fontweight='bold')
+    axes[0,1].set_xlabel('Player Segment')
+    axes[0,1].set_ylabel('Total Revenue ($)')
+    axes[0,1].set_xticks(range(len(segment_revenue)))
+    axes[0,1].set_xticklabels(segment_revenue.index, rotation=45, ha='right')
+    axes[0,1].grid(True, alpha=0.3)
+
+    # Add percentage labels
+    total_revenue = segment_revenue.sum()
+    for bar, value in zip(bars, segment_revenue.values):
+        percentage = (value/total_revenue)*100
+        axes[0,1].text(bar.get_x() + bar.get_width()/2, bar.get_height() + 50,
+                                       f'${value:.0f}\n({percentage:.1f}%)', 
+                                       ha='center', va='bottom', fontsize=9, fontweight='bold')
+
+    # 3. Engagement levels by segment
+    segment_engagement = results['segment_engagement']
+    bars = axes[0,2].bar(range(len(segment_engagement)), segment_engagement.values,
+                                          yerr=ci_errors(results, 'segment_engagement', segment_engagement),
+                                          color='#3498db', alpha=0.8, capsize=4)
+    axes[0,2].set_title('📈 Average Engagement by Segment', fontsize=14, fontweight='bold')
+    axes[0,2].set_xlabel('Player Segment')
+    axes[0,2].set_ylabel('Average Engagement Level')
+    axes[0,2].set_xticks(range(len(segment_engagement)))
+    axes[0,2].set_xticklabels(segment_engagement.index, rotation=45, ha='right')
+    axes[0,2].grid(True, alpha=0.3)
+
+    # Add value labels
+    for bar, value in zip(bars, segment_engagement.values):
+        axes[0,2].text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1,
+                                       f'{value:.1f}', ha='center', va='bottom', fontweight='bold')
+
+    # 4. Play time patterns by segment
+    segment_playtime = results['segment_playtime']
+    bars = axes[1,0].bar(range(len(segment_playtime)), segment_playtime.values,
+                                          yerr=ci_errors(results, 'segment_playtime', segment_playtime),
+                                          color='#e74c3c', alpha=0.8, capsize=4)
+    axes[1,0].set_title('⏰ Average Play Time by Segment', fontsize=14, fontweight='bold')
+    axes[1,0].set_xlabel('Player Segment')
+    axes[1,0].set_ylabel('Average Hours/Week')
+    axes[1,0].set_xticks(range(len(segment_playtime)))
+    axes[1,0].set_xticklabels(segment_playtime.index, rotation=45, ha='right')
+    axes[1,0].grid(True, alpha=0.3)
+
+    # Add value labels
+    for bar, value in zip(bars, segment_playtime.values):
+        axes[1,0].text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.5,
+                                       f'{value:.1f}h', ha='center', va='bottom', fontweight='bold')
+
+    # 5. Community health by segment (toxicity)
+    segment_toxicity = results['segment_toxicity']
+    bars = axes[1,1].bar(range(len(segment_toxicity)), segment_toxicity.values,
+                                          yerr=ci_errors(results, 'segment_toxicity', segment_toxicity),
+                                          color='#f39c12', alpha=0.8, capsize=4)
+    axes[1,1].set_title('⚠️ Average Toxicity by Segment', fontsize=14, fontweight='bold')
+    axes[1,1].set_xlabel('Player Segment')
+    axes[1,1].set_ylabel('Average Toxicity Level')
+    axes[1,1].set_xticks(range(len(segment_toxicity)))
+    axes[1,1].set_xticklabels(segment_toxicity.index, rotation=45, ha='right')
+    axes[1,1].grid(True, alpha=0.3)
+
+    # Add toxicity risk zones
+    axes[1,1].axhline(y=3, color='yellow', linestyle='--', alpha=0.7, label='Moderate')
+    axes[1,1].axhline(y=6, color='red', linestyle='--', alpha=0.7, label='High Risk')
+    axes[1,1].legend()
+
+    # 6. Loyalty distribution by segment
+    loyalty_edges = results['loyalty_edges']
+    for i, segment in enumerate(segment_counts.index[:4]):  # Show top 4 segments
+        axes[1,2].hist(loyalty_edges[:-1], bins=loyalty_edges,
+                                       weights=results['loyalty_hist'][segment],
+                                       alpha=0.6, label=segment, color=colors[i])
+
+    axes[1,2].set_title('🎖️ Loyalty Distribution by Segment', fontsize=14, fontweight='bold')
+    axes[1,2].set_xlabel('Loyalty Index')
+    axes[1,2].set_ylabel('Number of Players')
+    axes[1,2].legend()
+    axes[1,2].grid(True, alpha=0.3)
+
+    title = results.get('title', '🏷️ ADVANCED PLAYER SEGMENTATION ANALYSIS')
+    fig.suptitle(title + estimate_suffix(estimated), fontsize=16, fontweight='bold', y=0.98)
+    fig.tight_layout(rect=[0, 0.03, 1, 0.95])
+
+
+def render_correlation(fig, axes, results, points, estimated=False):
+    """Draw the correlation tab from the streamed correlation matrix"""
+    for ax in axes.flat:
+        ax.clear()
+
+    # 1. Correlation heatmap (one cell per field pair, independent of row count)
+    correlation = results['correlation']
+    labels = list(correlation.columns)
+    image = axes[0].imshow(correlation.values, cmap='RdBu_r', vmin=-1, vmax=1)
+    axes[0].set_title('🔗 Metric Correlation Matrix', fontsize=14, fontweight='bold')
+    axes[0].set_xticks(range(len(labels)))
+    axes[0].set_xticklabels(labels, rotation=60, ha='right', fontsize=8)
+    axes[0].set_yticks(range(len(labels)))
+    axes[0].set_yticklabels(labels, fontsize=8)
+    for i in range(len(labels)):
+        for j in range(len(labels)):
+            value = correlation.values[i, j]
+            if np.isfinite(value):
+                axes[0].text(j, i, f'{value:.2f}', ha='center', va='center', fontsize=6,
+                             color='white' if abs(value) > 0.6 else 'black')
+    if not hasattr(axes[0], '_correlation_colorbar'):
+        axes[0]._correlation_colorbar = fig.colorbar(image, ax=axes[0], fraction=0.046, pad=0.04)
+
+    # 2. Strongest relationships
+    top_pairs = results['top_pairs'].head(12)[::-1]
+    colors = ['#e74c3c' if value > 0 else '#3498db' for value in top_pairs.values]
+    axes[1].barh(range(len(top_pairs)), top_pairs.values, color=colors, alpha=0.8)
+    axes[1].set_title('📈 Strongest Metric Relationships', fontsize=14, fontweight='bold')
+    axes[1].set_xlabel('Pearson correlation')
+    axes[1].set_yticks(range(len(top_pairs)))
+    axes[1].set_yticklabels(top_pairs.index, fontsize=9)
+    axes[1].set_xlim(-1, 1)
+    axes[1].axvline(0, color='black', linewidth=0.8)
+    axes[1].grid(True, alpha=0.3)
+
+    fig.suptitle(f"🔗 METRIC CORRELATIONS ({results['rows']:,.0f} players)" + estimate_suffix(estimated),
+                 fontsize=16, fontweight='bold', y=0.98)
+    fig.tight_layout(rect=[0, 0.03, 1, 0.95])
+
+
+RENDERERS = {
+    'demographics': render_demographics,
+    'behavior': render_behavior,
+    'monetization': render_monetization,
+    'social': render_social,
+    'segmentation': render_segmentation,
+    'correlation': render_correlation,
+}
@@ -0,0 +1,157 @@
+# Learned player segments: mini-batch k-means over standardized behavioral features
+# Each step is a map-reduce of per-centroid batch sums, so fitting runs on any executor;
+# assignment is one chunked pass that feeds the same charts as the rule-based segments.
+
+import json
+import os
+
+import numpy as np
+
+from aggregates import (CLUSTER_FEATURES, SerialExecutor, feature_matrix, finalize_moments, finalize_ranges,
+                        finalize_segmentation, range_shift)
+
+FEATURE_NAMES = {
+    'PlayTimeHours': 'playtime',
+    'SessionsPerWeek': 'sessions',
+    'InGamePurchases': 'spend',
+    'EngagementLevel': 'engagement',
+    'LoyaltyIndex': 'loyalty',
+    'ToxicityLevel': 'toxicity',
+}
+
+
+class ClusterModel:
+    """Centroids in standardized feature space plus the scaling they were fitted with"""
+
+    def __init__(self, centroids, mean, std, steps=0, inertia=float('nan')):
+        self.centroids = np.asarray(centroids, dtype=np.float64)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.std = np.asarray(std, dtype=np.float64)
+        self.steps = steps
+        self.inertia = inertia
+        self.labels = cluster_labels(self.centroids)
+
+    @property
+    def k(self):
+        return len(self.centroids)
+
+    def raw_centroids(self):
+        """Centroids in the original feature units"""
+        return self.centroids * self.std + self.mean
+
+    def rescaled(self, mean, std):
+        """Same centroids expressed in another standardization (for warm starts on new data)"""
+        return (self.raw_centroids() - mean) / std
+
+    def params(self):
+        return {'centroids': self.centroids, 'feature_mean': self.mean, 'feature_std': self.std,
+                'segment_labels': self.labels}
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'features': CLUSTER_FEATURES, 'centroids': self.centroids.tolist(),
+                       'mean': self.mean.tolist(), 'std': self.std.tolist(), 'steps': self.steps}, f)
+
+    @classmethod
+    def load(cls, path):
+        """Saved model, or None when missing or fitted on different features"""
+        try:
+            with open(path) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if stored.get('features') != CLUSTER_FEATURES:
+            return None
+        return cls(stored['centroids'], stored['mean'], stored['std'], stored.get('steps', 0))
+
+
+def cluster_labels(centroids):
+    """Readable name per centroid from its two most distinctive features"""
+    labels = []
+    for i, centroid in enumerate(centroids):
+        top = np.argsort(-np.abs(centroid))[:2]
+        traits = [f"{'high' if centroid[j] > 0 else 'low'} {FEATURE_NAMES[CLUSTER_FEATURES[j]]}"
+                  for j in top if abs(centroid[j]) >= 0.5]
+        labels.append(f"#{i + 1} {' / '.join(traits) if traits else 'typical'}")
+    return labels
+
+
+def feature_scaling(columns, executor):
+    """Mean and standard deviation of every cluster feature, in one streamed pass"""
+    params = {'categories': columns.categories, 'range_fields': CLUSTER_FEATURES}
+    params['ranges'] = finalize_ranges(executor.map_reduce('ranges', columns, params), CLUSTER_FEATURES)
+    moments = finalize_moments(executor.map_reduce('correlation', columns, params), CLUSTER_FEATURES,
+                               range_shift(params['ranges'], CLUSTER_FEATURES), 'moment')
+    std = np.sqrt(np.diag(moments['covariance'].values))
+    std[~(std > 0)] = 1.0
+    return np.nan_to_num(moments['means'].values), std
+
+
+def kmeans_plus_plus(x, k, rng):
+    """k-means++ seeding on a small sample"""
+    centroids = [x[rng.integers(len(x))]]
+    distances = ((x - centroids[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = distances.sum()
+        pick = rng.choice(len(x), p=distances / total) if total > 0 else rng.integers(len(x))
+        centroids.append(x[pick])
+        distances = np.minimum(distances, ((x - x[pick]) ** 2).sum(axis=1))
+    return np.array(centroids)
+
+
+def fit_clusters(columns, executor=None, k=6, batch_size=4096, max_steps=200, tol=1e-3, patience=3,
+                 seed=0, warm_start=None):
+    """Mini-batch k-means (per-centroid 1/count learning rate), optionally warm-started
+
+    Stops once the largest centroid move stays below `tol` (in standard deviations) for
+    `patience` consecutive steps.
+    """
+    executor = executor or SerialExecutor()
+    if not 0 < k <= 255:
+        raise ValueError("k must be between 1 and 255 (cluster codes are uint8)")
+    if columns.rows < k:
+        raise ValueError(f"Need at least {k} players to fit {k} segments")
+
+    mean, std = feature_scaling(columns, executor)
+    params = {'feature_mean': mean, 'feature_std': std, 'seed': seed,
+              'batch_fraction': min(1.0, batch_size / columns.rows)}
+    rng = np.random.default_rng(seed)
+    if warm_start is not None and warm_start.k == k:
+        centroids = warm_start.rescaled(mean, std)
+    else:
+        init_rows = np.sort(rng.choice(columns.rows, size=min(columns.rows, max(batch_size, 50 * k)), replace=False))
+        centroids = kmeans_plus_plus(feature_matrix(columns.arrays, init_rows, params), k, rng)
+
+    counts = np.zeros(k)
+    calm_steps = 0
+    inertia = float('nan')
+    for step in range(max_steps):
+        params.update(centroids=centroids, step=step)
+        merged = executor.map_reduce('cluster_step', columns, params)
+        batch_counts = merged['batch_counts']
+        seen = batch_counts > 0
+        counts += batch_counts
+        # Sculley's per-centroid 1/count rate, applied to the whole batch at once
+        moved = centroids.copy()
+        moved[seen] += (merged['batch_sums'][seen] - batch_counts[seen, None] * centroids[seen]) / counts[seen, None]
+        shift = np.sqrt(((moved - centroids) ** 2).sum(axis=1)).max()
+        centroids = moved
+        inertia = merged['batch_inertia'][0] / max(batch_counts.sum(), 1)
+        calm_steps = calm_steps + 1 if shift < tol else 0
+        if calm_steps >= patience:
+            break
+    return ClusterModel(centroids, mean, std, steps=step + 1, inertia=inertia)
+
+
+def assign_clusters(columns, executor, model):
+    """Label every player with its nearest centroid; segmentation-tab tables per cluster"""
+    executor = executor or SerialExecutor()
+    params = {'categories': columns.categories, 'range_fields': ['LoyaltyIndex'], **model.params()}
+    params['ranges'] = finalize_ranges(executor.map_reduce('ranges', columns, params), ['LoyaltyIndex'])
+    merged = executor.map_reduce('clusters', columns, params)
+    results = finalize_segmentation(merged, params)
+    rows = merged['segment_rows'].sum()
+    results['mean_inertia'] = merged['cluster_inertia'][0] / rows if rows else np.nan
+    results['title'] = f'🧠 LEARNED PLAYER SEGMENTS (MINI-BATCH K-MEANS, k={model.k})'
+    return results
@@ -0,0 +1,474 @@
+# Pluggable data sources for the Gaming Analytics Dashboard
+# MongoDB (pooled, reused client with retry), CSV, columnar cache and synthetic data,
+# selected by an external JSON config file and environment variables.
+
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from pymongo import MongoClient, ReadPreference
+from pymongo.errors import AutoReconnect, ConnectionFailure, ServerSelectionTimeoutError
+
+from bson_columnar import ColumnarBatchDecoder, decode_arrow, has_pymongoarrow
+from query_builder import PopulationSummary, summarize_collection
+from validation import validate_players
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CONFIG_PATH = os.path.join(BASE_DIR, 'data_source.json')
+
+DEFAULT_CONFIG = {
+    'type': 'mongo',
+    'mongo': {
+        'uri': None,
+        'database': 'my_database',
+        'collection': 'my_collection',
+        'limit': 10000,
+        'batch_size': 2000,
+        'max_pool_size': 10,
+        'min_pool_size': 1,
+        'read_preference': 'secondaryPreferred',
+        'server_selection_timeout_ms': 5000,
+        'connect_timeout_ms': 5000,
+        'retries': 3,
+        'backoff_s': 0.5,
+        # 'auto' (pymongoarrow if installed, else raw-BSON columnar), 'arrow', 'columnar' or 'documents'
+        'decoder': 'auto',
+    },
+    'csv': {'path': 'data.csv'},
+    'cache': {'path': 'cache/players.parquet'},
+    'synthetic': {'rows': 5000, 'seed': 42},
+    # Dataset and cache budget (None = share of physical memory); loads that do not fit are
+    # downsampled (hashed-PlayerID sample) or refused
+    'memory': {'budget_mb': None, 'on_over_budget': 'downsample', 'spill_dir': 'cache/spill'},
+    # Live risk monitor: 'jsonl' tails a local file stand-in, 'mongo' watches a change stream
+    'stream': {'type': 'jsonl', 'path': 'stream/players.jsonl', 'window_s': 300, 'bucket_s': 10, 'min_rows': 50},
+}
+
+READ_PREFERENCES = {
+    'primary': ReadPreference.PRIMARY,
+    'primaryPreferred': ReadPreference.PRIMARY_PREFERRED,
+    'secondary': ReadPreference.SECONDARY,
+    'secondaryPreferred': ReadPreference.SECONDARY_PREFERRED,
+    'nearest': ReadPreference.NEAREST,
+}
+
+# Local sources read, filter and sample this many rows at a time, so a downsampled load
+# never holds more than one chunk of the unfiltered table
+LOAD_CHUNK_ROWS = 500_000
+
+GENRES = ['Action', 'RPG', 'Strategy', 'Sports', 'Racing', 'Adventure', 'Simulation', 'Fighting', 'Puzzle', 'Horror']
+LOCATIONS = ['USA', 'UK', 'Germany', 'Japan', 'Brazil', 'India', 'Australia', 'Canada', 'France', 'South Korea']
+GENDERS = ['Male', 'Female', 'Other']
+
+
+class DataSourceError(Exception):
+    """Raised when a source cannot produce data (after any retries)"""
+
+
+def load_source_config(path=None):
+    """Read the JSON source config; GAMING_DATA_SOURCE / GAMING_MONGO_URI override it"""
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    path = path or os.environ.get('GAMING_ANALYTICS_CONFIG', DEFAULT_CONFIG_PATH)
+    if os.path.exists(path):
+        with open(path) as f:
+            user_config = json.load(f)
+        for key, value in user_config.items():
+            if isinstance(value, dict) and isinstance(config.get(key), dict):
+                config[key].update(value)
+            else:
+                config[key] = value
+    if os.environ.get('GAMING_DATA_SOURCE'):
+        config['type'] = os.environ['GAMING_DATA_SOURCE']
+    if os.environ.get('GAMING_MONGO_URI'):
+        config['mongo']['uri'] = os.environ['GAMING_MONGO_URI']
+    return config
+
+
+def create_data_source(config):
+    """Instantiate the source named by config['type']"""
+    source_type = config['type']
+    if source_type not in SOURCE_TYPES:
+        raise DataSourceError(f"Unknown data source type: {source_type}")
+    return SOURCE_TYPES[source_type](**config.get(source_type, {}))
+
+
+class DataSource:
+    """Base class: load(query) returns a raw DataFrame and records last_metrics"""
+    name = 'source'
+
+    def __init__(self):
+        self.last_metrics = {}
+        # Summary of the filtered population behind the last sampled load
+        self.last_population = None
+
+    def load(self, query=None):
+        raise NotImplementedError
+
+    def describe(self):
+        return self.name
+
+    def estimate_rows(self, query=None):
+        """Rows a load of `query` would return, if cheaply known (None otherwise)"""
+        return None
+
+    def index_information(self):
+        """Existing indexes, for query index recommendations"""
+        return {}
+
+    def _load_chunks(self, chunks, query):
+        """Concatenated rows of `chunks` matching `query`, each chunk filtered and sampled as it arrives
+
+        Local sources filter and sample in pandas with the same semantics as the server;
+        chunks carry their global row positions as index, like a whole-table read.
+        """
+        self.last_population = None
+        population = PopulationSummary() if query is not None and query.is_sampled else None
+        rng = np.random.default_rng(query.seed) if query is not None else None
+        parts = []
+        for chunk in chunks:
+            if query is not None:
+                chunk = query.filter_frame(chunk)
+                if population is not None:
+                    population.add(chunk)
+                chunk = query.sample_frame(chunk, rng)
+            parts.append(chunk)
+        if population is not None:
+            self.last_population = population.result()
+        if not parts:
+            return pd.DataFrame()
+        return pd.concat(parts) if len(parts) > 1 else parts[0]
+
+    def close(self):
+        pass
+
+    def _record(self, started, rows, **extra):
+        elapsed = time.perf_counter() - started
+        self.last_metrics = {'rows': rows, 'total_s': elapsed,
+                             'rows_per_s': rows / elapsed if elapsed > 0 else float('inf'), **extra}
+
+
+class MongoDataSource(DataSource):
+    """MongoDB collection read through one long-lived, pooled client"""
+    name = 'mongo'
+
+    # Clients are shared per (uri, options) so reloads skip DNS, TCP and TLS handshakes
+    _clients = {}
+
+    def __init__(self, uri=None, database='my_database', collection='my_collection', limit=10000,
+                 batch_size=2000, max_pool_size=10, min_pool_size=1, read_preference='secondaryPreferred',
+                 server_selection_timeout_ms=5000, connect_timeout_ms=5000, retries=3, backoff_s=0.5,
+                 decoder='auto'):
+        super().__init__()
+        if not uri:
+            raise DataSourceError("No MongoDB URI configured (set GAMING_MONGO_URI, or 'uri' in a local data_source.json)")
+        if decoder == 'auto':
+            decoder = 'arrow' if has_pymongoarrow() else 'columnar'
+        if decoder not in ('arrow', 'columnar', 'documents'):
+            raise DataSourceError(f"Unknown Mongo decoder: {decoder}")
+        if decoder == 'arrow' and not has_pymongoarrow():
+            raise DataSourceError("decoder 'arrow' needs pymongoarrow (pip install pymongoarrow)")
+        self.decoder = decoder
+        self.uri = uri
+        self.database = database
+        self.collection_name = collection
+        self.limit = limit
+        self.batch_size = batch_size
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self.client_options = {
+            'maxPoolSize': max_pool_size,
+            'minPoolSize': min_pool_size,
+            'serverSelectionTimeoutMS': server_selection_timeout_ms,
+            'connectTimeoutMS': connect_timeout_ms,
+            'retryReads': True,
+        }
+        self.read_preference = READ_PREFERENCES[read_preference]
+
+    def _client_key(self):
+        return (self.uri, tuple(sorted(self.client_options.items())))
+
+    def get_client(self):
+        """Return the shared client, creating and pinging it on first use"""
+        key = self._client_key()
+        client = self._clients.get(key)
+        if client is None:
+            client = MongoClient(self.uri, **self.client_options)
+            client.admin.command('ping')
+            self._clients[key] = client
+        return client
+
+    @property
+    def collection(self):
+        db = self.get_client()[self.database]
+        return db.get_collection(self.collection_name, read_preference=self.read_preference)
+
+    def find(self, query=None, projection=None):
+        """Cursor over the collection with the configured batch size and limit"""
+        cursor = self.collection.find(query or {}, projection or {'_id': 0}).batch_size(self.batch_size)
+        if self.limit:
+            cursor = cursor.limit(self.limit)
+        return cursor
+
+    def _with_retry(self, operation):
+        delay = self.backoff_s
+        for attempt in range(self.retries + 1):
+            try:
+                return operation()
+            except (AutoReconnect, ConnectionFailure, ServerSelectionTimeoutError) as e:
+                # A broken client is dropped so the next attempt reconnects from scratch
+                client = self._clients.pop(self._client_key(), None)
+                if client is not None:
+                    client.close()
+                if attempt == self.retries:
+                    raise DataSourceError(f"MongoDB unavailable after {attempt + 1} attempts: {e}") from e
+                time.sleep(delay)
+                delay *= 2
+
+    def load(self, query=None):
+        return self._with_retry(lambda: self._load_once(query))
+
+    def estimate_rows(self, query=None):
+        if query is None:
+            rows = self._with_retry(lambda: self.collection.estimated_document_count())
+            return min(rows, self.limit) if self.limit else rows
+        rows = self._with_retry(lambda: self.collection.count_documents(query.to_filter()))
+        if query.is_sampled:
+            return int(rows * query.sample_fraction)
+        return min(rows, self.limit) if self.limit else rows
+
+    def pipeline(self, query):
+        """A PlayerQuery pushed down as an aggregation pipeline"""
+        count = None
+        if query.is_sampled and query.sample_method == 'sample':
+            count = self.collection.count_documents(query.to_filter())
+        pipeline = query.to_pipeline(count)
+        if not query.is_sampled and self.limit:
+            pipeline.append({'$limit': self.limit})
+        return pipeline
+
+    def aggregate(self, query):
+        """Cursor over a PlayerQuery pushed down as an aggregation pipeline"""
+        return self.collection.aggregate(self.pipeline(query), batchSize=self.batch_size, allowDiskUse=True)
+
+    def raw_batches(self, query=None):
+        """Cursor of raw BSON batches (bytes of concatenated documents), never decoded to dicts"""
+        if query is not None:
+            return self.collection.aggregate_raw_batches(self.pipeline(query), batchSize=self.batch_size,
+                                                         allowDiskUse=True)
+        cursor = self.collection.find_raw_batches({}, {'_id': 0}).batch_size(self.batch_size)
+        if self.limit:
+            cursor = cursor.limit(self.limit)
+        return cursor
+
+    def _load_once(self, query=None):
+        started = time.perf_counter()
+        reused = self._client_key() in self._clients
+        self.get_client()
+        connected = time.perf_counter()
+
+        self.last_population = None
+        first_batch_s = None
+        extra = {}
+        if self.decoder == 'arrow':
+            pipeline = None if query is None else self.pipeline(query)
+            data = decode_arrow(self.collection, pipeline=pipeline, projection={'_id': 0}, limit=self.limit)
+        elif self.decoder == 'columnar':
+            decoder = ColumnarBatchDecoder()
+            for batch in self.raw_batches(query):
+                if first_batch_s is None:
+                    first_batch_s = time.perf_counter() - connected
+                decoder.add_batch(batch)
+            data = decoder.frame()
+            extra['fallback_rows'] = decoder.fallback_rows
+        else:
+            cursor = self.find() if query is None else self.aggregate(query)
+            docs = []
+            for doc in cursor:
+                if first_batch_s is None:
+                    first_batch_s = time.perf_counter() - connected
+                docs.append(doc)
+            data = pd.DataFrame(docs)
+
+        self._record(started, len(data), connect_s=connected - started, first_batch_s=first_batch_s or 0.0,
+                     client_reused=reused, decoder=self.decoder, **extra)
+        if query is not None and query.is_sampled:
+            self.last_population = summarize_collection(self.collection, query)
+        return data
+
+    def describe(self):
+        return f"MongoDB {self.database}.{self.collection_name}"
+
+    def index_information(self):
+        return self.collection.index_information()
+
+    def close(self):
+        client = self._clients.pop(self._client_key(), None)
+        if client is not None:
+            client.close()
+
+
+class CsvDataSource(DataSource):
+    """Player table exported as CSV (e.g. the bundled data.csv)"""
+    name = 'csv'
+
+    def __init__(self, path='data.csv'):
+        super().__init__()
+        self.path = os.path.join(BASE_DIR, path)
+
+    def load(self, query=None):
+        started = time.perf_counter()
+        try:
+            with pd.read_csv(self.path, chunksize=LOAD_CHUNK_ROWS) as reader:
+                data = self._load_chunks(reader, query)
+        except (OSError, pd.errors.ParserError) as e:
+            raise DataSourceError(f"Cannot read {self.path}: {e}") from e
+        self._record(started, len(data))
+        return data
+
+    def estimate_rows(self, query=None):
+        # File size over the mean length of the first lines; filters are ignored (upper bound)
+        try:
+            size = os.path.getsize(self.path)
+            with open(self.path, 'rb') as f:
+                head = f.readlines(1 << 16)
+        except OSError:
+            return None
+        if len(head) < 2:
+            return None
+        rows = int(size / (sum(map(len, head[1:])) / (len(head) - 1)))
+        return int(rows * query.sample_fraction) if query is not None and query.is_sampled else rows
+
+    def describe(self):
+        return f"CSV {os.path.basename(self.path)}"
+
+
+class ColumnarCacheSource(DataSource):
+    """Local Parquet/Feather snapshot of a previous load"""
+    name = 'cache'
+
+    def __init__(self, path='cache/players.parquet'):
+        super().__init__()
+        self.path = os.path.join(BASE_DIR, path)
+
+    def load(self, query=None):
+        started = time.perf_counter()
+        try:
+            data = self._load_chunks(self._chunks(), query)
+        except (OSError, ImportError, ValueError) as e:
+            raise DataSourceError(f"Cannot read columnar cache {self.path}: {e}") from e
+        self._record(started, len(data))
+        return data
+
+    def _chunks(self):
+        # Record batches of the memory-mapped Feather file or of the Parquet row groups
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.path.endswith('.feather'):
+            reader = pa.ipc.open_file(pa.memory_map(self.path))
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        else:
+            batches = pq.ParquetFile(self.path).iter_batches(batch_size=LOAD_CHUNK_ROWS)
+        start = 0
+        for batch in batches:
+            chunk = batch.to_pandas()
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+            yield chunk
+
+    def save(self, data):
+        """Write a snapshot that later loads can read instead of the database"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if self.path.endswith('.feather'):
+            data.reset_index(drop=True).to_feather(self.path)
+        else:
+            data.to_parquet(self.path, index=False)
+
+    def estimate_rows(self, query=None):
+        if self.path.endswith('.feather'):
+            return None
+        try:
+            import pyarrow.parquet as pq
+            rows = pq.ParquetFile(self.path).metadata.num_rows
+        except (OSError, ImportError, ValueError):
+            return None
+        return int(rows * query.sample_fraction) if query is not None and query.is_sampled else rows
+
+    def describe(self):
+        return f"Cache {os.path.basename(self.path)}"
+
+
+class SyntheticDataSource(DataSource):
+    """Vectorized synthetic players, for demos and benchmarks"""
+    name = 'synthetic'
+
+    def __init__(self, rows=5000, seed=42):
+        super().__init__()
+        self.rows = rows
+        self.seed = seed
+
+    def load(self, query=None):
+        started = time.perf_counter()
+        data = self._load_chunks(synthetic_chunks(self.rows, self.seed), query)
+        self._record(started, len(data))
+        return data
+
+    def estimate_rows(self, query=None):
+        return int(self.rows * query.sample_fraction) if query is not None and query.is_sampled else self.rows
+
+    def describe(self):
+        return f"Synthetic ({self.rows:,} players)"
+
+
+def synthetic_chunks(rows, seed=42, chunk_rows=LOAD_CHUNK_ROWS):
+    """synthetic_players in chunks; the first chunk equals synthetic_players(chunk_rows, seed)"""
+    for i, start in enumerate(range(0, rows, chunk_rows)):
+        chunk = synthetic_players(min(chunk_rows, rows - start), seed if i == 0 else [seed, i], first_id=start)
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        yield chunk
+
+
+def synthetic_players(rows, seed=42, first_id=0):
+    """Vectorized synthetic player table with the dashboard's cleaned schema"""
+    rng = np.random.default_rng(seed)
+    engagement = np.clip(rng.normal(6, 2, rows).round(), 1, 10)
+    level = np.maximum(1, rng.normal(45, 25, rows)).round()
+    play_time = np.clip(rng.gamma(2.0, 8.0, rows), 0, 100)
+    purchases = np.where(rng.random(rows) < 0.35, rng.exponential(20, rows), 0.0)
+    whales = rng.random(rows) < 0.02
+    purchases[whales] += rng.normal(250, 100, whales.sum())
+    return pd.DataFrame({
+        'PlayerID': np.arange(first_id, first_id + rows, dtype=np.int64),
+        'Age': np.clip(rng.normal(28, 8, rows).round(), 15, 65),
+        'Gender': pd.Categorical.from_codes(rng.integers(0, len(GENDERS), rows), GENDERS),
+        'Location': pd.Categorical.from_codes(rng.integers(0, len(LOCATIONS), rows), LOCATIONS),
+        'GameGenre': pd.Categorical.from_codes(rng.integers(0, len(GENRES), rows), GENRES),
+        'PlayTimeHours': play_time,
+        'InGamePurchases': np.abs(purchases).round(2),
+        'SessionsPerWeek': np.maximum(1, rng.normal(8, 4, rows)).round(),
+        'AvgSessionDurationMinutes': np.maximum(30, rng.normal(120, 40, rows)).round(),
+        'PlayerLevel': level,
+        'AchievementsUnlocked': np.maximum(0, rng.normal(level * 0.8, level * 0.3 + 1)).round(),
+        'EngagementLevel': engagement,
+        'SocialInteractionScore': np.clip(rng.normal(5, 2.5, rows).round(), 0, 10),
+        'RageQuitFrequency': np.clip(rng.normal(3, 2, rows).round(), 0, 10),
+        'LoyaltyIndex': np.clip(rng.normal(40 + engagement * 3, 15), 0, 100).round(),
+        'SleepDeprivationRisk': np.clip(rng.normal(4, 2, rows).round(), 1, 10),
+        'ToxicityLevel': np.clip(rng.normal(3, 2, rows).round(), 0, 10),
+        'TeamPlayerScore': np.clip(rng.normal(12, 4, rows).round(), 0, 20),
+    })
+
+
+def clean_players(data):
+    """Rows that pass VALIDATION_SCHEMA, numeric fields as float64 (see validate_players for the quarantine)"""
+    return validate_players(data)[0]
+
+
+SOURCE_TYPES = {
+    'mongo': MongoDataSource,
+    'csv': CsvDataSource,
+    'cache': ColumnarCacheSource,
+    'synthetic': SyntheticDataSource,
+}
@@ -0,0 +1,485 @@
+# Shard-parallel aggregation across worker processes or machines
+# Each worker owns one shard of the player history (a set of Parquet/CSV files, a PlayerID
+# range of the Mongo collection, or synthetic players) and runs the partial-aggregate
+# kernels over it; a coordinator fans every kernel out to all shards and merges the
+# partials, so compute_analysis and friends run unchanged on data no single machine holds.
+#
+# Transport is multiprocessing.connection: one persistent TCP connection per worker,
+# HMAC-authenticated with a shared key, carrying pickled (request, reply) tuples. Anyone
+# holding the key can run code on a worker, so workers and coordinators refuse to start
+# without a secret GAMING_CLUSTER_KEY (LocalCluster generates a random one for its own
+# children). Kernels are pure functions of a shard, so a request that dies with its
+# worker is simply resent once the worker is back.
+#
+# Usage (export GAMING_CLUSTER_KEY=<secret> on every host first, except for 'local'):
+#   python distributed.py worker --listen 127.0.0.1:7101 --files shard-a/*.parquet
+#   python distributed.py worker --listen 127.0.0.1:7102 --mongo-range 0:5000000
+#   python distributed.py run --workers 127.0.0.1:7101,127.0.0.1:7102 [--analysis behavior]
+#   python distributed.py local --shards 4 --rows 2000000 [--kill-one]
+
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing.connection import Client, Listener, wait
+
+import numpy as np
+import pandas as pd
+
+from aggregates import ANALYSES, CATEGORICAL_FIELDS, ColumnSet, compute_analysis, merge_partials, run_kernel
+from bson_columnar import ColumnarBatchDecoder
+from data_sources import BASE_DIR, MongoDataSource, clean_players, load_source_config, synthetic_players
+from materialized_views import dataset_watermark
+
+# How long a shard may stay unreachable (restarting) before the query fails
+RETRY_TIMEOUT_S = 60.0
+# Per-request reply deadline; a slower worker is treated as failed and asked again
+REPLY_TIMEOUT_S = 600.0
+# How long the local failure hook waits for a dying worker to be reaped before checking it
+REAP_TIMEOUT_S = 0.1
+LOCAL_COLUMNS_ONLY = ("A shard cluster only answers whole-shard map_reduce requests; row-range partials "
+                      "(materialized views, indexes) need a local column set. Use "
+                      "compute_analysis(analysis, coordinator.columns(), coordinator) instead.")
+
+
+class DistributedError(Exception):
+    """Raised when a shard cannot answer (after retries) or changed under a query"""
+
+
+def authkey():
+    """Cluster key from GAMING_CLUSTER_KEY; there is no default, requests are unpickled"""
+    key = os.environ.get('GAMING_CLUSTER_KEY')
+    if not key:
+        raise DistributedError("Set GAMING_CLUSTER_KEY to a shared secret on every worker and coordinator "
+                               "(e.g. python -c 'import secrets; print(secrets.token_hex(32))')")
+    return key.encode()
+
+
+def parse_address(text):
+    host, _, port = text.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+# Shards --------------------------------------------------------------------------------
+
+def load_shard(spec):
+    """Raw player frame of a shard spec: {'files': [...]}, {'mongo_range': [lo, hi]} or {'synthetic': rows}"""
+    if 'files' in spec:
+        frames = [pd.read_parquet(path) if path.endswith('.parquet') else
+                  pd.read_feather(path) if path.endswith('.feather') else pd.read_csv(path)
+                  for path in spec['files']]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    if 'mongo_range' in spec:
+        lo, hi = spec['mongo_range']
+        options = {**load_source_config()['mongo'], 'limit': 0}
+        source = MongoDataSource(**options)
+        try:
+            decoder = ColumnarBatchDecoder()
+            cursor = source.collection.find_raw_batches({'PlayerID': {'$gte': lo, '$lt': hi}}, {'_id': 0})
+            for batch in cursor.batch_size(source.batch_size):
+                decoder.add_batch(batch)
+            return decoder.frame()
+        finally:
+            source.close()
+    if 'synthetic' in spec:
+        return synthetic_players(spec['synthetic'], spec.get('seed', 42))
+    raise DistributedError(f"Unknown shard spec: {spec}")
+
+
+def describe_spec(spec):
+    if 'files' in spec:
+        return f"{len(spec['files'])} file(s)"
+    if 'mongo_range' in spec:
+        return f"PlayerID [{spec['mongo_range'][0]}, {spec['mongo_range'][1]})"
+    return f"synthetic {spec['synthetic']:,} (seed {spec.get('seed', 42)})"
+
+
+class Shard:
+    """One worker's column set, with categorical codes re-keyed to the cluster-wide dictionaries"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.columns = ColumnSet.from_frame(clean_players(load_shard(spec)))
+        self.watermark = dataset_watermark(self.columns)
+        self._remapped = {}
+
+    def describe(self):
+        return {'rows': self.columns.rows, 'categories': self.columns.categories,
+                'watermark': self.watermark, 'shard': describe_spec(self.spec), 'pid': os.getpid()}
+
+    def arrays_for(self, categories):
+        """Column arrays whose categorical codes index `categories` (the merged dictionaries)"""
+        key = tuple((field, tuple(categories.get(field, []))) for field in CATEGORICAL_FIELDS)
+        arrays = self._remapped.get(key)
+        if arrays is None:
+            arrays = dict(self.columns.arrays)
+            for field in CATEGORICAL_FIELDS:
+                local = self.columns.categories.get(field)
+                if local is None or local == categories.get(field):
+                    continue
+                position = {value: i for i, value in enumerate(categories[field])}
+                mapping = np.array([position[value] for value in local] + [-1], dtype=np.int32)
+                # Code -1 (missing) indexes the trailing -1
+                arrays[field] = mapping[arrays[field]]
+            # Only the latest dictionary set is kept; it changes only when a shard does
+            self._remapped = {key: arrays}
+        return arrays
+
+    def run(self, kernel, params):
+        # Kernels without categorical outputs (e.g. cluster steps) may omit the dictionaries
+        arrays = self.arrays_for(params['categories']) if 'categories' in params else self.columns.arrays
+        return run_kernel(kernel, arrays, 0, self.columns.rows, params)
+
+
+def serve_shard(spec, address, key=None):
+    """Worker main loop: load the shard, then answer coordinator requests until killed"""
+    key = key or authkey()
+    shard = Shard(spec)
+    with Listener(address, authkey=key) as listener:
+        print(f"🧩 Shard worker on {address[0]}:{address[1]}: {shard.columns.rows:,} players "
+              f"({describe_spec(spec)})", flush=True)
+        while True:
+            try:
+                connection = listener.accept()
+            except (OSError, EOFError, multiprocessing.AuthenticationError):
+                # Failed handshake (wrong key, port scan): keep serving
+                continue
+            threading.Thread(target=_serve_connection, args=(shard, connection), daemon=True).start()
+
+
+def _serve_connection(shard, connection):
+    with connection:
+        while True:
+            try:
+                request = connection.recv()
+            except (EOFError, OSError):
+                return
+            op = request[0]
+            try:
+                if op == 'describe':
+                    reply = ('ok', shard.describe())
+                elif op == 'run':
+                    _, kernel, params, watermark = request
+                    if watermark != shard.watermark:
+                        reply = ('stale', shard.watermark)
+                    else:
+                        reply = ('ok', shard.run(kernel, params))
+                else:
+                    reply = ('error', f"Unknown request: {op}")
+            except Exception as e:
+                reply = ('error', f"{type(e).__name__}: {e}")
+            try:
+                connection.send(reply)
+            except (EOFError, OSError):
+                return
+
+
+# Coordinator ---------------------------------------------------------------------------
+
+class ShardHandle:
+    """Coordinator-side connection to one worker, reconnected on failure"""
+
+    def __init__(self, address, key, on_failure=None):
+        self.address = address
+        self.key = key
+        self.on_failure = on_failure
+        self.connection = None
+        self.info = None
+        self.restarts = 0
+
+    def connect(self, deadline):
+        delay = 0.1
+        while True:
+            try:
+                self.connection = Client(self.address, authkey=self.key)
+                return
+            except (OSError, EOFError) as e:
+                if time.monotonic() > deadline:
+                    raise DistributedError(f"Shard worker {self.address[0]}:{self.address[1]} "
+                                           f"unreachable: {e}") from e
+                # Every refused attempt re-runs the hook: the worker may have died after the last check
+                if self.on_failure is not None:
+                    self.on_failure(self.address)
+                time.sleep(delay)
+                delay = min(delay * 2, 2.0)
+
+    def drop(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except OSError:
+                pass
+            self.connection = None
+        if self.on_failure is not None:
+            self.on_failure(self.address)
+
+    def send(self, request, deadline):
+        if self.connection is None:
+            self.connect(deadline)
+        self.connection.send(request)
+
+
+class DistributedColumns:
+    """Stand-in for a ColumnSet spanning every shard: merged dictionaries and total rows"""
+
+    def __init__(self, categories, rows, watermarks):
+        self.categories = categories
+        self.rows = rows
+        self.watermarks = watermarks
+
+    @property
+    def arrays(self):
+        # Block fingerprints, views and indexes read local columns; the shards keep theirs
+        raise DistributedError(LOCAL_COLUMNS_ONLY)
+
+
+class ShardCoordinator:
+    """Executor that runs each kernel on every shard worker and merges the partials
+
+    Supports map_reduce only, i.e. compute_analysis; materialized views and other
+    row-range (map_chunks) consumers need a local column set:
+        coordinator = ShardCoordinator(addresses)
+        columns = coordinator.columns()
+        compute_analysis('behavior', columns, coordinator)
+    """
+    name = 'distributed'
+
+    def __init__(self, addresses, key=None, retry_timeout=RETRY_TIMEOUT_S, reply_timeout=REPLY_TIMEOUT_S,
+                 on_failure=None):
+        self.key = key or authkey()
+        self.retry_timeout = retry_timeout
+        self.reply_timeout = reply_timeout
+        self.shards = [ShardHandle(address, self.key, on_failure) for address in addresses]
+        self.stats = {'requests': 0, 'retries': 0}
+        # Fault-drill hook, called with the shard index once its request is on the wire
+        self.on_sent = None
+        self._columns = None
+
+    def columns(self, refresh=False):
+        """Ask every shard for its size and dictionaries; merge them (sorted, like pd.factorize)"""
+        if self._columns is None or refresh:
+            infos = self._gather([('describe',)] * len(self.shards))
+            for shard, info in zip(self.shards, infos):
+                shard.info = info
+            categories = {}
+            for field in CATEGORICAL_FIELDS:
+                values = set()
+                for info in infos:
+                    values.update(info['categories'].get(field, []))
+                if values:
+                    categories[field] = sorted(values)
+            self._columns = DistributedColumns(categories, sum(info['rows'] for info in infos),
+                                               [info['watermark'] for info in infos])
+        return self._columns
+
+    def map_reduce(self, kernel, columns, params):
+        if not isinstance(columns, DistributedColumns):
+            raise TypeError("ShardCoordinator needs the DistributedColumns from columns()")
+        requests = [('run', kernel, params, watermark) for watermark in columns.watermarks]
+        return merge_partials(self._gather(requests))
+
+    def map_chunks(self, kernel, columns, params, bounds):
+        raise DistributedError(LOCAL_COLUMNS_ONLY)
+
+    def _gather(self, requests):
+        """Send one request per shard, then collect replies; failed shards are retried alone"""
+        deadline = time.monotonic() + self.retry_timeout
+        replies = [None] * len(self.shards)
+        pending = {}
+        for i, (shard, request) in enumerate(zip(self.shards, requests)):
+            try:
+                shard.send(request, deadline)
+                pending[shard.connection] = i
+                if self.on_sent is not None:
+                    self.on_sent(i)
+            except (OSError, EOFError, ValueError):
+                shard.drop()
+                replies[i] = self._retry(i, request)
+        self.stats['requests'] += len(requests)
+
+        reply_deadline = time.monotonic() + self.reply_timeout
+        while pending:
+            ready = wait(list(pending), timeout=max(0.0, reply_deadline - time.monotonic()))
+            if not ready:
+                # Stuck workers: give each a fresh connection and ask again
+                for connection, i in list(pending.items()):
+                    del pending[connection]
+                    self.shards[i].drop()
+                    replies[i] = self._retry(i, requests[i])
+                break
+            for connection in ready:
+                i = pending.pop(connection)
+                try:
+                    replies[i] = self._unwrap(i, connection.recv())
+                except (OSError, EOFError):
+                    self.shards[i].drop()
+                    replies[i] = self._retry(i, requests[i])
+        return replies
+
+    def _retry(self, i, request):
+        """Resend to a restarted (or reconnected) worker until it answers or the deadline passes"""
+        shard = self.shards[i]
+        deadline = time.monotonic() + self.retry_timeout
+        while True:
+            self.stats['retries'] += 1
+            shard.restarts += 1
+            try:
+                shard.send(request, deadline)
+                if not shard.connection.poll(self.reply_timeout):
+                    raise OSError("reply timed out")
+                return self._unwrap(i, shard.connection.recv())
+            except (OSError, EOFError) as e:
+                shard.drop()
+                if time.monotonic() > deadline:
+                    raise DistributedError(f"Shard {i} failed after retries: {e}") from e
+                time.sleep(0.2)
+
+    def _unwrap(self, i, reply):
+        status, value = reply
+        if status == 'ok':
+            return value
+        if status == 'stale':
+            # The worker came back with different data: merging would mix two versions
+            raise DistributedError(f"Shard {i} changed mid-query (now {value[:12]}); reload and rerun")
+        raise DistributedError(f"Shard {i}: {value}")
+
+    def describe(self):
+        rows = self._columns.rows if self._columns is not None else 0
+        return f"{len(self.shards)} shard workers ({rows:,} players)"
+
+    def shutdown(self):
+        for shard in self.shards:
+            if shard.connection is not None:
+                shard.connection.close()
+                shard.connection = None
+
+
+class LocalCluster:
+    """Shard workers as local processes, restarted when they die (for testing and single hosts)"""
+
+    def __init__(self, specs, host='127.0.0.1', base_port=7101, key=None):
+        # A fresh secret per cluster, handed to the children at spawn
+        self.key = key or os.urandom(32)
+        self.context = multiprocessing.get_context('spawn')
+        self.specs = {(host, base_port + i): spec for i, spec in enumerate(specs)}
+        self.processes = {}
+        self._lock = threading.Lock()
+        for address in self.specs:
+            self.start(address)
+
+    @property
+    def addresses(self):
+        return list(self.specs)
+
+    def start(self, address):
+        process = self.context.Process(target=serve_shard, args=(self.specs[address], address, self.key),
+                                       daemon=True)
+        process.start()
+        self.processes[address] = process
+
+    def ensure_running(self, address):
+        """Coordinator failure hook: restart the worker if its process is gone"""
+        with self._lock:
+            process = self.processes[address]
+            # A killed process stays "alive" until reaped; give a dying one a moment to exit
+            process.join(timeout=REAP_TIMEOUT_S)
+            if not process.is_alive():
+                self.start(address)
+
+    def kill(self, address):
+        process = self.processes[address]
+        process.kill()
+        process.join(timeout=5)
+
+    def coordinator(self, **options):
+        return ShardCoordinator(self.addresses, self.key, on_failure=self.ensure_running, **options)
+
+    def close(self):
+        for process in self.processes.values():
+            process.kill()
+        for process in self.processes.values():
+            process.join()
+
+
+def synthetic_specs(shards, rows):
+    """Synthetic shards of about rows/shards players each, with distinct seeds"""
+    edges = np.linspace(0, rows, shards + 1).astype(np.int64)
+    return [{'synthetic': int(b - a), 'seed': 42 + i} for i, (a, b) in enumerate(zip(edges[:-1], edges[1:]))]
+
+
+def run_analyses(coordinator, analyses, kill=None):
+    columns = coordinator.columns()
+    print(f"📡 {coordinator.describe()}")
+    for analysis in analyses:
+        if kill is not None and analysis == analyses[len(analyses) // 2]:
+            # Fault drill: kill a worker once its request is sent; the coordinator restarts and retries it
+            def kill_once(i):
+                coordinator.on_sent = None
+                kill()
+            coordinator.on_sent = kill_once
+        started = time.perf_counter()
+        results = compute_analysis(analysis, columns, coordinator)
+        print(f"{analysis:<14}{time.perf_counter() - started:>8.3f}s  rows={results.get('rows', columns.rows):,}")
+    print(f"requests={coordinator.stats['requests']} retries={coordinator.stats['retries']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gaming Analytics distributed shard aggregation")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    worker = commands.add_parser('worker', help="serve one shard")
+    worker.add_argument('--listen', default='127.0.0.1:7101')
+    shard = worker.add_mutually_exclusive_group(required=True)
+    shard.add_argument('--files', nargs='+', help="Parquet/Feather/CSV files of this shard")
+    shard.add_argument('--mongo-range', metavar='LO:HI', help="PlayerID range of the configured collection")
+    shard.add_argument('--synthetic', type=int, metavar='ROWS')
+    worker.add_argument('--seed', type=int, default=42)
+
+    run = commands.add_parser('run', help="coordinate analyses across running workers")
+    run.add_argument('--workers', required=True, help="comma-separated host:port list")
+    run.add_argument('--analysis', choices=sorted(ANALYSES), action='append')
+
+    local = commands.add_parser('local', help="spawn synthetic shard workers locally and run every analysis")
+    local.add_argument('--shards', type=int, default=4)
+    local.add_argument('--rows', type=int, default=2_000_000)
+    local.add_argument('--base-port', type=int, default=7101)
+    local.add_argument('--kill-one', action='store_true', help="kill a worker mid-run to exercise recovery")
+    args = parser.parse_args()
+
+    if args.command in ('worker', 'run'):
+        try:
+            authkey()
+        except DistributedError as e:
+            raise SystemExit(f"❌ {e}")
+    if args.command == 'worker':
+        if args.files:
+            spec = {'files': [os.path.join(BASE_DIR, path) for path in args.files]}
+        elif args.mongo_range:
+            lo, hi = args.mongo_range.split(':')
+            spec = {'mongo_range': [int(lo), int(hi)]}
+        else:
+            spec = {'synthetic': args.synthetic, 'seed': args.seed}
+        try:
+            serve_shard(spec, parse_address(args.listen))
+        except KeyboardInterrupt:
+            pass
+    elif args.command == 'run':
+        coordinator = ShardCoordinator([parse_address(text) for text in args.workers.split(',')])
+        try:
+            run_analyses(coordinator, args.analysis or list(ANALYSES))
+        finally:
+            coordinator.shutdown()
+    else:
+        cluster = LocalCluster(synthetic_specs(args.shards, args.rows), base_port=args.base_port)
+        coordinator = cluster.coordinator()
+        try:
+            kill = (lambda: cluster.kill(cluster.addresses[0])) if args.kill_one else None
+            run_analyses(coordinator, list(ANALYSES), kill)
+        finally:
+            coordinator.shutdown()
+            cluster.close()
+
+
+if __name__ == "__main__":
+    main()
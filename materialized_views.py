@@ -0,0 +1,184 @@
+# Materialized analysis views persisted on disk
+# The small per-block partial aggregates behind every chart are stored once per dataset
+# watermark; unchanged row blocks are reused when the data changes, so only new or
+# modified blocks are recomputed before the tab renders. Block boundaries are chosen by
+# row content rather than fixed offsets, so an inserted or deleted row (or a changed
+# MongoDB natural order) only changes the blocks around it, not every later block.
+
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from aggregates import (ANALYSES, CLUSTER_CODE_COLUMN, DERIVED_BINS, SEGMENT_CODE_COLUMN, WEIGHT_COLUMN,
+                        finalize_ranges, merge_partials)
+
+VIEW_FORMAT = 2
+# Average rows per block; a block ends after a row whose hash is 0 mod BLOCK_ROWS, and
+# block sizes are kept within [BLOCK_ROWS / 4, BLOCK_ROWS * 4]
+BLOCK_ROWS = 262_144
+MIN_BLOCK_FACTOR = 4
+MAX_BLOCK_FACTOR = 4
+ROW_HASH_SEED = np.uint64(0x9E3779B97F4A7C15)
+ROW_HASH_MULTIPLIER = np.uint64(0xBF58476D1CE4E5B9)
+
+
+def row_hashes(columns, names, start, stop):
+    """64-bit hash of each row's values in `names` (depends on nothing but the row)"""
+    hashes = np.full(stop - start, ROW_HASH_SEED, dtype=np.uint64)
+    for name in names:
+        hashes ^= np.ascontiguousarray(columns.arrays[name][start:stop], dtype=np.float64).view(np.uint64)
+        hashes *= ROW_HASH_MULTIPLIER
+        hashes ^= hashes >> np.uint64(31)
+    return hashes
+
+
+def block_bounds(columns, names, block_rows=BLOCK_ROWS):
+    """Content-defined (start, stop) row blocks of about `block_rows` rows"""
+    # Candidate cuts are found slice by slice so the row hashes never exist for the whole set
+    cuts = [np.flatnonzero(row_hashes(columns, names, start, min(start + block_rows, columns.rows))
+                           % np.uint64(block_rows) == 0) + start + 1
+            for start in range(0, columns.rows, block_rows)]
+    cuts = np.concatenate(cuts) if cuts else np.empty(0, dtype=np.int64)
+    min_rows, max_rows = max(block_rows // MIN_BLOCK_FACTOR, 1), block_rows * MAX_BLOCK_FACTOR
+    bounds = []
+    start = 0
+    # About rows / block_rows candidates, so this loop is short
+    for cut in cuts.tolist():
+        while cut - start > max_rows:
+            bounds.append((start, start + max_rows))
+            start += max_rows
+        if cut - start >= min_rows:
+            bounds.append((start, cut))
+            start = cut
+    while columns.rows - start > max_rows:
+        bounds.append((start, start + max_rows))
+        start += max_rows
+    if start < columns.rows:
+        bounds.append((start, columns.rows))
+    return bounds
+
+
+def block_fingerprints(columns, block_rows=BLOCK_ROWS):
+    """(bounds, hashes) of content-defined row blocks, cached on the column set"""
+    cached = getattr(columns, '_block_fingerprints', None)
+    if cached is not None:
+        return cached
+    # Output, weight and derived bin columns are functions of the hashed source columns
+    names = sorted(name for name in columns.arrays
+                   if name not in (SEGMENT_CODE_COLUMN, CLUSTER_CODE_COLUMN, WEIGHT_COLUMN)
+                   and name not in DERIVED_BINS)
+    bounds = block_bounds(columns, names, block_rows)
+    hashes = []
+    for start, stop in bounds:
+        digest = hashlib.blake2b(digest_size=16)
+        for name in names:
+            digest.update(name.encode())
+            digest.update(memoryview(np.ascontiguousarray(columns.arrays[name][start:stop])))
+        hashes.append(digest.hexdigest())
+    columns._block_fingerprints = (bounds, hashes)
+    return columns._block_fingerprints
+
+
+def dataset_watermark(columns):
+    """Version id of a column set: block hashes plus category dictionaries"""
+    _, hashes = block_fingerprints(columns)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps(columns.categories, sort_keys=True).encode())
+    for block_hash in hashes:
+        digest.update(block_hash.encode())
+    return digest.hexdigest()
+
+
+class MaterializedViewStore:
+    """Per-analysis partial aggregates on disk, keyed by scope (source + query)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _paths(self, scope, analysis):
+        scope_dir = os.path.join(self.directory, hashlib.blake2b(scope.encode(), digest_size=8).hexdigest())
+        return os.path.join(scope_dir, f'{analysis}.json'), os.path.join(scope_dir, f'{analysis}.npz')
+
+    def _read(self, scope, analysis):
+        manifest_path, blocks_path = self._paths(scope, analysis)
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            with np.load(blocks_path) as stored:
+                arrays = {key: stored[key] for key in stored.files}
+        except (OSError, ValueError):
+            return None, None
+        if manifest.get('format') != VIEW_FORMAT:
+            return None, None
+        blocks = [{key: values[i] for key, values in arrays.items()} for i in range(len(manifest['block_hashes']))]
+        return manifest, blocks
+
+    def _write(self, scope, analysis, manifest, blocks):
+        manifest_path, blocks_path = self._paths(scope, analysis)
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        stacked = {key: np.stack([block[key] for block in blocks]) for key in blocks[0]} if blocks else {}
+        # Write to temp files first so a crash never leaves a half-written view
+        suffix = f'.{os.getpid()}-{threading.get_ident()}.tmp'
+        np.savez(blocks_path + suffix + '.npz', **stacked)
+        with open(manifest_path + suffix, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(blocks_path + suffix + '.npz', blocks_path)
+        os.replace(manifest_path + suffix, manifest_path)
+
+    def load_or_build(self, analysis, columns, executor, scope='default'):
+        """Chart tables for `analysis`, from disk when current, else incrementally rebuilt
+
+        Returns (results, status) with status 'hit', 'incremental' or 'rebuilt'.
+        """
+        spec = ANALYSES[analysis]
+        bounds, hashes = block_fingerprints(columns)
+        watermark = dataset_watermark(columns)
+        params = {'categories': columns.categories, 'range_fields': spec['ranges']}
+        manifest, stored_blocks = self._read(scope, analysis)
+
+        if manifest is not None and manifest['watermark'] == watermark:
+            params['ranges'] = {key: tuple(value) for key, value in manifest['ranges'].items()}
+            return spec['finalize'](merge_partials(_strip(stored_blocks, 'agg__')), params), 'hit'
+
+        # Blocks whose content hash is unchanged can reuse their stored partials
+        reusable = {}
+        if manifest is not None and manifest['categories'] == columns.categories:
+            reusable = {block_hash: stored_blocks[i] for i, block_hash in enumerate(manifest['block_hashes'])}
+        stale = [i for i, block_hash in enumerate(hashes) if block_hash not in reusable]
+
+        fresh_ranges = dict(zip(stale, executor.map_chunks('ranges', columns, params, [bounds[i] for i in stale])))
+        range_blocks = [fresh_ranges[i] if i in fresh_ranges else _strip([reusable[h]], 'ranges__')[0]
+                        for i, h in enumerate(hashes)]
+        params['ranges'] = finalize_ranges(merge_partials(range_blocks), spec['ranges'])
+
+        # New histogram edges invalidate every stored histogram
+        if manifest is None or {k: tuple(v) for k, v in manifest['ranges'].items()} != params['ranges']:
+            stale = list(range(len(hashes)))
+
+        fresh = dict(zip(stale, executor.map_chunks(analysis, columns, params, [bounds[i] for i in stale])))
+        agg_blocks = [fresh[i] if i in fresh else _strip([reusable[h]], 'agg__')[0] for i, h in enumerate(hashes)]
+
+        blocks = []
+        for range_block, agg_block in zip(range_blocks, agg_blocks):
+            block = {f'ranges__{key}': value for key, value in range_block.items()}
+            block.update({f'agg__{key}': value for key, value in agg_block.items()})
+            blocks.append(block)
+        self._write(scope, analysis, {
+            'format': VIEW_FORMAT,
+            'watermark': watermark,
+            'categories': columns.categories,
+            'ranges': {key: list(value) for key, value in params['ranges'].items()},
+            'block_hashes': hashes,
+        }, blocks)
+
+        status = 'rebuilt' if len(stale) == len(hashes) else 'incremental'
+        return spec['finalize'](merge_partials(agg_blocks), params), status
+
+
+def _strip(blocks, prefix):
+    """Select one family of stored keys and drop its prefix"""
+    return [{key[len(prefix):]: value for key, value in block.items() if key.startswith(prefix)}
+            for block in blocks]
@@ -0,0 +1,208 @@
+# Memory budget governor
+# Tracks process RSS and the footprint of the dataset and caches against a budget. Over
+# budget it releases consumers in priority order (dropping regenerable caches, spilling
+# column data to memory-mapped files); before a load it sizes the dataset so one that
+# cannot fit is downsampled or refused instead of running the workstation out of memory.
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from aggregates import CATEGORICAL_FIELDS, NUMERIC_FIELDS
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# In-memory cost of one cleaned player row: DataFrame column plus its NumPy ColumnSet copy
+BYTES_PER_ROW = 2 * 8 * len(NUMERIC_FIELDS) + 5 * len(CATEGORICAL_FIELDS) + 16
+# Transient cost while loading (decode buffers, cleaning copies)
+LOAD_OVERHEAD = 2.0
+# Smallest sample worth loading when the full dataset does not fit
+MIN_SAMPLE_FRACTION = 0.01
+# Default budget when none is configured: this share of physical memory
+DEFAULT_BUDGET_SHARE = 0.6
+
+GIB = 2**30
+MIB = 2**20
+
+
+class MemoryBudgetError(Exception):
+    """Raised when a load cannot fit in the memory budget"""
+
+
+def current_rss():
+    """Resident set size of this process in bytes (0 when it cannot be read)"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def physical_memory():
+    if psutil is not None:
+        return psutil.virtual_memory().total
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def is_mapped(values):
+    """True when an array's memory is backed by a file mapping"""
+    while values is not None:
+        if isinstance(values, np.memmap):
+            return True
+        values = getattr(values, 'base', None)
+    return False
+
+
+def array_footprint(values):
+    """Anonymous (non file-backed) bytes held by an array"""
+    values = np.asarray(values)
+    return 0 if is_mapped(values) else values.nbytes
+
+
+def columns_footprint(columns):
+    if columns is None:
+        return 0
+    return sum(array_footprint(values) for values in columns.arrays.values())
+
+
+def frame_footprint(data):
+    if data is None:
+        return 0
+    total = 0
+    for name in data.columns:
+        series = data[name]
+        if series.dtype == object:
+            total += int(series.memory_usage(deep=True, index=False))
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            total += int(series.memory_usage(index=False))
+        else:
+            total += array_footprint(series.to_numpy(copy=False))
+    return total + int(data.index.memory_usage())
+
+
+def format_bytes(size):
+    return f"{size / GIB:.1f} GiB" if size >= GIB else f"{size / MIB:.0f} MiB"
+
+
+class MemoryGovernor:
+    """Budget for the dataset and caches; releases tracked consumers when over it"""
+
+    def __init__(self, budget_bytes=None, spill_dir=None, on_over_budget='downsample'):
+        if on_over_budget not in ('downsample', 'refuse'):
+            raise ValueError(f"Unknown over-budget policy: {on_over_budget}")
+        physical = physical_memory()
+        self.budget = budget_bytes or int((physical or 8 * GIB) * DEFAULT_BUDGET_SHARE)
+        self.spill_dir = spill_dir
+        self.on_over_budget = on_over_budget
+        # Interpreter, libraries and Tk: memory that is not ours to manage
+        self.baseline = current_rss()
+        self._consumers = {}
+        self._spill_dirs = []
+
+    @classmethod
+    def from_config(cls, config, base_dir='.'):
+        budget_mb = os.environ.get('GAMING_MEMORY_BUDGET_MB') or config.get('budget_mb')
+        spill_dir = config.get('spill_dir')
+        return cls(budget_bytes=int(float(budget_mb) * MIB) if budget_mb else None,
+                   spill_dir=os.path.join(base_dir, spill_dir) if spill_dir else None,
+                   on_over_budget=config.get('on_over_budget', 'downsample'))
+
+    def track(self, name, footprint, release=None, priority=0):
+        """Register a consumer: footprint() -> bytes; release() frees it (lowest priority first)"""
+        self._consumers[name] = (footprint, release, priority)
+
+    def usage(self):
+        return {name: footprint() for name, (footprint, _, _) in self._consumers.items()}
+
+    def tracked_bytes(self):
+        return sum(self.usage().values())
+
+    def over_budget(self):
+        return self.baseline + self.tracked_bytes() > self.budget
+
+    def enforce(self):
+        """Release consumers until the tracked footprint fits; returns the released names"""
+        released = []
+        for name, (footprint, release, _) in sorted(self._consumers.items(), key=lambda item: item[1][2]):
+            if not self.over_budget():
+                break
+            if release is not None and footprint() > 0:
+                release()
+                released.append(name)
+        return released
+
+    def plan_load(self, rows, replacing=0):
+        """Fraction of `rows` that fits (1.0 = everything); raises MemoryBudgetError to refuse
+
+        `replacing` is the footprint of the dataset the load will replace.
+        """
+        if rows is None or rows <= 0:
+            return 1.0
+        available = self.budget - self.baseline - (self.tracked_bytes() - replacing)
+        needed = rows * BYTES_PER_ROW * LOAD_OVERHEAD
+        if needed <= available:
+            return 1.0
+        fraction = max(available, 0) / needed
+        if self.on_over_budget == 'refuse' or fraction < MIN_SAMPLE_FRACTION:
+            raise MemoryBudgetError(f"Loading {rows:,} players needs about {format_bytes(needed)} but only "
+                                    f"{format_bytes(max(available, 0))} of the {format_bytes(self.budget)} "
+                                    f"budget is free")
+        # Round down so repeated plans give the same (hashed-sample) slice
+        return np.floor(fraction * 1000) / 1000
+
+    def spill_columns(self, columns, names=None):
+        """Move ColumnSet arrays into memory-mapped files the OS can page out"""
+        directory = tempfile.mkdtemp(prefix='gaming_spill_', dir=self._spill_root())
+        self._spill_dirs.append(directory)
+        for name in names or list(columns.arrays):
+            values = columns.arrays[name]
+            if is_mapped(values) or len(values) == 0:
+                continue
+            path = os.path.join(directory, f'{name}.col')
+            mapped = np.memmap(path, dtype=values.dtype, mode='w+', shape=values.shape)
+            mapped[:] = values
+            mapped.flush()
+            columns.arrays[name] = mapped
+        return columns
+
+    def _spill_root(self):
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+        return self.spill_dir
+
+    def describe(self):
+        rss = current_rss()
+        parts = ', '.join(f"{name} {format_bytes(size)}" for name, size in self.usage().items() if size >= MIB)
+        return f"🧠 RSS {format_bytes(rss)} / {format_bytes(self.budget)}" + (f" ({parts})" if parts else '')
+
+    def close(self):
+        for directory in self._spill_dirs:
+            shutil.rmtree(directory, ignore_errors=True)
+        self._spill_dirs = []
+
+
+def frame_over_columns(data, columns, names):
+    """Rebuild `data` so the named numeric columns are views of the (spilled) ColumnSet arrays
+
+    The frame and the kernels then share one file-backed copy instead of two in RAM. Only
+    columns whose dtype matches their array are rebased; every other column (categorical
+    codes, text) is kept as the original Series so nothing is densified.
+    """
+    arrays = {}
+    for name in data.columns:
+        if name in names and name in columns.arrays and data[name].dtype == columns.arrays[name].dtype:
+            arrays[name] = columns.arrays[name]
+        else:
+            arrays[name] = data[name]
+    return pd.DataFrame(arrays, index=data.index, copy=False)
@@ -0,0 +1,126 @@
+# Multi-core execution backend for the analysis kernels
+# Columns are copied once into memory-mapped files; worker processes attach to them
+# by path and only row ranges and small partial aggregates cross process boundaries.
+
+import os
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from aggregates import merge_partials, run_kernel
+
+# Smallest row range worth shipping to a worker
+MIN_CHUNK_ROWS = 50_000
+# Below this many rows a kernel runs in-process: a pool round trip costs about 5 ms per
+# analysis, more than the whole serial computation saves (cheapest kernels: ~20 ns/row)
+PARALLEL_MIN_ROWS = 1_000_000
+
+# Worker-side cache of attached column files, keyed by store directory
+_ATTACHED = {}
+
+
+def _shared_directory():
+    """Prefer RAM-backed /dev/shm so the mapped columns never touch the disk"""
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return None
+
+
+class SharedColumnStore:
+    """Memory-mapped copy of a ColumnSet that worker processes can attach to"""
+
+    def __init__(self, columns, directory=None):
+        self.directory = tempfile.mkdtemp(prefix='gaming_columns_', dir=directory or _shared_directory())
+        self.categories = columns.categories
+        self.rows = columns.rows
+        self.specs = {}
+        self.arrays = {}
+        for name, values in columns.arrays.items():
+            if len(values) == 0:
+                # mmap cannot map empty files; empty stores never reach the pool
+                self.arrays[name] = values.copy()
+                continue
+            path = os.path.join(self.directory, f'{name}.col')
+            mapped = np.memmap(path, dtype=values.dtype, mode='w+', shape=values.shape)
+            mapped[:] = values
+            mapped.flush()
+            self.specs[name] = (path, values.dtype.str, values.shape[0])
+            self.arrays[name] = mapped
+
+    def close(self):
+        """Drop the mappings and delete the backing files"""
+        self.arrays = {}
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _attach(directory, specs):
+    arrays = _ATTACHED.get(directory)
+    if arrays is None:
+        # A new store replaces any older one this worker was holding
+        _ATTACHED.clear()
+        arrays = {name: np.memmap(path, dtype=np.dtype(dtype), mode='r+', shape=(rows,))
+                  for name, (path, dtype, rows) in specs.items()}
+        _ATTACHED[directory] = arrays
+    return arrays
+
+
+def _run_chunk(directory, specs, kernel, start, stop, params):
+    return run_kernel(kernel, _attach(directory, specs), start, stop, params)
+
+
+class ParallelExecutor:
+    """Splits row ranges of a SharedColumnStore across a process pool and merges partials"""
+    name = 'parallel'
+
+    def __init__(self, workers=None, chunks_per_worker=4, min_rows=PARALLEL_MIN_ROWS):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunks_per_worker = chunks_per_worker
+        self.min_rows = min_rows
+        self._pool = None
+
+    def runs_serially(self, rows):
+        """Whether `rows` rows are computed in-process (too few rows, or a single worker)"""
+        return self.workers <= 1 or rows < self.min_rows
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn keeps Tk, threads and open Mongo sockets out of the workers
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def chunk_bounds(self, rows):
+        n_chunks = max(1, min(self.workers * self.chunks_per_worker, rows // MIN_CHUNK_ROWS))
+        edges = np.linspace(0, rows, n_chunks + 1).astype(np.int64)
+        return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+    def map_reduce(self, kernel, store, params):
+        if not isinstance(store, SharedColumnStore):
+            raise TypeError("ParallelExecutor needs a SharedColumnStore")
+        bounds = self.chunk_bounds(store.rows)
+        if len(bounds) <= 1 or self.runs_serially(store.rows):
+            # Not worth a round trip through the pool
+            return run_kernel(kernel, store.arrays, 0, store.rows, params)
+        pool = self._get_pool()
+        futures = [pool.submit(_run_chunk, store.directory, store.specs, kernel, start, stop, params)
+                   for start, stop in bounds]
+        return merge_partials([future.result() for future in futures])
+
+    def map_chunks(self, kernel, store, params, bounds):
+        """Unmerged partials, one per (start, stop) row range, computed on the pool"""
+        if not bounds:
+            return []
+        if self.runs_serially(sum(stop - start for start, stop in bounds)):
+            return [run_kernel(kernel, store.arrays, start, stop, params) for start, stop in bounds]
+        pool = self._get_pool()
+        futures = [pool.submit(_run_chunk, store.directory, store.specs, kernel, start, stop, params)
+                   for start, stop in bounds]
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
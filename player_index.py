@@ -0,0 +1,159 @@
+# PlayerID index and top-k heavy-hitter views for player drill-down
+# Built per content-defined row block (the materialized-view blocks): each block keeps its
+# PlayerIDs sorted for binary search and its top candidates per ranking field and
+# GameGenre (np.argpartition), as rows relative to the block. Blocks whose contents are
+# unchanged on refresh are reused wherever they moved to, then the per-block candidates are merged into ready-sorted top lists, so a lookup or a
+# top-k query never scans the player table.
+
+import hashlib
+import json
+import time
+
+import numpy as np
+
+from materialized_views import BLOCK_ROWS, block_fingerprints
+
+TOP_FIELDS = ['InGamePurchases', 'PlayTimeHours', 'ToxicityLevel']
+# Largest k served from the maintained lists (candidates kept per block and genre)
+MAX_TOP_K = 1000
+ALL_GENRES = None
+
+
+class PlayerIndexBlock:
+    """Sorted PlayerIDs and top candidates of one row block (rows relative to the block start)"""
+
+    def __init__(self, ids, columns, start, stop, genres):
+        order = np.argsort(ids[start:stop], kind='stable')
+        self.sorted_ids = ids[start:stop][order]
+        self.rows = order.astype(np.int64)
+        self.top = {}
+        genre_codes = columns.arrays['GameGenre'][start:stop] if 'GameGenre' in columns.arrays else None
+        for field in TOP_FIELDS:
+            if field not in columns.arrays:
+                continue
+            values = columns.arrays[field][start:stop]
+            valid = ~np.isnan(values)
+            self.top[(field, ALL_GENRES)] = top_candidates(values, np.flatnonzero(valid))
+            if genre_codes is not None:
+                for code in range(len(genres)):
+                    self.top[(field, code)] = top_candidates(values, np.flatnonzero(valid & (genre_codes == code)))
+
+    def find(self, player_id):
+        lo = np.searchsorted(self.sorted_ids, player_id, side='left')
+        hi = np.searchsorted(self.sorted_ids, player_id, side='right')
+        return self.rows[lo:hi]
+
+    @property
+    def nbytes(self):
+        return (self.sorted_ids.nbytes + self.rows.nbytes +
+                sum(rows.nbytes + values.nbytes for rows, values in self.top.values()))
+
+
+def top_candidates(values, rows, k=MAX_TOP_K):
+    """(rows, values) of the k largest values among `rows` (block-local), unsorted"""
+    if len(rows) > k:
+        rows = rows[np.argpartition(-values[rows], k - 1)[:k]]
+    return rows, values[rows]
+
+
+def player_ids(data):
+    """PlayerID column as a searchable array (int64 when numeric, else str)"""
+    ids = data['PlayerID'].to_numpy()
+    if ids.dtype.kind in 'iu':
+        return ids.astype(np.int64, copy=False)
+    if ids.dtype.kind == 'f' and not np.isnan(ids).any() and (ids == np.round(ids)).all():
+        return ids.astype(np.int64)
+    return ids.astype(str)
+
+
+class PlayerIndex:
+    """Point lookups by PlayerID and top-k players per ranking field and GameGenre"""
+
+    def __init__(self, blocks, keys, starts, genres, numeric):
+        self.blocks = blocks
+        self.keys = keys
+        # Row offset of each block in the indexed frame (a reused block may have moved)
+        self.starts = starts
+        self.genres = genres
+        self.numeric = numeric
+        self.top = {}
+        self.reused_blocks = 0
+        self.build_s = 0.0
+
+    @classmethod
+    def build(cls, data, columns, previous=None):
+        """Index for `data`/`columns`, reusing unchanged blocks of a previous index"""
+        started = time.perf_counter()
+        if 'PlayerID' not in data.columns:
+            raise ValueError("The player table has no PlayerID column")
+        ids = player_ids(data)
+        genres = columns.categories.get('GameGenre', [])
+        bounds, hashes = block_fingerprints(columns)
+        # The column fingerprints cover metrics and genre codes; ids and dictionaries are added here
+        context = json.dumps([genres, str(ids.dtype), BLOCK_ROWS, MAX_TOP_K, TOP_FIELDS]).encode()
+        reusable = dict(zip(previous.keys, previous.blocks)) if previous is not None else {}
+        blocks, keys, starts = [], [], []
+        reused = 0
+        for (start, stop), block_hash in zip(bounds, hashes):
+            digest = hashlib.blake2b(context, digest_size=16)
+            digest.update(block_hash.encode())
+            digest.update(memoryview(np.ascontiguousarray(ids[start:stop])))
+            # Keyed by content only, so a block shifted by an upstream insert or delete is still reused
+            key = digest.hexdigest()
+            block = reusable.get(key)
+            if block is None:
+                block = PlayerIndexBlock(ids, columns, start, stop, genres)
+            else:
+                reused += 1
+            blocks.append(block)
+            keys.append(key)
+            starts.append(start)
+
+        index = cls(blocks, keys, starts, genres, ids.dtype.kind == 'i')
+        index._merge_top()
+        index.reused_blocks = reused
+        index.build_s = time.perf_counter() - started
+        return index
+
+    def _merge_top(self):
+        # One sorted MAX_TOP_K list per (field, genre) from all blocks' candidates
+        for key in (self.blocks[0].top if self.blocks else {}):
+            rows = np.concatenate([block.top[key][0] + start for block, start in zip(self.blocks, self.starts)])
+            values = np.concatenate([block.top[key][1] for block in self.blocks])
+            if len(values) > MAX_TOP_K:
+                keep = np.argpartition(-values, MAX_TOP_K - 1)[:MAX_TOP_K]
+                rows, values = rows[keep], values[keep]
+            order = np.argsort(-values, kind='stable')
+            self.top[key] = (rows[order], values[order])
+
+    def lookup(self, player_id):
+        """Row positions (into the indexed frame) of a PlayerID; empty when unknown"""
+        try:
+            key = int(player_id) if self.numeric else str(player_id)
+        except (TypeError, ValueError):
+            return np.empty(0, dtype=np.int64)
+        found = []
+        for block, start in zip(self.blocks, self.starts):
+            rows = block.find(key)
+            if len(rows):
+                found.append(rows + start)
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def top_k(self, field, k=100, genre=ALL_GENRES):
+        """(rows, values) of the k highest `field` players, optionally within one GameGenre"""
+        if not 0 < k <= MAX_TOP_K:
+            raise ValueError(f"k must be between 1 and {MAX_TOP_K}")
+        if field not in TOP_FIELDS:
+            raise ValueError(f"No top-k view for {field} (have {', '.join(TOP_FIELDS)})")
+        code = ALL_GENRES if genre is ALL_GENRES else self.genres.index(genre) if genre in self.genres else -1
+        rows, values = self.top.get((field, code), (np.empty(0, dtype=np.int64), np.empty(0)))
+        return rows[:k], values[:k]
+
+    @property
+    def nbytes(self):
+        return (sum(block.nbytes for block in self.blocks) +
+                sum(rows.nbytes + values.nbytes for rows, values in self.top.values()))
+
+    def describe(self):
+        return (f"{len(self.blocks)} blocks ({self.reused_blocks} reused), built in {self.build_s * 1000:.0f} ms, "
+                f"{self.nbytes / 2**20:.0f} MiB")
@@ -0,0 +1,313 @@
+# Query builder for filtered and sampled player loads
+# Filters and sampling are pushed to MongoDB as an aggregation pipeline; local sources
+# (CSV, cache, synthetic) apply the same query with pandas so results stay comparable.
+
+import string
+
+import numpy as np
+import pandas as pd
+
+# Fields used to judge how representative a sample is
+REPORT_NUMERIC_FIELDS = ['Age', 'PlayTimeHours', 'InGamePurchases', 'SessionsPerWeek']
+REPORT_CATEGORICAL_FIELDS = ['GameGenre', 'Location']
+
+# Hashed-ID sampling: Knuth multiplicative hash of PlayerID into HASH_BUCKETS buckets; IDs that
+# are not integers (e.g. 'P000001', ObjectIds) are first keyed by a polynomial hash of their
+# text. The server pipeline and sample_frame compute the same buckets.
+HASH_MULTIPLIER = 2654435761
+HASH_BUCKETS = 10000
+HASH_ALPHABET = string.digits + string.ascii_letters + string.punctuation
+TEXT_HASH_BASE = 131
+TEXT_HASH_MODULUS = 1_000_003
+# Integer IDs are reduced below 2**31 first, so key * HASH_MULTIPLIER never overflows int64
+ID_KEY_MODULUS = 2**31
+
+SAMPLE_METHODS = ['sample', 'hashed']
+
+
+class PlayerQuery:
+    """Filters (Location, GameGenre, Age, spend) plus optional uniform sampling"""
+
+    def __init__(self, locations=None, genres=None, age_range=None, spend_range=None,
+                 sample_fraction=None, sample_method='sample', seed=None):
+        if sample_method not in SAMPLE_METHODS:
+            raise ValueError(f"Unknown sample method: {sample_method}")
+        if sample_fraction is not None and not 0 < sample_fraction <= 1:
+            raise ValueError("sample_fraction must be in (0, 1]")
+        self.locations = list(locations or [])
+        self.genres = list(genres or [])
+        self.age_range = age_range
+        self.spend_range = spend_range
+        self.sample_fraction = sample_fraction
+        self.sample_method = sample_method
+        self.seed = seed
+
+    @property
+    def is_sampled(self):
+        return self.sample_fraction is not None and self.sample_fraction < 1
+
+    def downsampled(self, fraction):
+        """Same filters, keeping only `fraction` of what this query would return"""
+        if fraction >= 1:
+            return self
+        method = self.sample_method if self.is_sampled else 'hashed'
+        return PlayerQuery(self.locations, self.genres, self.age_range, self.spend_range,
+                           sample_fraction=(self.sample_fraction or 1.0) * fraction,
+                           sample_method=method, seed=self.seed)
+
+    def to_filter(self):
+        """MongoDB filter document for the non-sampling part of the query"""
+        query = {}
+        if self.locations:
+            query['Location'] = {'$in': self.locations}
+        if self.genres:
+            query['GameGenre'] = {'$in': self.genres}
+        for field, bounds in (('Age', self.age_range), ('InGamePurchases', self.spend_range)):
+            if bounds is not None:
+                lo, hi = bounds
+                condition = {}
+                if lo is not None:
+                    condition['$gte'] = lo
+                if hi is not None:
+                    condition['$lte'] = hi
+                if condition:
+                    query[field] = condition
+        return query
+
+    def to_pipeline(self, matching_count=None):
+        """Aggregation pipeline; `matching_count` sizes $sample (needed for method='sample')"""
+        pipeline = [{'$match': self.to_filter()}]
+        if self.is_sampled:
+            if self.sample_method == 'sample':
+                size = max(1, int(round(matching_count * self.sample_fraction)))
+                pipeline.append({'$sample': {'size': size}})
+            else:
+                # Deterministic slice: the same players come back on every reload
+                threshold = int(round(self.sample_fraction * HASH_BUCKETS))
+                pipeline.append({'$match': {'$expr': {'$lt': [bucket_expression(), threshold]}}})
+        pipeline.append({'$project': {'_id': 0}})
+        return pipeline
+
+    def filter_frame(self, data):
+        """Apply the filters to an in-memory frame"""
+        mask = np.ones(len(data), dtype=bool)
+        if self.locations:
+            mask &= data['Location'].isin(self.locations).to_numpy()
+        if self.genres:
+            mask &= data['GameGenre'].isin(self.genres).to_numpy()
+        for field, bounds in (('Age', self.age_range), ('InGamePurchases', self.spend_range)):
+            if bounds is not None:
+                values = pd.to_numeric(data[field], errors='coerce')
+                lo, hi = bounds
+                if lo is not None:
+                    mask &= (values >= lo).to_numpy()
+                if hi is not None:
+                    mask &= (values <= hi).to_numpy()
+        return data[mask]
+
+    def sample_frame(self, data, rng=None):
+        """Apply the sampling step to an (already filtered) in-memory frame
+
+        With `rng` (chunked loads), 'sample' keeps each row with probability sample_fraction,
+        so chunks can be sampled independently.
+        """
+        if not self.is_sampled:
+            return data
+        if self.sample_method == 'sample':
+            if rng is not None:
+                return data[rng.random(len(data)) < self.sample_fraction]
+            return data.sample(frac=self.sample_fraction, random_state=self.seed)
+        return data[id_buckets(data['PlayerID']) < int(round(self.sample_fraction * HASH_BUCKETS))]
+
+    def describe(self):
+        parts = []
+        if self.locations:
+            parts.append(f"Location in {', '.join(self.locations)}")
+        if self.genres:
+            parts.append(f"GameGenre in {', '.join(self.genres)}")
+        if self.age_range:
+            parts.append(f"Age {self.age_range[0]}-{self.age_range[1]}")
+        if self.spend_range:
+            parts.append(f"Spend ${self.spend_range[0]}-${self.spend_range[1]}")
+        if self.is_sampled:
+            method = '$sample' if self.sample_method == 'sample' else 'hashed PlayerID'
+            parts.append(f"{self.sample_fraction * 100:g}% {method} sample")
+        return "; ".join(parts) or "All players"
+
+
+def bucket_expression():
+    """Aggregation expression of a document's PlayerID hash bucket (see id_buckets)"""
+    text_hash = {'$reduce': {
+        'input': {'$range': [0, {'$strLenCP': '$$text'}]},
+        'initialValue': 0,
+        'in': {'$mod': [{'$add': [{'$multiply': ['$$value', TEXT_HASH_BASE]},
+                                  {'$indexOfCP': [HASH_ALPHABET, {'$substrCP': ['$$text', '$$this', 1]}]}, 1]},
+                        TEXT_HASH_MODULUS]},
+    }}
+    key = {'$let': {
+        'vars': {'id': {'$convert': {'input': '$PlayerID', 'to': 'long', 'onError': None, 'onNull': None}},
+                 'text': {'$convert': {'input': '$PlayerID', 'to': 'string', 'onError': '', 'onNull': ''}}},
+        'in': {'$cond': [{'$eq': ['$$id', None]}, text_hash, {'$mod': [{'$abs': '$$id'}, ID_KEY_MODULUS]}]},
+    }}
+    return {'$mod': [{'$multiply': [key, HASH_MULTIPLIER]}, HASH_BUCKETS]}
+
+
+def text_key(text):
+    """Integer hash key of a non-integer PlayerID's text; unknown characters count as 0"""
+    value = 0
+    for char in text:
+        value = (value * TEXT_HASH_BASE + HASH_ALPHABET.find(char) + 1) % TEXT_HASH_MODULUS
+    return value
+
+
+def id_buckets(ids):
+    """Hash bucket per PlayerID, matching bucket_expression on the server"""
+    numbers = pd.to_numeric(ids, errors='coerce').to_numpy(dtype=np.float64)
+    numeric = np.isfinite(numbers)
+    keys = np.empty(len(ids), dtype=np.int64)
+    keys[numeric] = np.abs(numbers[numeric].astype(np.int64)) % ID_KEY_MODULUS
+    if not numeric.all():
+        # Text IDs: hashed once per distinct value (missing IDs hash as '')
+        text = ids[~numeric]
+        codes, uniques = pd.factorize(text.astype(object).where(text.notna(), '').astype(str))
+        keys[~numeric] = np.array([text_key(value) for value in uniques], dtype=np.int64)[codes]
+    return keys * HASH_MULTIPLIER % HASH_BUCKETS
+
+
+def recommend_indexes(query, existing=None):
+    """Index advice following the equality-sort-range rule
+
+    Equality filters ($in on Location/GameGenre) lead the key, followed by one range field
+    (Age before spend). Returns (key, covered) pairs, `existing` being index_information().
+    """
+    keys = []
+    if query.genres:
+        keys.append(('GameGenre', 1))
+    if query.locations:
+        keys.append(('Location', 1))
+    ranges = [field for field, bounds in (('Age', query.age_range), ('InGamePurchases', query.spend_range))
+              if bounds is not None]
+    if ranges:
+        keys.append((ranges[0], 1))
+    if not keys:
+        return []
+
+    recommendations = [keys]
+    if len(ranges) > 1:
+        # A second range field can only be used from its own index
+        recommendations.append(keys[:-1] + [(ranges[1], 1)])
+
+    existing_keys = [list(map(tuple, info['key'])) for info in (existing or {}).values()]
+    return [(key, any(index[:len(key)] == key for index in existing_keys)) for key in recommendations]
+
+
+class PopulationSummary:
+    """summarize_frame accumulated over chunks (moments merged pairwise, like the kernels)"""
+
+    def __init__(self):
+        self.count = 0
+        self.moments = {}
+        self.categorical = {}
+
+    def add(self, data):
+        self.count += len(data)
+        for field in REPORT_NUMERIC_FIELDS:
+            if field in data.columns:
+                values = pd.to_numeric(data[field], errors='coerce').dropna().to_numpy(dtype=np.float64)
+                n, mean = len(values), values.mean() if len(values) else 0.0
+                m2 = float(((values - mean) ** 2).sum())
+                n0, mean0, m20 = self.moments.get(field, (0, 0.0, 0.0))
+                total = n0 + n
+                delta = mean - mean0
+                self.moments[field] = (total, mean0 + delta * n / total if total else 0.0,
+                                       m20 + m2 + delta ** 2 * n0 * n / total if total else 0.0)
+        for field in REPORT_CATEGORICAL_FIELDS:
+            if field in data.columns:
+                counts = self.categorical.setdefault(field, {})
+                for value, n in data[field].astype(str).value_counts().items():
+                    counts[value] = counts.get(value, 0) + int(n)
+
+    def result(self):
+        """Population summary, in the same shape as the server-side summary"""
+        numeric = {field: {'mean': mean if n else np.nan, 'std': np.sqrt(m2 / n) if n else np.nan}
+                   for field, (n, mean, m2) in self.moments.items()}
+        return {'count': self.count, 'numeric': numeric, 'categorical': self.categorical}
+
+
+def summarize_frame(data):
+    """Population summary of a frame, in the same shape as the server-side summary"""
+    summary = PopulationSummary()
+    summary.add(data)
+    return summary.result()
+
+
+def summarize_collection(collection, query):
+    """Server-side population summary of the filtered (unsampled) collection"""
+    group = {'_id': None, 'count': {'$sum': 1}}
+    for field in REPORT_NUMERIC_FIELDS:
+        group[f'{field}_mean'] = {'$avg': f'${field}'}
+        group[f'{field}_std'] = {'$stdDevPop': f'${field}'}
+    facets = {'totals': [{'$group': group}]}
+    for field in REPORT_CATEGORICAL_FIELDS:
+        facets[field] = [{'$group': {'_id': f'${field}', 'n': {'$sum': 1}}}]
+
+    result = next(collection.aggregate([{'$match': query.to_filter()}, {'$facet': facets}],
+                                       allowDiskUse=True))
+    totals = result['totals'][0] if result['totals'] else {'count': 0}
+    summary = {'count': totals['count'], 'numeric': {}, 'categorical': {}}
+    for field in REPORT_NUMERIC_FIELDS:
+        if totals.get(f'{field}_mean') is not None:
+            summary['numeric'][field] = {'mean': totals[f'{field}_mean'], 'std': totals[f'{field}_std']}
+    for field in REPORT_CATEGORICAL_FIELDS:
+        summary['categorical'][field] = {str(row['_id']): row['n'] for row in result[field]}
+    return summary
+
+
+def representativeness(sample, population):
+    """Compare a loaded sample against its population summary
+
+    Numeric fields get a z-score of the sample mean (with finite population correction)
+    and a 95% margin of error; categorical fields get the total variation distance.
+    """
+    n, big_n = len(sample), population['count']
+    sample_summary = summarize_frame(sample)
+    fpc = np.sqrt(max(big_n - n, 0) / (big_n - 1)) if big_n > 1 else 0.0
+    report = {'sample_rows': n, 'population_rows': big_n, 'numeric': {}, 'categorical': {}}
+
+    for field, stats in population['numeric'].items():
+        if field not in sample_summary['numeric']:
+            continue
+        sample_mean = sample_summary['numeric'][field]['mean']
+        se = stats['std'] / np.sqrt(n) * fpc if n else np.nan
+        z = (sample_mean - stats['mean']) / se if se and se > 0 else 0.0
+        report['numeric'][field] = {'sample_mean': sample_mean, 'population_mean': stats['mean'],
+                                    'margin_95': 1.96 * se, 'z': z}
+
+    for field, counts in population['categorical'].items():
+        sample_counts = sample_summary['categorical'].get(field, {})
+        keys = set(counts) | set(sample_counts)
+        total_pop = sum(counts.values()) or 1
+        total_sample = sum(sample_counts.values()) or 1
+        tvd = 0.5 * sum(abs(counts.get(k, 0) / total_pop - sample_counts.get(k, 0) / total_sample) for k in keys)
+        report['categorical'][field] = {'tvd': tvd}
+
+    report['representative'] = (all(abs(v['z']) < 3 for v in report['numeric'].values()) and
+                                all(v['tvd'] < 0.05 for v in report['categorical'].values()))
+    return report
+
+
+def format_report(query, report, indexes):
+    """Text block for the data overview panel"""
+    lines = [f"🔎 Query: {query.describe()}",
+             f"• Loaded {report['sample_rows']:,} of {report['population_rows']:,} matching players"]
+    for field, stats in report['numeric'].items():
+        lines.append(f"• {field}: sample {stats['sample_mean']:.2f} vs population {stats['population_mean']:.2f} "
+                     f"(±{stats['margin_95']:.2f} @95%, z={stats['z']:+.1f})")
+    for field, stats in report['categorical'].items():
+        lines.append(f"• {field} mix: total variation distance {stats['tvd']:.3f}")
+    lines.append("✅ Sample is representative" if report['representative']
+                 else "⚠️ Sample deviates from the population - consider a larger fraction")
+    for key, covered in indexes:
+        spec = ", ".join(f"{field}: {direction}" for field, direction in key)
+        lines.append(f"{'✅ Index in place' if covered else '💡 Recommended index'}: {{{spec}}}")
+    return "\n".join(lines)
@@ -0,0 +1,144 @@
+# Rendered-figure cache
+# PNG/SVG/PDF bytes of rendered tabs, keyed by (dataset version, analysis, variant, canvas
+# size, dpi, format). Recently used entries stay in memory; entries evicted from the memory
+# budget spill to disk, which has its own budget, both in LRU order.
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+MEMORY_BUDGET = 256 * 2**20
+DISK_BUDGET = 1024 * 2**20
+
+
+def cache_digest(key):
+    """Stable file-name-safe id of a cache key tuple"""
+    return hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+
+
+class RenderCache:
+    """Two-level (memory, disk) LRU of rendered figure bytes within byte budgets"""
+
+    def __init__(self, directory=None, memory_budget=MEMORY_BUDGET, disk_budget=DISK_BUDGET):
+        self.directory = directory
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget if directory else 0
+        self._memory = OrderedDict()
+        self._disk = OrderedDict()
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._scan_disk()
+
+    def _scan_disk(self):
+        # Files from earlier sessions, least recently used first
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.bin'):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, digest, size in sorted(entries):
+            self._disk[digest] = size
+            self.disk_bytes += size
+        self._evict_disk()
+
+    def _path(self, digest):
+        return os.path.join(self.directory, f'{digest}.bin')
+
+    def get(self, key):
+        """Cached bytes for key, or None"""
+        digest = cache_digest(key)
+        with self._lock:
+            data = self._memory.get(digest)
+            if data is not None:
+                self._memory.move_to_end(digest)
+                self.stats['memory_hits'] += 1
+                return data
+            if digest not in self._disk:
+                self.stats['misses'] += 1
+                return None
+            try:
+                with open(self._path(digest), 'rb') as f:
+                    data = f.read()
+            except OSError:
+                self._forget_disk(digest)
+                self.stats['misses'] += 1
+                return None
+            self.stats['disk_hits'] += 1
+            self._forget_disk(digest)
+            self._put_memory(digest, data)
+            return data
+
+    def put(self, key, data):
+        with self._lock:
+            digest = cache_digest(key)
+            if digest in self._disk:
+                self._forget_disk(digest)
+            self._put_memory(digest, data)
+
+    def _put_memory(self, digest, data):
+        previous = self._memory.pop(digest, None)
+        if previous is not None:
+            self.memory_bytes -= len(previous)
+        self._memory[digest] = data
+        self.memory_bytes += len(data)
+        while self.memory_bytes > self.memory_budget and len(self._memory) > 1:
+            old_digest, old_data = self._memory.popitem(last=False)
+            self.memory_bytes -= len(old_data)
+            self.stats['evictions'] += 1
+            self._spill(old_digest, old_data)
+
+    def _spill(self, digest, data):
+        if digest in self._disk or len(data) > self.disk_budget:
+            return
+        path = self._path(digest)
+        try:
+            with open(path + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            return
+        self._disk[digest] = len(data)
+        self.disk_bytes += len(data)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        while self.disk_bytes > self.disk_budget and self._disk:
+            digest = next(iter(self._disk))
+            self._forget_disk(digest)
+
+    def _forget_disk(self, digest):
+        size = self._disk.pop(digest, None)
+        if size is None:
+            return
+        self.disk_bytes -= size
+        try:
+            os.remove(self._path(digest))
+        except OSError:
+            pass
+
+    def trim(self, target_bytes=0):
+        """Spill least recently used in-memory entries until at most target_bytes remain"""
+        with self._lock:
+            while self.memory_bytes > target_bytes and self._memory:
+                digest, data = self._memory.popitem(last=False)
+                self.memory_bytes -= len(data)
+                self.stats['evictions'] += 1
+                self._spill(digest, data)
+
+    def flush(self):
+        """Spill every in-memory entry to disk (e.g. at exit) so the next session can reuse it"""
+        if not self.directory:
+            return
+        with self._lock:
+            for digest, data in list(self._memory.items()):
+                if digest not in self._disk:
+                    self._spill(digest, data)
+
+    def describe(self):
+        return (f"{len(self._memory)} in memory ({self.memory_bytes / 2**20:.0f} MiB), "
+                f"{len(self._disk)} on disk ({self.disk_bytes / 2**20:.0f} MiB)")
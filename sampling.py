@@ -0,0 +1,126 @@
+# Stratified sampling for progressive (sample-first, exact-later) rendering
+# Strata are GameGenre x Location x spending tier so small, high-value groups such as
+# whales are always represented; estimates carry 95% confidence intervals.
+
+import numpy as np
+import pandas as pd
+
+from aggregates import (ColumnSet, NUMERIC_FIELDS, WEIGHT_COLUMN, SEGMENT_CODE_COLUMN, SEGMENT_LABELS, NO_BIN,
+                        AGE_GROUP_LABELS, SPENDING_TIER_LABELS, bin_domains, derived_codes)
+
+Z_95 = 1.96
+DEFAULT_SAMPLE_FRACTION = 0.01
+
+
+class StratifiedSample:
+    """Poisson-stratified sample of a ColumnSet with post-stratified weights"""
+
+    def __init__(self, columns, fraction=DEFAULT_SAMPLE_FRACTION, min_per_stratum=30, seed=None):
+        rng = np.random.default_rng(seed)
+        strata = stratum_codes(columns)
+        n_strata = int(strata.max()) + 1 if len(strata) else 0
+        population = np.bincount(strata, minlength=n_strata)
+
+        # Inclusion probability per stratum: the base fraction, raised for small strata
+        target = np.maximum(np.ceil(population * fraction), np.minimum(population, min_per_stratum))
+        probability = np.divide(target, population, out=np.zeros(n_strata), where=population > 0)
+        take = rng.random(columns.rows) < probability[strata]
+
+        self.strata = strata[take]
+        self.population_counts = population.astype(np.float64)
+        self.sample_counts = np.bincount(self.strata, minlength=n_strata).astype(np.float64)
+        self.fraction = fraction
+
+        # Post-stratified weights N_h / n_h make every weighted count exact per stratum
+        stratum_weight = np.divide(self.population_counts, self.sample_counts,
+                                   out=np.zeros(n_strata), where=self.sample_counts > 0)
+        arrays = {name: values[take] for name, values in columns.arrays.items()}
+        arrays[WEIGHT_COLUMN] = stratum_weight[self.strata]
+        self.columns = ColumnSet(arrays, columns.categories)
+
+    @property
+    def rows(self):
+        return self.columns.rows
+
+    def frame(self):
+        """Numeric sample rows as a DataFrame (used for scatter plots)"""
+        return pd.DataFrame({field: self.columns.arrays[field] for field in NUMERIC_FIELDS
+                             if field in self.columns.arrays})
+
+    def total_ci(self, values, domains, n_domains):
+        """Estimated domain totals of `values` and their 95% half-widths"""
+        n_strata = len(self.population_counts)
+        valid = domains >= 0
+        keys = self.strata[valid] * n_domains + domains[valid]
+        y = values[valid]
+        s1 = np.bincount(keys, weights=y, minlength=n_strata * n_domains).reshape(n_strata, n_domains)
+        s2 = np.bincount(keys, weights=y * y, minlength=n_strata * n_domains).reshape(n_strata, n_domains)
+
+        n = self.sample_counts[:, None]
+        big_n = self.population_counts[:, None]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            estimate = np.where(n > 0, big_n / n * s1, 0).sum(axis=0)
+            # Within-stratum variance of y * 1[domain], with finite population correction
+            s_sq = np.where(n > 1, (s2 - s1 ** 2 / n) / (n - 1), 0)
+            variance = np.where(n > 0, big_n ** 2 * (1 - n / big_n) * s_sq / n, 0).sum(axis=0)
+        return estimate, Z_95 * np.sqrt(np.maximum(variance, 0))
+
+    def mean_ci(self, values, domains, n_domains):
+        """Estimated domain means (ratio estimator) and 95% half-widths via linearization"""
+        ones = np.ones_like(values, dtype=np.float64)
+        totals, _ = self.total_ci(values, domains, n_domains)
+        counts, _ = self.total_ci(ones, domains, n_domains)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = totals / counts
+            residual = np.zeros_like(values, dtype=np.float64)
+            valid = domains >= 0
+            residual[valid] = (values[valid] - means[domains[valid]]) / counts[domains[valid]]
+        _, half_width = self.total_ci(residual, domains, n_domains)
+        return means, half_width
+
+
+def stratum_codes(columns):
+    """GameGenre x Location x spending tier stratum id per row"""
+    genres = np.maximum(columns.arrays['GameGenre'], 0).astype(np.int64)
+    locations = np.maximum(columns.arrays['Location'], 0).astype(np.int64)
+    tiers = derived_codes(columns.arrays, 'SpendingTierCode', 0, columns.rows).astype(np.int64)
+    tiers[tiers == NO_BIN] = 0
+    n_locations = max(len(columns.categories.get('Location', [])), 1)
+    n_tiers = len(SPENDING_TIER_LABELS)
+    return (genres * n_locations + locations) * n_tiers + tiers
+
+
+def attach_confidence(analysis, results, sample):
+    """Add *_ci Series (95% half-widths) for the means and sums each chart shows"""
+    arrays = sample.columns.arrays
+    categories = sample.columns.categories
+
+    if analysis == 'demographics':
+        groups = bin_domains(derived_codes(arrays, 'AgeGroupCode', 0, sample.rows))
+        _, half = sample.mean_ci(arrays['SessionsPerWeek'], groups, len(AGE_GROUP_LABELS))
+        results['session_by_age_ci'] = pd.Series(half, index=AGE_GROUP_LABELS)
+        everyone = np.zeros(sample.rows, dtype=np.int64)
+        _, age_half = sample.mean_ci(arrays['Age'], everyone, 1)
+        results['mean_age_ci'] = age_half[0]
+        _, half = sample.total_ci(np.ones(sample.rows), arrays['Location'], len(categories['Location']))
+        results['location_counts_ci'] = pd.Series(half, index=categories['Location'])
+
+    elif analysis == 'behavior':
+        _, half = sample.total_ci(np.ones(sample.rows), arrays['GameGenre'], len(categories['GameGenre']))
+        results['genre_counts_ci'] = pd.Series(half, index=categories['GameGenre'])
+
+    elif analysis == 'monetization':
+        _, half = sample.total_ci(arrays['InGamePurchases'], arrays['GameGenre'], len(categories['GameGenre']))
+        results['genre_revenue_ci'] = pd.Series(half, index=categories['GameGenre'])
+
+    elif analysis == 'segmentation':
+        segments = arrays[SEGMENT_CODE_COLUMN].astype(np.int64)
+        n = len(SEGMENT_LABELS)
+        _, half = sample.total_ci(arrays['InGamePurchases'], segments, n)
+        results['segment_revenue_ci'] = pd.Series(half, index=SEGMENT_LABELS)
+        for key, field in (('segment_engagement', 'EngagementLevel'), ('segment_playtime', 'PlayTimeHours'),
+                           ('segment_toxicity', 'ToxicityLevel')):
+            _, half = sample.mean_ci(arrays[field], segments, n)
+            results[f'{key}_ci'] = pd.Series(half, index=SEGMENT_LABELS)
+
+    return results
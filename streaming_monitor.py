@@ -0,0 +1,468 @@
+# Streaming risk monitor
+# Consumes new player records (a MongoDB change stream, or a JSON-lines file / in-process
+# queue standing in for one) and keeps rolling time-windowed aggregates per GameGenre x
+# Location cohort in a fixed ring of buckets, so memory is bounded by window/bucket x
+# cohorts no matter how long it runs. After each micro-batch only the touched cohorts are
+# re-checked against the social-tab risk thresholds; crossings fire alerts stamped with
+# their end-to-end latency (record emitted -> alert raised).
+#
+# Usage:
+#   python streaming_monitor.py simulate --rate 2000       # append synthetic players to the stand-in file
+#   python streaming_monitor.py watch [--source mongo]     # print alerts and latency percentiles
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from data_sources import BASE_DIR, MongoDataSource, clean_players, load_source_config, synthetic_players
+
+# Stand-in stream: one JSON player record per line, optionally stamped with EmittedAt (epoch s)
+DEFAULT_STREAM_PATH = os.path.join(BASE_DIR, 'stream', 'players.jsonl')
+EMITTED_FIELD = 'EmittedAt'
+
+# Same cut-offs as the risk lines on the social tab: a cohort alerts when the share of its
+# players in the window beyond `above` reaches `share` (re-armed below share * REARM)
+ALERT_RULES = [
+    {'name': 'Critical toxicity', 'field': 'ToxicityLevel', 'above': 8, 'share': 0.10},
+    {'name': 'High toxicity', 'field': 'ToxicityLevel', 'above': 6, 'share': 0.25},
+    {'name': 'High rage-quit', 'field': 'RageQuitFrequency', 'above': 6, 'share': 0.15},
+    {'name': 'Critical sleep risk', 'field': 'SleepDeprivationRisk', 'above': 7, 'share': 0.15},
+]
+REARM = 0.8
+# Cohorts with fewer players in the window are never alerted on (too noisy)
+MIN_COHORT_ROWS = 50
+# Cohort slots; records beyond this many GameGenre x Location pairs share an overflow slot
+MAX_COHORTS = 512
+OVERFLOW_COHORT = ('(other)', '(other)')
+# Alerts and latency samples kept for the panel
+ALERT_HISTORY = 200
+LATENCY_SAMPLES = 10_000
+# Source reconnect backoff after a poll error (doubles per consecutive failure)
+RECONNECT_MIN_S = 0.5
+RECONNECT_MAX_S = 30.0
+
+
+class CohortWindow:
+    """Per-cohort counts over the last `window_s` seconds, in window_s / bucket_s ring buckets
+
+    Stats per cohort: rows, then one at-risk count per rule.
+    """
+
+    def __init__(self, rules=ALERT_RULES, window_s=300.0, bucket_s=10.0, max_cohorts=MAX_COHORTS):
+        self.rules = rules
+        self.window_s = window_s
+        self.bucket_s = bucket_s
+        self.n_buckets = max(1, int(np.ceil(window_s / bucket_s)))
+        self.max_cohorts = max_cohorts
+        self.n_stats = 1 + len(rules)
+        self.ring = np.zeros((self.n_buckets, max_cohorts, self.n_stats), dtype=np.int64)
+        self.totals = np.zeros((max_cohorts, self.n_stats), dtype=np.int64)
+        self.cohorts = {}
+        self.labels = []
+        self.current_bucket = None
+
+    def cohort_ids(self, genres, locations):
+        """Slot per record; new cohorts get the next free slot"""
+        codes, uniques = pd.factorize(pd.MultiIndex.from_arrays([genres, locations]))
+        return np.array([self._slot(label) for label in uniques], dtype=np.int64)[codes]
+
+    def _slot(self, label):
+        slot = self.cohorts.get(label)
+        if slot is None:
+            if len(self.labels) < self.max_cohorts - 1:
+                slot = len(self.labels)
+            else:
+                label = OVERFLOW_COHORT
+                slot = self.cohorts.get(label, self.max_cohorts - 1)
+            if label not in self.cohorts:
+                self.cohorts[label] = slot
+                self.labels.append(label)
+        return slot
+
+    def advance(self, now):
+        """Expire buckets that fell out of the window"""
+        bucket = int(now // self.bucket_s)
+        if self.current_bucket is None:
+            self.current_bucket = bucket
+            return
+        for expired in range(self.current_bucket + 1, min(bucket, self.current_bucket + self.n_buckets) + 1):
+            slot = expired % self.n_buckets
+            self.totals -= self.ring[slot]
+            self.ring[slot] = 0
+        self.current_bucket = max(bucket, self.current_bucket)
+
+    def add(self, batch, now):
+        """Fold a cleaned batch into the current bucket; returns the touched cohort slots"""
+        self.advance(now)
+        slots = self.cohort_ids(batch['GameGenre'].astype(str).to_numpy(), batch['Location'].astype(str).to_numpy())
+        stats = np.zeros((len(batch), self.n_stats), dtype=np.int64)
+        stats[:, 0] = 1
+        for j, rule in enumerate(self.rules, start=1):
+            if rule['field'] in batch.columns:
+                stats[:, j] = batch[rule['field']].to_numpy(dtype=np.float64) > rule['above']
+        counts = np.zeros((self.max_cohorts, self.n_stats), dtype=np.int64)
+        np.add.at(counts, slots, stats)
+        self.ring[self.current_bucket % self.n_buckets] += counts
+        self.totals += counts
+        return np.flatnonzero(counts[:, 0])
+
+    def shares(self, slots):
+        rows = self.totals[slots, 0]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return rows, np.where(rows[:, None] > 0, self.totals[slots, 1:] / rows[:, None], 0.0)
+
+    def table(self):
+        """Window aggregates of every live cohort, for the panel"""
+        slots = np.flatnonzero(self.totals[:len(self.labels), 0])
+        rows, shares = self.shares(slots)
+        frame = pd.DataFrame(shares * 100, columns=[f"{rule['name']} %" for rule in self.rules])
+        frame.insert(0, 'Players', rows)
+        frame.index = pd.MultiIndex.from_tuples([self.labels[s] for s in slots], names=['GameGenre', 'Location'])
+        return frame
+
+
+class StreamMonitor:
+    """Consumes a record source on a background thread, maintains windows and raises alerts"""
+
+    def __init__(self, source, rules=ALERT_RULES, window_s=300.0, bucket_s=10.0, min_rows=MIN_COHORT_ROWS,
+                 on_alert=None):
+        self.source = source
+        self.rules = rules
+        self.window = CohortWindow(rules, window_s, bucket_s)
+        self.min_rows = min_rows
+        self.on_alert = on_alert
+        self.alerts = deque(maxlen=ALERT_HISTORY)
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.armed = np.ones((self.window.max_cohorts, len(rules)), dtype=bool)
+        self.stats = {'records': 0, 'batches': 0, 'alerts': 0, 'rejected': 0, 'errors': 0, 'reconnects': 0}
+        # (time, message) of the most recent batch or source error; `failing` while reconnecting
+        self.last_error = None
+        self.failing = False
+        # Bumped per processed batch so the panel redraws only when something changed
+        self.version = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.source.close()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        backoff = RECONNECT_MIN_S
+        while not self._stop.is_set():
+            try:
+                records = self.source.poll(timeout=0.2)
+            except Exception as e:
+                # Change-stream or file error: drop the source and reopen it after a backoff
+                self._record_error(f"source: {e}", failing=True)
+                try:
+                    self.source.close()
+                except Exception:
+                    pass
+                if self._stop.wait(backoff):
+                    break
+                backoff = min(backoff * 2, RECONNECT_MAX_S)
+                self.stats['reconnects'] += 1
+                continue
+            if self.failing:
+                backoff = RECONNECT_MIN_S
+                with self._lock:
+                    self.failing = False
+                    self.version += 1
+            if records:
+                try:
+                    self.process(records)
+                except Exception as e:
+                    # A malformed batch (text in a numeric field, ...) is skipped, not fatal
+                    self.stats['rejected'] += len(records)
+                    self._record_error(f"batch of {len(records):,} skipped: {e}")
+            else:
+                with self._lock:
+                    self.window.advance(time.time())
+
+    def _record_error(self, message, failing=False):
+        with self._lock:
+            self.stats['errors'] += 1
+            self.last_error = (time.time(), message)
+            self.failing = failing
+            self.version += 1
+
+    def process(self, records):
+        """One micro-batch: clean, window, check touched cohorts"""
+        received = time.time()
+        batch = pd.DataFrame.from_records(records)
+        emitted = (pd.to_numeric(batch.pop(EMITTED_FIELD), errors='coerce').to_numpy()
+                   if EMITTED_FIELD in batch.columns else np.full(len(batch), received))
+        emitted = np.where(np.isnan(emitted), received, emitted)
+        cleaned = clean_players(batch) if {'Age', 'PlayTimeHours'} <= set(batch.columns) else batch
+        if not {'GameGenre', 'Location'} <= set(cleaned.columns):
+            self.stats['rejected'] += len(batch)
+            return []
+        with self._lock:
+            touched = self.window.add(cleaned, received)
+            fired = self._check(touched, emitted.min() if len(emitted) else received)
+            done = time.time()
+            self.latencies.extend(done - emitted)
+            self.stats['records'] += len(batch)
+            self.stats['rejected'] += len(batch) - len(cleaned)
+            self.stats['batches'] += 1
+            self.version += 1
+        for alert in fired:
+            if self.on_alert is not None:
+                self.on_alert(alert)
+        return fired
+
+    def _check(self, slots, first_emitted):
+        rows, shares = self.window.shares(slots)
+        limits = np.array([rule['share'] for rule in self.rules])
+        eligible = rows[:, None] >= self.min_rows
+        crossing = eligible & (shares >= limits) & self.armed[slots]
+        # Hysteresis: a cohort re-arms once it drops clearly below the threshold
+        self.armed[slots] |= shares < limits * REARM
+        self.armed[slots] &= ~crossing
+        fired = []
+        now = time.time()
+        for i, j in zip(*np.nonzero(crossing)):
+            genre, location = self.window.labels[slots[i]]
+            alert = {'time': now, 'rule': self.rules[j]['name'], 'GameGenre': genre, 'Location': location,
+                     'share': float(shares[i, j]), 'players': int(rows[i]),
+                     # Worst case: the oldest record of the batch that tipped the cohort over
+                     'latency_s': now - first_emitted}
+            self.alerts.append(alert)
+            fired.append(alert)
+        self.stats['alerts'] += len(fired)
+        return fired
+
+    def snapshot(self):
+        """(version, cohort table, recent alerts, latency percentiles) under the lock"""
+        with self._lock:
+            latencies = np.fromiter(self.latencies, dtype=np.float64)
+            percentiles = (dict(zip(('p50', 'p95', 'p99'), np.percentile(latencies, [50, 95, 99])))
+                           if len(latencies) else {})
+            return self.version, self.window.table(), list(self.alerts), percentiles
+
+    def describe(self):
+        return f"{self.source.describe()}, {self.window.window_s:g}s window"
+
+
+def format_alert(alert):
+    return (f"{time.strftime('%H:%M:%S', time.localtime(alert['time']))} 🚨 {alert['rule']}: "
+            f"{alert['GameGenre']} / {alert['Location']} at {alert['share'] * 100:.1f}% of "
+            f"{alert['players']:,} players (latency {alert['latency_s'] * 1000:.0f} ms)")
+
+
+# Record sources ------------------------------------------------------------------------
+
+class JsonLinesSource:
+    """Tails a JSON-lines file (the local stand-in for a change stream) from its current end"""
+
+    def __init__(self, path=DEFAULT_STREAM_PATH, from_start=False, max_batch=10_000):
+        self.path = path
+        self.max_batch = max_batch
+        self._file = None
+        self._position = None if not from_start else 0
+        self._partial = b''
+
+    def poll(self, timeout=0.2):
+        if self._file is None:
+            if not os.path.exists(self.path):
+                time.sleep(timeout)
+                return []
+            self._file = open(self.path, 'rb')
+            if self._position is None:
+                self._file.seek(0, os.SEEK_END)
+            elif self._position <= os.fstat(self._file.fileno()).st_size:
+                self._file.seek(self._position)
+            else:
+                # Truncated or replaced while closed: read the new file from its start
+                self._partial = b''
+        chunk = self._file.read(self.max_batch * 512)
+        if not chunk:
+            time.sleep(timeout)
+            return []
+        lines = (self._partial + chunk).split(b'\n')
+        self._partial = lines.pop()
+        records = []
+        for line in lines:
+            if line.strip():
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        return records
+
+    def describe(self):
+        return f"tail {os.path.relpath(self.path, BASE_DIR)}"
+
+    def close(self):
+        if self._file is not None:
+            # Reopening (after a reconnect) continues from here rather than skipping to the end
+            self._position = self._file.tell()
+            self._file.close()
+            self._file = None
+
+
+class QueueSource:
+    """In-process queue of record dicts (tests, replays, other producers in the same process)"""
+
+    def __init__(self, records_queue=None, max_batch=10_000):
+        self.queue = records_queue or queue.Queue()
+        self.max_batch = max_batch
+
+    def poll(self, timeout=0.2):
+        try:
+            records = [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(records) < self.max_batch:
+            try:
+                records.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return records
+
+    def describe(self):
+        return "in-process queue"
+
+    def close(self):
+        pass
+
+
+class MongoChangeStreamSource:
+    """Inserted/updated players from a MongoDB change stream (replica set or sharded cluster)"""
+
+    def __init__(self, source, max_batch=10_000):
+        self.source = source
+        self.max_batch = max_batch
+        self._stream = None
+        # Last change seen, so a reopened stream resumes after it instead of at "now"
+        self._resume_token = None
+
+    def poll(self, timeout=0.2):
+        if self._stream is None:
+            pipeline = [{'$match': {'operationType': {'$in': ['insert', 'replace', 'update']}}}]
+            self._stream = self.source.collection.watch(pipeline, full_document='updateLookup',
+                                                        max_await_time_ms=int(timeout * 1000),
+                                                        resume_after=self._resume_token)
+        records = []
+        while len(records) < self.max_batch:
+            change = self._stream.try_next()
+            if change is None:
+                break
+            self._resume_token = self._stream.resume_token
+            document = change.get('fullDocument')
+            if document is None:
+                continue
+            document.pop('_id', None)
+            # wallTime (MongoDB 6.0+) is when the write committed; clusterTime has 1 s resolution
+            committed = change.get('wallTime')
+            document.setdefault(EMITTED_FIELD, committed.timestamp() if committed is not None
+                                else change['clusterTime'].time)
+            records.append(document)
+        return records
+
+    def describe(self):
+        return f"change stream {self.source.describe()}"
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+
+def create_stream_source(config):
+    """Record source named by the 'stream' config section ('jsonl' or 'mongo')"""
+    stream = config.get('stream', {})
+    if stream.get('type', 'jsonl') == 'mongo':
+        return MongoChangeStreamSource(MongoDataSource(**config['mongo']))
+    return JsonLinesSource(os.path.join(BASE_DIR, stream.get('path', 'stream/players.jsonl')))
+
+
+def create_monitor(config, on_alert=None):
+    stream = config.get('stream', {})
+    return StreamMonitor(create_stream_source(config), window_s=stream.get('window_s', 300.0),
+                         bucket_s=stream.get('bucket_s', 10.0), min_rows=stream.get('min_rows', MIN_COHORT_ROWS),
+                         on_alert=on_alert)
+
+
+def simulate(path, rate, seconds, seed=0, toxic_genre='Action'):
+    """Append synthetic players at `rate`/s; after a third of the run one genre turns toxic"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rng = np.random.default_rng(seed)
+    started = time.time()
+    tick = 0.1
+    with open(path, 'a') as f:
+        while seconds is None or time.time() - started < seconds:
+            batch = synthetic_players(max(1, int(rate * tick)), int(rng.integers(1 << 31)))
+            if seconds is not None and time.time() - started > seconds / 3:
+                toxic = (batch['GameGenre'] == toxic_genre).to_numpy()
+                batch.loc[toxic, 'ToxicityLevel'] = np.clip(rng.normal(8, 1.5, toxic.sum()).round(), 0, 10)
+            batch[EMITTED_FIELD] = time.time()
+            f.write(batch.to_json(orient='records', lines=True))
+            f.write('\n')
+            f.flush()
+            time.sleep(tick)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gaming Analytics streaming risk monitor")
+    commands = parser.add_subparsers(dest='command', required=True)
+    sim = commands.add_parser('simulate', help="append synthetic player records to the stand-in stream file")
+    sim.add_argument('--path', default=DEFAULT_STREAM_PATH)
+    sim.add_argument('--rate', type=int, default=2000, help="records per second")
+    sim.add_argument('--seconds', type=float, default=None)
+    watch = commands.add_parser('watch', help="print alerts and latency percentiles")
+    watch.add_argument('--source', choices=['jsonl', 'mongo'], default=None)
+    watch.add_argument('--path', default=None)
+    args = parser.parse_args()
+
+    if args.command == 'simulate':
+        simulate(args.path, args.rate, args.seconds)
+        return
+    config = load_source_config()
+    stream = config.setdefault('stream', {})
+    if args.source:
+        stream['type'] = args.source
+    if args.path:
+        stream['path'] = args.path
+    monitor = create_monitor(config, on_alert=lambda alert: print(format_alert(alert), flush=True))
+    monitor.start()
+    print(f"📡 Monitoring {monitor.describe()} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(5)
+            _, table, _, percentiles = monitor.snapshot()
+            latency = ', '.join(f"{k}={v * 1000:.0f}ms" for k, v in percentiles.items())
+            print(f"   {monitor.stats['records']:,} records, {len(table)} cohorts, {latency or 'no data yet'}",
+                  flush=True)
+            if monitor.last_error is not None:
+                print(f"   ⚠️ {monitor.stats['errors']:,} errors, last: {monitor.last_error[1]}"
+                      f"{' (reconnecting)' if monitor.failing else ''}", flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        monitor.stop()
+
+
+if __name__ == "__main__":
+    main()
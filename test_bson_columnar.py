@@ -0,0 +1,153 @@
+# Round-trip tests of the raw-BSON columnar decoder against bson.decode_all
+# Run: python -m pytest -q
+
+import bson
+import numpy as np
+import pandas as pd
+import pytest
+
+from bson_columnar import PLAYER_SCHEMA, ColumnarBatchDecoder
+from data_sources import synthetic_players
+
+
+def encode(documents):
+    return b''.join(bson.encode(document) for document in documents)
+
+
+def decode(*batches):
+    decoder = ColumnarBatchDecoder()
+    for batch in batches:
+        decoder.add_batch(batch)
+    return decoder
+
+
+def normalized(value):
+    """Comparable form: None when missing, floats for numbers and numeric text, else the text"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def assert_matches_documents(frame, *batches):
+    """The decoded frame holds every schema field of the documents, value for value"""
+    reference = pd.DataFrame([document for batch in batches for document in bson.decode_all(batch)])
+    expected_fields = [field for field in PLAYER_SCHEMA if field in reference.columns]
+    assert list(frame.columns) == expected_fields
+    assert len(frame) == len(reference)
+    for field in expected_fields:
+        if PLAYER_SCHEMA[field] == 'string':
+            assert [normalized(v) for v in frame[field].astype(object)] == \
+                   [normalized(v) for v in reference[field]], field
+        elif frame[field].dtype.kind not in 'iuf':
+            # Text IDs: every ID as text, numeric ones included
+            assert [normalized(v) for v in frame[field].astype(object)] == \
+                   [normalized(str(v) if isinstance(v, bson.ObjectId) else v) for v in reference[field]], field
+        else:
+            np.testing.assert_array_equal(frame[field].to_numpy(np.float64),
+                                          pd.to_numeric(reference[field], errors='coerce').to_numpy(np.float64),
+                                          err_msg=field)
+
+
+def player(i, **fields):
+    document = {'PlayerID': i, 'Age': 20 + i % 40, 'Gender': 'Female', 'GameGenre': 'RPG',
+                'PlayTimeHours': 1.5 * i, 'ToxicityLevel': 3.0}
+    document.update(fields)
+    return document
+
+
+def test_regular_batches_match_documents():
+    records = synthetic_players(5000).astype({'Gender': str, 'Location': str, 'GameGenre': str}).to_dict('records')
+    batches = [encode(records[i:i + 1500]) for i in range(0, len(records), 1500)]
+    decoder = decode(*batches)
+    assert decoder.fallback_rows == 0
+    assert decoder.frame()['PlayerID'].dtype == np.int64
+    assert_matches_documents(decoder.frame(), *batches)
+
+
+def test_mixed_int32_int64_and_double_values():
+    batch = encode([player(0, Age=25), player(1, Age=25.5), player(2, Age=2**40), player(3, PlayTimeHours=7),
+                    player(4, ToxicityLevel=4), player(5, ToxicityLevel=4.5)])
+    assert_matches_documents(decode(batch).frame(), batch)
+
+
+def test_irregular_layouts_fall_back_per_document():
+    reordered = {'Age': 31, 'PlayerID': 7, 'Gender': 'Male', 'PlayTimeHours': 2.0, 'GameGenre': 'Action',
+                 'ToxicityLevel': 1.0}
+    batch = encode([player(0), player(1), reordered, player(3, Extra={'nested': [1, 2]}), player(4)])
+    decoder = decode(batch)
+    assert decoder.fallback_rows == 2
+    assert_matches_documents(decoder.frame(), batch)
+
+
+def test_missing_fields_and_nulls():
+    batch = encode([player(0), {'PlayerID': 1, 'Age': 30}, player(2, PlayTimeHours=None, Gender=None),
+                    player(3, LoyaltyIndex=None)])
+    frame = decode(batch).frame()
+    assert_matches_documents(frame, batch)
+    # Present in a document, if only as null: kept as a column rather than dropped
+    assert frame['LoyaltyIndex'].isna().all()
+
+
+def test_non_ascii_strings():
+    batch = encode([player(0, Location='São Paulo'), player(1, Location='日本', Gender='Fémale'),
+                    player(2, Location='UK', Age='٣٠')])
+    frame = decode(batch).frame()
+    assert_matches_documents(frame, batch)
+    assert set(frame['Location']) == {'São Paulo', '日本', 'UK'}
+
+
+def test_batches_with_different_string_widths():
+    first = encode([player(0, Location='UK'), player(1, Location='USA')])
+    second = encode([player(2, Location='South Korea'), player(3, Location='UK')])
+    assert_matches_documents(decode(first, second).frame(), first, second)
+
+
+def test_text_levels_are_kept_as_text():
+    batch = encode([player(0, ToxicityLevel='High', SleepDeprivationRisk='Low'),
+                    player(1, ToxicityLevel='Medium', SleepDeprivationRisk=6),
+                    player(2, ToxicityLevel=7.5, SleepDeprivationRisk='High')])
+    frame = decode(batch).frame()
+    assert_matches_documents(frame, batch)
+    assert list(frame['ToxicityLevel'].astype(object)) == ['High', 'Medium', '7.5']
+
+
+def test_non_numeric_text_in_numeric_field_is_nan():
+    batch = encode([player(0, Age='unknown'), player(1, Age='42'), player(2, Age=True)])
+    frame = decode(batch).frame()
+    assert_matches_documents(frame, batch)
+    np.testing.assert_array_equal(frame['Age'].to_numpy(), [np.nan, 42.0, 1.0])
+
+
+@pytest.mark.parametrize('unsupported', [bson.Regex('^a'), bson.Code('function () {}'), bson.MinKey()])
+def test_unsupported_element_types(unsupported):
+    # In the template document (whole batch decoded per document) and in a later one
+    leading = encode([player(0, Pattern=unsupported), player(1), player(2)])
+    trailing = encode([player(3), player(4, Pattern=unsupported), player(5)])
+    decoder = decode(leading, trailing)
+    assert decoder.fallback_rows == 4
+    assert_matches_documents(decoder.frame(), leading, trailing)
+
+
+def test_string_and_object_id_player_ids_are_kept_as_text():
+    object_id = bson.ObjectId()
+    text_ids = encode([player(i, PlayerID=f'P{i:06d}') for i in range(5)])
+    mixed = encode([player(7), player(8, PlayerID=object_id), player(9, PlayerID='P000009'),
+                    player(10, PlayerID=None), player(11)])
+    numeric = encode([player(12)])
+    frame = decode(text_ids, mixed, numeric).frame()
+    assert_matches_documents(frame, text_ids, mixed, numeric)
+    assert list(frame['PlayerID'].astype(object).where(frame['PlayerID'].notna(), None)) == \
+           ['P000000', 'P000001', 'P000002', 'P000003', 'P000004', '7', str(object_id), 'P000009', None, '11', '12']
+    # ObjectIds leading a batch are read by the vectorized walk
+    other = bson.ObjectId('0123456789abcdef01234567')
+    leading = encode([player(0, PlayerID=object_id), player(1, PlayerID=other)])
+    assert list(decode(leading).frame()['PlayerID']) == [str(object_id), str(other)]
+
+
+def test_empty_batch():
+    decoder = decode(b'')
+    assert decoder.rows == 0
+    assert decoder.frame().empty
@@ -0,0 +1,62 @@
+# Shard cluster recovery: a worker killed mid-query is restarted and the merged result is unchanged
+# Run: python -m pytest -q
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import ANALYSES, ColumnSet, compute_analysis
+from data_sources import clean_players
+from distributed import LocalCluster, load_shard, synthetic_specs
+
+SPECS = synthetic_specs(3, 300_000)
+
+
+def assert_same_results(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(actual[key], value, check_exact=False, rtol=1e-9)
+        elif isinstance(value, pd.Series):
+            pd.testing.assert_series_equal(actual[key], value, check_exact=False, rtol=1e-9)
+        elif isinstance(value, dict):
+            assert_same_results(actual[key], value)
+        else:
+            np.testing.assert_allclose(np.asarray(actual[key], dtype=np.float64),
+                                       np.asarray(value, dtype=np.float64), rtol=1e-9, err_msg=key)
+
+
+@pytest.fixture(scope='module')
+def serial_columns():
+    return ColumnSet.from_frame(pd.concat([clean_players(load_shard(spec)) for spec in SPECS], ignore_index=True))
+
+
+@pytest.fixture(scope='module')
+def cluster():
+    cluster = LocalCluster(SPECS, base_port=17640)
+    yield cluster
+    cluster.close()
+
+
+@pytest.mark.parametrize('analysis', sorted(ANALYSES))
+def test_worker_killed_mid_query_is_restarted(cluster, serial_columns, analysis):
+    coordinator = cluster.coordinator(retry_timeout=120.0)
+    try:
+        columns = coordinator.columns()
+        victim = cluster.addresses[1]
+        killed = []
+
+        def kill_after_send(i):
+            # Shard 1's request is on the wire: kill its worker before it can answer
+            if i == 1 and not killed:
+                cluster.kill(victim)
+                killed.append(cluster.processes[victim].pid)
+
+        coordinator.on_sent = kill_after_send
+        results = compute_analysis(analysis, columns, coordinator)
+
+        assert killed and coordinator.stats['retries'] >= 1
+        assert cluster.processes[victim].is_alive() and cluster.processes[victim].pid != killed[0]
+        assert_same_results(results, compute_analysis(analysis, serial_columns))
+    finally:
+        coordinator.shutdown()
@@ -0,0 +1,86 @@
+# Content-defined view blocks: edits only invalidate the blocks around them, and stored
+# views give the same tables as compute_analysis
+# Run: python -m pytest -q
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import ANALYSES, ColumnSet, SerialExecutor, compute_analysis
+from data_sources import clean_players, synthetic_players
+from materialized_views import MAX_BLOCK_FACTOR, MIN_BLOCK_FACTOR, MaterializedViewStore, block_fingerprints
+
+BLOCK = 1000
+
+
+def fingerprints(data):
+    return block_fingerprints(ColumnSet.from_frame(data.reset_index(drop=True)), block_rows=BLOCK)
+
+
+def columns_of(data):
+    """Column set whose (cached) fingerprints use test-sized blocks"""
+    columns = ColumnSet.from_frame(data.reset_index(drop=True))
+    block_fingerprints(columns, block_rows=BLOCK)
+    return columns
+
+
+def assert_same_results(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(actual[key], value, check_exact=False, rtol=1e-9)
+        elif isinstance(value, pd.Series):
+            pd.testing.assert_series_equal(actual[key], value, check_exact=False, rtol=1e-9)
+        elif isinstance(value, dict):
+            assert_same_results(actual[key], value)
+        else:
+            np.testing.assert_allclose(np.asarray(actual[key], dtype=np.float64),
+                                       np.asarray(value, dtype=np.float64), rtol=1e-9, err_msg=key)
+
+
+def changed_blocks(before, after):
+    return len(set(after[1]) - set(before[1]))
+
+
+def test_blocks_cover_every_row_within_the_size_limits():
+    bounds, _ = fingerprints(synthetic_players(60_000))
+    assert bounds[0][0] == 0 and bounds[-1][1] == 60_000
+    assert all(stop == start for (_, stop), (start, _) in zip(bounds, bounds[1:]))
+    sizes = np.diff(np.array(bounds), axis=1).ravel()
+    assert sizes[:-1].min() >= BLOCK // MIN_BLOCK_FACTOR and sizes.max() <= BLOCK * MAX_BLOCK_FACTOR
+    assert 0.5 * BLOCK < sizes.mean() < 2 * BLOCK
+
+
+def test_insert_and_delete_only_touch_nearby_blocks():
+    data = synthetic_players(60_000)
+    base = fingerprints(data)
+    inserted = fingerprints(data.iloc[np.r_[0:20_000, 45_000, 20_000:60_000]])
+    deleted = fingerprints(data.drop(index=range(30_000, 30_010)))
+    appended = fingerprints(data.iloc[np.r_[0:60_000, 0:500]])
+    # Fixed row offsets would change every block after the edit (about 40 and 30 here)
+    assert changed_blocks(base, inserted) <= 2
+    assert changed_blocks(base, deleted) <= 2
+    assert changed_blocks(base, appended) <= 2
+
+
+def test_empty_column_set():
+    assert fingerprints(synthetic_players(0)) == ([], [])
+
+
+@pytest.mark.parametrize('analysis', sorted(ANALYSES))
+def test_view_store_hit_incremental_and_rebuilt(tmp_path, analysis):
+    store, executor = MaterializedViewStore(str(tmp_path)), SerialExecutor()
+    data = clean_players(synthetic_players(30_000))
+
+    def load(frame):
+        columns = columns_of(frame)
+        results, status = store.load_or_build(analysis, columns, executor)
+        assert_same_results(results, compute_analysis(analysis, columns))
+        return status
+
+    assert load(data) == 'rebuilt'
+    assert load(data) == 'hit'
+    # A duplicated row mid-table keeps the ranges and dictionaries: only nearby blocks recompute
+    assert load(data.iloc[np.r_[0:12_000, 500, 12_000:len(data)]]) == 'incremental'
+    # A dropped genre changes the category codes of every block
+    assert load(data[data['GameGenre'] != data['GameGenre'].iloc[0]]) == 'rebuilt'
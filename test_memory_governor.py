@@ -0,0 +1,28 @@
+# Spilling the dataset: numeric columns move to file-backed arrays, nothing else is densified
+# Run: python -m pytest -q
+
+import numpy as np
+
+from aggregates import CATEGORICAL_FIELDS, NUMERIC_FIELDS, ColumnSet
+from data_sources import clean_players, synthetic_players
+from memory_governor import MemoryGovernor, frame_over_columns, is_mapped
+
+
+def test_spilled_frame_shares_numeric_columns_and_keeps_categoricals(tmp_path):
+    data = clean_players(synthetic_players(5000))
+    columns = ColumnSet.from_frame(data)
+    governor = MemoryGovernor(spill_dir=str(tmp_path))
+    try:
+        governor.spill_columns(columns)
+        # The dashboard passes every ColumnSet name, categorical codes included
+        spilled = frame_over_columns(data, columns, set(columns.arrays))
+        for field in NUMERIC_FIELDS:
+            if field in data.columns:
+                assert is_mapped(spilled[field].to_numpy()), field
+                np.testing.assert_array_equal(spilled[field].to_numpy(), data[field].to_numpy())
+        for field in CATEGORICAL_FIELDS:
+            if field in data.columns:
+                assert spilled[field].dtype == data[field].dtype, field
+        assert spilled.equals(data)
+    finally:
+        governor.close()
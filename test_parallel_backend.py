@@ -0,0 +1,47 @@
+# Process-pool executor: small datasets stay in-process, large ones match the serial result
+# Run: python -m pytest -q
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import ColumnSet, compute_analysis
+from data_sources import synthetic_players
+from parallel_backend import ParallelExecutor, SharedColumnStore
+
+
+@pytest.fixture(scope='module')
+def columns():
+    return ColumnSet.from_frame(synthetic_players(200_000))
+
+
+@pytest.fixture
+def store(columns):
+    store = SharedColumnStore(columns)
+    yield store
+    store.close()
+
+
+def test_small_datasets_never_start_the_pool(columns, store):
+    executor = ParallelExecutor(workers=2)
+    try:
+        assert executor.runs_serially(store.rows)
+        results = compute_analysis('behavior', store, executor)
+        params = {'categories': store.categories, 'range_fields': ['Age']}
+        assert len(executor.map_chunks('ranges', store, params, [(0, 1000), (1000, 2000)])) == 2
+        assert executor._pool is None
+        np.testing.assert_array_equal(results['playtime_hist'], compute_analysis('behavior', columns)['playtime_hist'])
+    finally:
+        executor.shutdown()
+
+
+def test_pool_results_match_serial(columns, store):
+    executor = ParallelExecutor(workers=2, min_rows=0)
+    try:
+        results = compute_analysis('demographics', store, executor)
+        assert executor._pool is not None
+        expected = compute_analysis('demographics', columns)
+        np.testing.assert_array_equal(results['age_hist'], expected['age_hist'])
+        pd.testing.assert_series_equal(results['location_counts'], expected['location_counts'])
+    finally:
+        executor.shutdown()
@@ -0,0 +1,35 @@
+# PlayerID index: lookups and top-k lists stay correct when reused blocks move
+# Run: python -m pytest -q
+
+import numpy as np
+
+from aggregates import ColumnSet
+from data_sources import clean_players, synthetic_players
+from materialized_views import block_fingerprints
+from player_index import PlayerIndex
+
+BLOCK = 1000
+
+
+def build(data, previous=None):
+    data = data.reset_index(drop=True)
+    columns = ColumnSet.from_frame(data)
+    block_fingerprints(columns, block_rows=BLOCK)
+    return data, PlayerIndex.build(data, columns, previous)
+
+
+def test_blocks_shifted_by_an_insert_are_reused():
+    data = clean_players(synthetic_players(40_000))
+    _, first = build(data)
+    # Insert one row early on: every later block moves
+    moved, index = build(data.iloc[np.r_[0:3_000, 20_000, 3_000:len(data)]], previous=first)
+    assert index.reused_blocks >= len(index.blocks) - 2
+
+    for player_id in moved['PlayerID'].iloc[[0, 2_999, 3_000, 3_001, 25_000, len(moved) - 1]]:
+        np.testing.assert_array_equal(index.lookup(player_id), np.flatnonzero(moved['PlayerID'] == player_id))
+    rows, values = index.top_k('InGamePurchases', k=50)
+    np.testing.assert_array_equal(moved['InGamePurchases'].to_numpy()[rows], values)
+    np.testing.assert_array_equal(values, np.sort(moved['InGamePurchases'].to_numpy())[::-1][:50])
+    genre = index.genres[0]
+    rows, _ = index.top_k('ToxicityLevel', k=20, genre=genre)
+    assert (moved['GameGenre'].iloc[rows] == genre).all()
@@ -0,0 +1,28 @@
+# Hashed PlayerID sampling: any ID type, stable buckets
+# Run: python -m pytest -q
+
+import numpy as np
+import pandas as pd
+
+from query_builder import HASH_BUCKETS, HASH_MULTIPLIER, PlayerQuery, id_buckets, text_key
+
+
+def test_integer_ids_keep_the_knuth_buckets():
+    ids = pd.Series([0, 9000, 9001, 2**31 - 1])
+    np.testing.assert_array_equal(id_buckets(ids), ids.to_numpy() * HASH_MULTIPLIER % HASH_BUCKETS)
+    # Integer IDs given as floats or text land in the same bucket
+    np.testing.assert_array_equal(id_buckets(pd.Series(['9000', 9000.0, 9000], dtype=object)), [9000] * 3)
+
+
+def test_text_ids_are_sampled_deterministically():
+    data = pd.DataFrame({'PlayerID': [f'P{i:06d}' for i in range(50_000)]})
+    query = PlayerQuery(sample_fraction=0.2, sample_method='hashed')
+    first, second = query.sample_frame(data), query.sample_frame(data.iloc[::-1])
+    assert set(first['PlayerID']) == set(second['PlayerID'])
+    assert 0.18 < len(first) / len(data) < 0.22
+
+
+def test_mixed_and_missing_ids():
+    ids = pd.Series([17, 'P1', None, 'Ünï'], dtype=object)
+    expected_keys = [17, text_key('P1'), text_key(''), text_key('Ünï')]
+    np.testing.assert_array_equal(id_buckets(ids), np.array(expected_keys) * HASH_MULTIPLIER % HASH_BUCKETS)
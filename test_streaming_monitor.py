@@ -0,0 +1,75 @@
+# Streaming monitor resilience: bad batches and source errors do not stop the consumer thread
+# Run: python -m pytest -q
+
+import time
+
+import streaming_monitor
+from streaming_monitor import JsonLinesSource, QueueSource, StreamMonitor
+
+
+class FlakySource(QueueSource):
+    """Queue source whose first `failures` polls raise, like a dropped change stream"""
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+        self.closed = 0
+
+    def poll(self, timeout=0.2):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("stream dropped")
+        return super().poll(timeout)
+
+    def close(self):
+        self.closed += 1
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.02)
+    assert condition()
+
+
+def test_malformed_batch_is_counted_and_skipped():
+    source = QueueSource()
+    monitor = StreamMonitor(source)
+    monitor.start()
+    try:
+        # No Age/PlayTimeHours, so clean_players is skipped and the text reaches the window
+        source.queue.put({'GameGenre': 'RPG', 'Location': 'UK', 'ToxicityLevel': 'bad'})
+        wait_for(lambda: monitor.stats['errors'] == 1)
+        source.queue.put({'GameGenre': 'RPG', 'Location': 'UK', 'ToxicityLevel': 9})
+        wait_for(lambda: monitor.stats['records'] == 1)
+        assert monitor.running
+        assert monitor.stats['rejected'] == 1
+        assert 'skipped' in monitor.last_error[1] and not monitor.failing
+    finally:
+        monitor.stop()
+
+
+def test_source_errors_reconnect_with_backoff(monkeypatch):
+    monkeypatch.setattr(streaming_monitor, 'RECONNECT_MIN_S', 0.01)
+    source = FlakySource(failures=3)
+    monitor = StreamMonitor(source)
+    monitor.start()
+    try:
+        source.queue.put({'GameGenre': 'RPG', 'Location': 'UK', 'ToxicityLevel': 9})
+        wait_for(lambda: monitor.stats['records'] == 1)
+        assert monitor.running and not monitor.failing
+        assert monitor.stats['errors'] == monitor.stats['reconnects'] == source.closed == 3
+    finally:
+        monitor.stop()
+
+
+def test_jsonl_source_resumes_where_it_left_off(tmp_path):
+    path = tmp_path / 'players.jsonl'
+    path.write_text('{"PlayerID": 1}\n{"PlayerID": 2}\n{"Player')
+    source = JsonLinesSource(str(path), from_start=True)
+    assert [r['PlayerID'] for r in source.poll(timeout=0)] == [1, 2]
+    source.close()
+    with open(path, 'a') as f:
+        f.write('ID": 3}\n')
+    assert [r['PlayerID'] for r in source.poll(timeout=0)] == [3]
+    source.close()
@@ -0,0 +1,91 @@
+# Schema validation tests: ordinal levels, quarantine counts, and the same result on every source
+# Run: python -m pytest -q
+
+import bson
+import numpy as np
+import pandas as pd
+import pytest
+
+from bson_columnar import ColumnarBatchDecoder
+from data_sources import BASE_DIR, CsvDataSource
+from validation import LEVEL_SCORES, VALIDATION_SCHEMA, VIOLATIONS_COLUMN, validate_players
+
+
+@pytest.fixture(scope='module')
+def records():
+    """data.csv players as plain records, with one broken row per rule family"""
+    rows = pd.read_csv(f'{BASE_DIR}/data.csv', nrows=3000).to_dict('records')
+    rows[0]['Age'] = 150
+    rows[1]['ToxicityLevel'] = 'extreme'
+    rows[2]['PlayTimeHours'] = np.nan
+    rows[3]['Gender'] = 'Robot'
+    rows[4]['SleepDeprivationRisk'] = ' high '
+    rows[5]['ToxicityLevel'] = 4
+    del rows[6]['LoyaltyIndex']
+    return rows
+
+
+def load_csv(records, tmp_path):
+    path = tmp_path / 'players.csv'
+    pd.DataFrame(records).to_csv(path, index=False)
+    return CsvDataSource(str(path)).load()
+
+
+def load_columnar(records, batch_size=700):
+    decoder = ColumnarBatchDecoder()
+    for start in range(0, len(records), batch_size):
+        decoder.add_batch(b''.join(bson.encode(record) for record in records[start:start + batch_size]))
+    return decoder.frame()
+
+
+def comparable(frame):
+    return {field: list(frame[field].astype(object).where(frame[field].notna(), None))
+            for field in VALIDATION_SCHEMA if field in frame.columns}
+
+
+def test_csv_and_columnar_decoder_give_the_same_valid_rows(records, tmp_path):
+    csv_clean, csv_report = validate_players(load_csv(records, tmp_path))
+    bson_clean, bson_report = validate_players(load_columnar(records))
+
+    assert csv_report.valid_rows == bson_report.valid_rows == len(records) - 5
+    pd.testing.assert_series_equal(csv_report.counts(), bson_report.counts())
+    assert comparable(csv_clean) == comparable(bson_clean)
+    assert set(csv_report.quarantine['PlayerID']) == set(bson_report.quarantine['PlayerID'])
+
+
+def test_text_levels_map_to_scores(records, tmp_path):
+    clean, _ = validate_players(load_csv(records, tmp_path))
+    player = clean.set_index('PlayerID')
+    assert player.loc[records[4]['PlayerID'], 'SleepDeprivationRisk'] == LEVEL_SCORES['high']
+    assert player.loc[records[5]['PlayerID'], 'ToxicityLevel'] == 4.0
+    assert set(clean['ToxicityLevel']) <= set(LEVEL_SCORES.values()) | {4.0}
+    # "High" must clear the strict >7 sleep-risk thresholds used by the overview and monitor
+    assert LEVEL_SCORES['high'] > 7
+
+
+def test_quarantine_reports_each_broken_rule(records, tmp_path):
+    _, report = validate_players(load_csv(records, tmp_path))
+    counts = report.counts()
+    assert counts.to_dict() == {'Age: range': 1, 'ToxicityLevel: type': 1, 'PlayTimeHours: missing': 1,
+                                'Gender: enum': 1, 'LoyaltyIndex: missing': 1}
+    quarantine = report.quarantine.set_index('PlayerID')
+    assert quarantine.loc[records[0]['PlayerID'], VIOLATIONS_COLUMN] == 'Age: range'
+    # Raw values are kept for inspection, not zeroed
+    assert quarantine.loc[records[1]['PlayerID'], 'ToxicityLevel'] == 'extreme'
+
+
+def test_chunking_does_not_change_the_result(records, tmp_path):
+    data = load_csv(records, tmp_path)
+    whole, whole_report = validate_players(data)
+    chunked, chunked_report = validate_players(data, chunk_rows=128, quarantine_limit=2)
+    pd.testing.assert_frame_equal(whole, chunked)
+    pd.testing.assert_series_equal(whole_report.counts(), chunked_report.counts())
+    # Counts cover every row; only the kept sample of quarantined rows is capped
+    assert len(chunked_report.quarantine) == 2
+
+
+def test_missing_required_column_quarantines_everything():
+    data = pd.DataFrame({'PlayerID': [1, 2], 'Age': [20, 30]})
+    clean, report = validate_players(data)
+    assert clean.empty
+    assert report.counts().to_dict() == {'PlayTimeHours: missing': 2}
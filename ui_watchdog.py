@@ -0,0 +1,159 @@
+# Tk event-loop responsiveness watchdog
+# A root.after heartbeat measures how late each tick runs (scheduling lag = how long the
+# window could not repaint or react). Lags over the stall threshold are attributed to the
+# handler that was running: an explicit activity() label when one is active, otherwise
+# the Tk callback found on the main thread's stack by a sampler thread while the stall
+# was still in progress. Lags are kept as a histogram that is logged periodically.
+
+import bisect
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger('ui_watchdog')
+
+HEARTBEAT_MS = 50
+STALL_MS = 200
+# Upper edges of the lag histogram buckets (ms); the last bucket is open-ended
+LAG_BUCKETS_MS = [5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+LOG_INTERVAL_S = 60.0
+STALL_HISTORY = 500
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def stack_handler(frame):
+    """(handler, hotspot) of a main-thread stack: innermost Tk callback and innermost project line"""
+    stack = traceback.extract_stack(frame)
+    callback = max((i for i, entry in enumerate(stack) if 'tkinter' in entry.filename), default=-1)
+    project = [entry for entry in stack[callback + 1:]
+               if entry.filename.startswith(PROJECT_DIR) and not entry.filename.endswith('ui_watchdog.py')]
+    if not project:
+        return None, None
+    hotspot = project[-1]
+    return project[0].name, f"{os.path.basename(hotspot.filename)}:{hotspot.lineno} {hotspot.name}"
+
+
+class EventLoopWatchdog:
+    """Heartbeat-based stall detector for a Tk root (call start() on the Tk thread)"""
+
+    def __init__(self, root, interval_ms=HEARTBEAT_MS, stall_ms=STALL_MS, log_interval_s=LOG_INTERVAL_S):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.stall_ms = stall_ms
+        self.log_interval_s = log_interval_s
+        self.counts = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.ticks = 0
+        self.max_lag_ms = 0.0
+        self.stalls = deque(maxlen=STALL_HISTORY)
+        self._activities = []
+        # (name, ended) of the last finished activity: its stall is only seen by the next tick
+        self._finished = None
+        self._expected = None
+        self._last_beat = None
+        self._last_log = time.perf_counter()
+        self._sampled = None
+        self._tk_thread = None
+        self._stop = threading.Event()
+        self._after_id = None
+
+    def start(self):
+        self._tk_thread = threading.get_ident()
+        self._stop.clear()
+        self._last_beat = time.perf_counter()
+        self._schedule()
+        threading.Thread(target=self._sample_stalls, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        self.log_histogram()
+
+    def _schedule(self):
+        self._expected = time.perf_counter() + self.interval_ms / 1000
+        self._after_id = self.root.after(self.interval_ms, self._beat)
+
+    def _beat(self):
+        now = time.perf_counter()
+        lag_ms = max(0.0, (now - self._expected) * 1000)
+        self.record(lag_ms)
+        self._last_beat = now
+        if now - self._last_log >= self.log_interval_s:
+            self._last_log = now
+            self.log_histogram()
+        if not self._stop.is_set():
+            self._schedule()
+
+    def record(self, lag_ms):
+        self.ticks += 1
+        self.counts[bisect.bisect_right(LAG_BUCKETS_MS, lag_ms)] += 1
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        if lag_ms >= self.stall_ms:
+            handler, hotspot = self._sampled or (None, None)
+            activity = self._activities[-1] if self._activities else None
+            if activity is None and self._finished is not None and self._finished[1] >= self._expected:
+                activity = self._finished[0]
+            stall = {'time': time.time(), 'lag_ms': lag_ms, 'handler': activity or handler or 'unknown',
+                     'hotspot': hotspot}
+            self.stalls.append(stall)
+            logger.warning("UI stalled %.0f ms in %s%s", lag_ms, stall['handler'],
+                           f" ({hotspot})" if hotspot else "")
+        self._sampled = None
+        self._finished = None
+
+    def _sample_stalls(self):
+        # Runs off the Tk thread: while a stall is in progress, capture what the Tk thread is doing
+        while not self._stop.wait(self.stall_ms / 4000):
+            if self._sampled is not None or self._last_beat is None:
+                continue
+            if (time.perf_counter() - self._expected) * 1000 >= self.stall_ms / 2:
+                frame = sys._current_frames().get(self._tk_thread)
+                if frame is not None:
+                    self._sampled = stack_handler(frame)
+
+    @contextmanager
+    def activity(self, name):
+        """Label stalls that happen inside the block (e.g. one analysis of a batch run)"""
+        self._activities.append(name)
+        try:
+            yield
+        finally:
+            self._activities.pop()
+            self._finished = (name, time.perf_counter())
+
+    def stalls_by_handler(self):
+        worst = {}
+        for stall in self.stalls:
+            worst[stall['handler']] = max(worst.get(stall['handler'], 0.0), stall['lag_ms'])
+        return worst
+
+    def histogram(self):
+        """[(bucket label, ticks)] of heartbeat lag"""
+        labels = [f"<{edge}ms" for edge in LAG_BUCKETS_MS] + [f">={LAG_BUCKETS_MS[-1]}ms"]
+        return list(zip(labels, self.counts))
+
+    def format_histogram(self):
+        return " ".join(f"{label}:{count}" for label, count in self.histogram() if count)
+
+    def log_histogram(self):
+        if self.ticks:
+            logger.info("UI lag over %d ticks (max %.0f ms, %d stalls): %s", self.ticks, self.max_lag_ms,
+                        len(self.stalls), self.format_histogram())
+
+    def reset(self):
+        self.counts = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.ticks = 0
+        self.max_lag_ms = 0.0
+        self.stalls.clear()
+
+    def describe(self):
+        return f"UI max lag {self.max_lag_ms:.0f} ms, {len(self.stalls)} stalls ≥ {self.stall_ms} ms"
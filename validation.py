@@ -0,0 +1,181 @@
+# Schema-driven validation of raw player tables
+# Every field declares its type, range, allowed values or ordinal text mapping; 'required'
+# fields must be present and numeric fields must have a value. Rows are checked in chunks
+# with column-wise NumPy operations; text columns are resolved per distinct value
+# (factorize), never per row. Rows breaking any rule are set aside in a
+# quarantine table with the names of the rules they broke, instead of being zeroed.
+
+import time
+
+import numpy as np
+import pandas as pd
+
+# Text levels used by some exports (data.csv) for fields that are 0-10 scores elsewhere.
+# Each maps inside the band every risk threshold agrees on: Low in the Low Risk bin (<=3) and
+# under the low-toxicity line (<4); Medium in (3, 5], below every "high" cut-off; High above
+# 7, so it counts in the Critical Risk bin (7, 10], the ">7" overview line, the monitor's
+# sleep-risk rule and its >6 toxicity rule
+LEVEL_SCORES = {'low': 2.0, 'medium': 5.0, 'high': 8.0}
+
+VALIDATION_SCHEMA = {
+    'PlayerID': {'type': 'id'},
+    'Age': {'type': 'number', 'min': 10, 'max': 80, 'required': True},
+    'Gender': {'type': 'category', 'values': ['Male', 'Female', 'Other']},
+    'Location': {'type': 'category'},
+    'GameGenre': {'type': 'category'},
+    'PlayTimeHours': {'type': 'number', 'min': 0, 'max': 100, 'required': True},
+    'InGamePurchases': {'type': 'number', 'min': 0},
+    'SessionsPerWeek': {'type': 'number', 'min': 0, 'max': 168},
+    'AvgSessionDurationMinutes': {'type': 'number', 'min': 0, 'max': 1440},
+    'PlayerLevel': {'type': 'number', 'min': 0},
+    'AchievementsUnlocked': {'type': 'number', 'min': 0},
+    'EngagementLevel': {'type': 'number', 'min': 0, 'max': 10},
+    'SocialInteractionScore': {'type': 'number', 'min': 0, 'max': 10},
+    'RageQuitFrequency': {'type': 'number', 'min': 0, 'max': 10},
+    'LoyaltyIndex': {'type': 'number', 'min': 0, 'max': 100},
+    'SleepDeprivationRisk': {'type': 'number', 'min': 0, 'max': 10, 'ordinal': LEVEL_SCORES},
+    'ToxicityLevel': {'type': 'number', 'min': 0, 'max': 10, 'ordinal': LEVEL_SCORES},
+    'TeamPlayerScore': {'type': 'number', 'min': 0, 'max': 20},
+}
+
+CHUNK_ROWS = 1_000_000
+# Quarantined rows kept for inspection; counts always cover every row
+QUARANTINE_LIMIT = 100_000
+VIOLATIONS_COLUMN = 'Violations'
+
+
+def schema_rules(schema=VALIDATION_SCHEMA):
+    """Ordered (field, rule) pairs; a row's violations are a bitmask over this list"""
+    rules = []
+    for field, spec in schema.items():
+        if spec.get('required') or spec['type'] == 'number':
+            rules.append((field, 'missing'))
+        if spec['type'] == 'number':
+            rules.append((field, 'type'))
+            if 'min' in spec or 'max' in spec:
+                rules.append((field, 'range'))
+        elif 'values' in spec:
+            rules.append((field, 'enum'))
+    if len(rules) > 64:
+        raise ValueError("At most 64 validation rules fit the per-row violation bitmask")
+    return rules
+
+
+def numeric_values(series, ordinal=None):
+    """float64 values and a mask of present-but-unparseable entries"""
+    if series.dtype.kind in 'iufb':
+        return series.to_numpy(dtype=np.float64), np.zeros(len(series), dtype=bool)
+    # Text: resolve each distinct value once
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    text = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    resolved = pd.to_numeric(text, errors='coerce').to_numpy(dtype=np.float64)
+    if ordinal:
+        levels = text.str.lower().map(ordinal).to_numpy(dtype=np.float64)
+        resolved = np.where(np.isnan(resolved), levels, resolved)
+    values = np.append(resolved, np.nan)[codes]
+    bad = np.append(np.isnan(resolved), False)[codes]
+    return values, bad
+
+
+class ValidationReport:
+    """Row counts, per-rule violation counts and the quarantined rows of one validation"""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.rows = 0
+        self.valid_rows = 0
+        self.rule_counts = np.zeros(len(rules), dtype=np.int64)
+        self.quarantine_parts = []
+        self.quarantined = 0
+        self.seconds = 0.0
+
+    @property
+    def quarantine(self):
+        """Quarantined raw rows (up to QUARANTINE_LIMIT) with the rules each one broke"""
+        if not self.quarantine_parts:
+            return pd.DataFrame(columns=[VIOLATIONS_COLUMN])
+        return pd.concat(self.quarantine_parts)
+
+    def counts(self):
+        """Violations per rule, most frequent first (rules never broken omitted)"""
+        index = [f"{field}: {rule}" for field, rule in self.rules]
+        counts = pd.Series(self.rule_counts, index=index)
+        return counts[counts > 0].sort_values(ascending=False)
+
+    @property
+    def valid_share(self):
+        return self.valid_rows / self.rows if self.rows else 1.0
+
+    def describe(self):
+        rate = self.rows / self.seconds if self.seconds > 0 else float('inf')
+        return (f"{self.valid_rows:,}/{self.rows:,} rows valid ({self.valid_share * 100:.1f}%), "
+                f"{self.rows - self.valid_rows:,} quarantined, {rate:,.0f} rows/s")
+
+
+def validate_chunk(chunk, schema, rules):
+    """(cleaned chunk, per-row violation bitmask)"""
+    flags = np.zeros(len(chunk), dtype=np.uint64)
+    bits = {rule: np.uint64(1) << np.uint64(i) for i, rule in enumerate(rules)}
+    cleaned = {}
+    for field, spec in schema.items():
+        if field not in chunk.columns:
+            if spec.get('required'):
+                flags |= bits[(field, 'missing')]
+            continue
+        series = chunk[field]
+        if spec['type'] == 'number':
+            values, bad = numeric_values(series, spec.get('ordinal'))
+            # A null score is not a zero score: the row is quarantined, not filled
+            flags[np.isnan(values) & ~bad] |= bits[(field, 'missing')]
+            flags[bad] |= bits[(field, 'type')]
+            if 'min' in spec or 'max' in spec:
+                with np.errstate(invalid='ignore'):
+                    out = (values < spec.get('min', -np.inf)) | (values > spec.get('max', np.inf))
+                flags[out] |= bits[(field, 'range')]
+            cleaned[field] = values
+        else:
+            missing = series.isna().to_numpy()
+            if spec.get('required'):
+                flags[missing] |= bits[(field, 'missing')]
+            if 'values' in spec:
+                flags[~series.isin(spec['values']).to_numpy() & ~missing] |= bits[(field, 'enum')]
+    if cleaned:
+        chunk = chunk.assign(**cleaned)
+    return chunk, flags
+
+
+def violation_labels(flags, rules):
+    """Comma-separated rule names per row, built once per distinct bitmask"""
+    uniques, inverse = np.unique(flags, return_inverse=True)
+    labels = np.array([', '.join(f"{field}: {rule}" for i, (field, rule) in enumerate(rules)
+                                 if int(mask) >> i & 1) for mask in uniques], dtype=object)
+    return labels[inverse]
+
+
+def validate_players(data, schema=VALIDATION_SCHEMA, chunk_rows=CHUNK_ROWS, quarantine_limit=QUARANTINE_LIMIT):
+    """(valid rows, ValidationReport); numeric fields come back as float64"""
+    started = time.perf_counter()
+    rules = schema_rules(schema)
+    report = ValidationReport(rules)
+    report.rows = len(data)
+    valid_parts = []
+    for start in range(0, max(len(data), 1), chunk_rows):
+        chunk = data.iloc[start:start + chunk_rows]
+        cleaned, flags = validate_chunk(chunk, schema, rules)
+        invalid = flags != 0
+        if invalid.any():
+            for i in range(len(rules)):
+                report.rule_counts[i] += np.count_nonzero(flags & (np.uint64(1) << np.uint64(i)))
+            room = quarantine_limit - report.quarantined
+            if room > 0:
+                rows = np.flatnonzero(invalid)[:room]
+                part = chunk.iloc[rows].copy()
+                part[VIOLATIONS_COLUMN] = violation_labels(flags[rows], rules)
+                report.quarantine_parts.append(part)
+                report.quarantined += len(rows)
+            cleaned = cleaned[~invalid]
+        valid_parts.append(cleaned)
+    clean = pd.concat(valid_parts) if len(valid_parts) > 1 else valid_parts[0]
+    report.valid_rows = len(clean)
+    report.seconds = time.perf_counter() - started
+    return clean, report